@@ -0,0 +1,52 @@
+"""
+Boucle asyncio partagée par le processus.
+
+Les graphes asynchrones sont exécutés sur une boucle unique tournant dans un thread
+dédié: les branches parallèles (exp_worker, write_bullets...) deviennent des coroutines
+au lieu d'occuper chacune un thread, et le client HTTP asynchrone partagé
+(voir llm_config) reste attaché à une seule boucle.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Coroutine, Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Retourne la boucle du processus, démarrée dans un thread daemon au premier appel"""
+    global _loop
+    if _loop is None:
+        with _lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="ai-event-loop", daemon=True)
+                thread.start()
+                _loop = loop
+    return _loop
+
+
+def run_async(coro: Coroutine[Any, Any, Any], timeout: Optional[float] = None) -> Any:
+    """
+    Exécute une coroutine sur la boucle partagée et attend son résultat depuis un thread synchrone.
+
+    Args:
+        coro (Coroutine): Coroutine à exécuter
+        timeout (Optional[float]): Délai maximal d'attente en secondes; la coroutine est
+            annulée s'il est dépassé
+
+    Returns:
+        Le résultat de la coroutine
+
+    Raises:
+        concurrent.futures.TimeoutError: Si le délai est dépassé
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, get_loop())
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise
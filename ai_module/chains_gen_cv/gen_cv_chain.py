@@ -8,6 +8,7 @@ from langgraph.constants import Send
 from langgraph.checkpoint.memory import MemorySaver
 from ai_module.lg_models import CVGenState, CVExperience, CVEducation, CVLanguage
 from ai_module.llm_config import get_llm
+from ai_module.llm_node import llm_node, select_node
 from typing_extensions import Annotated
 from pydantic import BaseModel, Field
 ##############################################################################
@@ -47,20 +48,134 @@ class PrivateSelectEduState(TypedDict):
     job_summary_private_edu: str
     educations_with_description: Annotated[List[CVEducation], operator.add]
 
+# Sorties structurées des LLM. Ces classes sont définies au niveau module afin que
+# get_llm(schema=...) réutilise le même runnable d'un appel à l'autre.
+
+class ExperienceWithNbBullets(BaseModel):
+    """
+    Expérience avec le nombre de bullets.
+    """
+    exp_id: str = Field(description="Identifiant unique de l'expérience")
+    nb_bullets: int = Field(description="Nombre de bullets à mettre pour cette expérience")
+    order: Optional[int] = Field(description="Ordre de l'expérience dans le CV", default=None)
+
+class OutputBullets(BaseModel):
+    """
+    Sortie de la LLM pour le nombre de bullets à mettre dans chaque expérience.
+    """
+    experiences: List[ExperienceWithNbBullets]
+
+class ExperienceWithBullets(BaseModel):
+    """
+    Expérience avec les bullets générées.
+    """
+    bullets: List[str] = Field(description="Liste des bullets pour cette expérience (25 mots max par bullet)")
+
+class EduWithNbMots(BaseModel):
+    """
+    Éducation avec le nombre de mots à mettre dans chaque éducation.
+    """
+    edu_id: str = Field(description="Identifiant unique de l'éducation")
+    nb_mots: int = Field(description="Nombre de mots à mettre pour cette éducation, entre 10 et 50. 0 si la formation n'est pas pertinente.")
+    order: Optional[int] = Field(description="Ordre de l'éducation dans le CV, peut être null")
+
+class OutputEduWithNbMots(BaseModel):
+    """
+    Sortie de la LLM pour le nombre de mots à mettre dans chaque éducation.
+    """
+    education: List[EduWithNbMots]
+
+class ExperienceWithTranslation(BaseModel):
+    """
+    Expérience avec la traduction et l'harmonisation.
+    """
+    exp_id: str = Field(description="Identifiant unique de l'expérience inchangé")
+    title_refined: str = Field(description="Titre de l'expérience traduit et harmonisé, retourné dans la langue attendue")
+    company_refined: str = Field(description="Entreprise de l'expérience traduit et harmonisé, retourné dans la langue attendue")
+    location_refined: str = Field(description="Lieu de l'expérience traduit et harmonisé, retourné dans la langue attendue. str vide si lieu non renseigné.")
+    dates_refined: str = Field(description="Dates de l'expérience retournées dans la langue attendue avec seulement les mois et années")
+    bullets: List[str] = Field(description="Bullets de l'expérience traduits et harmonisés, retournés dans la langue attendue")
+
+class OutputExpTranslation(BaseModel):
+    """
+    Sortie de la LLM pour la traduction et l'harmonisation.
+    """
+    experiences: List[ExperienceWithTranslation]
+
+class EducationWithTranslation(BaseModel):
+    """
+    Éducation avec la traduction et l'harmonisation.
+    """
+    edu_id: str = Field(description="Identifiant unique de l'éducation inchangé")
+    degree_refined: str = Field(description="Diplôme traduit et harmonisé, retourné dans la langue attendue")
+    institution_refined: str = Field(description="Institution traduite et harmonisée, retournée dans la langue attendue")
+    location_refined: str = Field(description="Lieu de l'éducation traduit et harmonisé, retourné dans la langue attendue. str vide si lieu non renseigné.")
+    dates_refined: str = Field(description="Années seulement de l'éducation")
+    description_refined: str = Field(description="Description générée de l'éducation traduite et harmonisée, retournée dans la langue attendue")
+
+class OutputEduTranslation(BaseModel):
+    """
+    Sortie de la LLM pour la traduction et l'harmonisation.
+    """
+    educations: List[EducationWithTranslation]
+
+class SectionsOutput(BaseModel):
+    """
+    Sortie de la LLM pour les titres des sections du CV.
+    """
+    experience_section_name: str = Field(description="Titre de la section expérience professionnelle")
+    skills_section_name: str = Field(description="Titre de la section compétences")
+    education_section_name: str = Field(description="Titre de la section éducation")
+    languages_section_name: str = Field(description="Titre de la section langues")
+    hobbies_section_name: str = Field(description="Titre de la section centres d'intérêt")
+
+class LanguageOutput(BaseModel):
+    """
+    Structure pour une langue dans la sortie LLM
+    """
+    language: str = Field(description="Nom de la langue dans la langue spécifiée")
+    level: str = Field(description="Niveau de maîtrise dans la langue spécifiée")
+
+class LanguesOutput(BaseModel):
+    """
+    Sortie de la LLM pour les langues du CV.
+    """
+    langues: List[LanguageOutput] = Field(description="Liste des langues maîtrisées et leur niveau")
+
+class HobbiesOutput(BaseModel):
+    """
+    Sortie de la LLM pour les hobbies du CV.
+    """
+    hobbies_text: str = Field(description="Texte généré pour les hobbies")
+
+class Skill(BaseModel):
+    name: str = Field(description="Nom de la compétence dans la langue spécifiée")
+    items: List[str] = Field(description="Liste des items de la compétence dans la langue spécifiée. 1 item est un ou deux mots maximum.")
+
+class SkillsOutput(BaseModel):
+    """
+    Sortie de la LLM pour les compétences du CV.
+    """
+    competences: List[Skill] = Field(description="Liste des compétences dans la langue spécifiée pour le CV")
+
 ##############################################################################
 # 2. Fonctions "nœuds" du graphe principal
 ##############################################################################
 
+# Les nœuds décorés par @llm_node cèdent leurs appels LLM (`response = yield llm, prompt`)
+# afin d'être exécutables en synchrone (invoke) comme en asyncio (ainvoke).
+
 def detect_language(state: CVGenState) -> dict:
     """Détecte la langue du CV."""
     detected_language = langdetect.detect(state.job_raw)
     return {"language_cv": detected_language}
 
+@llm_node
 def summarize_job(state: CVGenState) -> dict:
     """Résume la description du poste."""
     llm = get_llm()
     prompt = f"Fais un résumé du poste en 100 mots maximum:\n{state.job_raw}"
-    response = llm.invoke(prompt)
+    response = yield llm, prompt
     return {"job_refined": response.content}
 
 def summarize_exp_orch(state: CVGenState) -> PrivateExpState:
@@ -85,6 +200,7 @@ def route_experiences(state: PrivateExpState):
         for exp in state['experiences_raw']
     ]
 
+@llm_node
 def exp_worker(state: PrivateExpState) -> dict:
     """
     Traite une seule expérience, génère un résumé via LLM.
@@ -102,7 +218,7 @@ def exp_worker(state: PrivateExpState) -> dict:
         f"Ne donne que le résumé final."
     )
     
-    response = llm.invoke(prompt)
+    response = yield llm, prompt
     
     # Mettre à jour le champ summary
     updated_exp = exp
@@ -144,6 +260,7 @@ def route_educations(state: PrivateEduState):
         for edu in state['educations_raw']
     ]
 
+@llm_node
 def edu_worker(state: PrivateEduState) -> dict:
     """
     Traite une seule éducation, génère un résumé via LLM.
@@ -161,7 +278,7 @@ def edu_worker(state: PrivateEduState) -> dict:
         f"Ne donne que le résumé final."
     )
     
-    response = llm.invoke(prompt)
+    response = yield llm, prompt
 
     updated_edu = edu
     updated_edu.summary = response.content
@@ -194,6 +311,7 @@ def agg_sum(state: CVGenState) -> dict:
 # 2e partie du graphe
 ############################################################################## 
 
+@llm_node
 def select_exp(state: CVGenState) -> PrivateSelectExpState:
     """
     Sélectionne les expériences à inclure dans le CV et retourne un markdown avec les choix d'expériences.
@@ -212,7 +330,7 @@ def select_exp(state: CVGenState) -> PrivateSelectExpState:
         f"Poste visé : {state.job_refined}\n\n"
     )
     
-    response = llm.invoke(prompt)
+    response = yield llm, prompt
     
     return {
         "experiences_to_select": state.experiences,
@@ -222,26 +340,12 @@ def select_exp(state: CVGenState) -> PrivateSelectExpState:
         "experiences_with_bullets": []  # Initialisé vide, sera rempli plus tard
     }
 
+@llm_node
 def give_nb_bullets(state: PrivateSelectExpState) -> dict:
     """
     Donne le nombre de bullets à mettre dans chaque expérience.
     """
-
-    class ExperienceWithNbBullets(BaseModel):
-        """
-        Expérience avec le nombre de bullets.
-        """
-        exp_id: str = Field(description="Identifiant unique de l'expérience")
-        nb_bullets: int = Field(description="Nombre de bullets à mettre pour cette expérience")
-        order: Optional[int] = Field(description="Ordre de l'expérience dans le CV", default=None)
-
-    class OutputBullets(BaseModel):
-        """
-        Sortie de la LLM pour le nombre de bullets à mettre dans chaque expérience.
-        """
-        experiences: List[ExperienceWithNbBullets]
-
-    llm = get_llm().with_structured_output(OutputBullets)
+    llm = get_llm(schema=OutputBullets)
     
     prompt = (
         f"Voici le choix des expériences pour le CV:\n\n"
@@ -251,7 +355,7 @@ def give_nb_bullets(state: PrivateSelectExpState) -> dict:
         f"Veuillez donner l'ordre et le nombre de bullets à mettre pour chaque expérience en fonction de ce choix.\n"
         f"Pour chaque expérience, utilisez son ID pour l'identifier."
     ) 
-    response = llm.invoke(prompt)
+    response = yield llm, prompt
 
     experiences_with_nb_bullets = []
     for exp in state['experiences_to_select']:
@@ -285,19 +389,12 @@ def route_bullets(state: PrivateSelectExpState) -> dict:
         for exp in state['experiences_with_nb_bullets'] if exp.nb_bullets > 0
     ]
 
+@llm_node
 def write_bullets(state: PrivateSelectExpState) -> dict:
     """
     Donne les bullets à mettre dans une seule expérience et identifie chaque expérience retournée aux expériences de base.
     """
-    llm = get_llm()
-    
-    class ExperienceWithBullets(BaseModel):
-        """
-        Expérience avec les bullets générées.
-        """
-        bullets: List[str] = Field(description="Liste des bullets pour cette expérience (25 mots max par bullet)")
-
-    llm = get_llm().with_structured_output(ExperienceWithBullets)
+    llm = get_llm(schema=ExperienceWithBullets)
     
     exp = state['experience_with_nb_bullets']
     prompt = (
@@ -308,7 +405,7 @@ def write_bullets(state: PrivateSelectExpState) -> dict:
         f"Description: {exp.description_raw}\n"
     )
 
-    response = llm.invoke(prompt)
+    response = yield llm, prompt
 
     exp.bullets = response.bullets
     return {
@@ -325,11 +422,12 @@ def synth_sumup_bullets(state: PrivateSelectExpState) -> dict:
         "experiences": state['experiences_with_bullets']
     }
 
+@llm_node
 def select_edu_and_give_nb_mots(state: CVGenState) -> PrivateSelectEduState:
     """
     Sélectionne les éducations à inclure dans le CV et retourne un markdown avec les choix d'éducations.
     """
-    llm = get_llm()
+    llm = get_llm(schema=OutputEduWithNbMots)
     
     educations_text = "\n".join(
         f"- [ID: {edu.edu_id}] **{edu.degree_refined}** à **{edu.institution_refined}** à **{edu.location_refined}** ({edu.dates_refined})\n  Résumé: {edu.summary}"
@@ -345,23 +443,7 @@ def select_edu_and_give_nb_mots(state: CVGenState) -> PrivateSelectEduState:
         f"Si une formation n'est pas pertinente, attribuez-lui 0 mots et une place 'null' sur le CV. Pour chaque formation sélectionnée, mentionnez son ID."
     )
 
-    class EduWithNbMots(BaseModel):
-        """
-        Éducation avec le nombre de mots à mettre dans chaque éducation.
-        """
-        edu_id: str = Field(description="Identifiant unique de l'éducation")
-        nb_mots: int = Field(description="Nombre de mots à mettre pour cette éducation, entre 10 et 50. 0 si la formation n'est pas pertinente.")
-        order: Optional[int] = Field(description="Ordre de l'éducation dans le CV, peut être null")
-
-    class OutputEduWithNbMots(BaseModel):
-        """
-        Sortie de la LLM pour le nombre de mots à mettre dans chaque éducation.
-        """
-        education: List[EduWithNbMots]
-
-    llm = get_llm().with_structured_output(OutputEduWithNbMots)
-
-    response = llm.invoke(prompt)
+    response = yield llm, prompt
 
     education_with_nb_mots = []
     for edu in state.education:
@@ -390,6 +472,7 @@ def route_education(state: PrivateSelectEduState) -> dict:
         for edu in state['educations_with_nb_mots'] if edu.nb_mots > 0
     ]
 
+@llm_node
 def write_edu_description(state: PrivateSelectEduState) -> dict:
     """
     Génère la description de l'éducation en fonction du résumé du poste et de la description brute de l'éducation et du nombre de mots à mettre.
@@ -406,7 +489,7 @@ def write_edu_description(state: PrivateSelectEduState) -> dict:
         f"Veuillez générer la description de l'éducation pour le CV en fonction du nombre de mots spécifié. Donne uniquement la description, sans aucun commentaire."
     )
 
-    response = llm.invoke(prompt)
+    response = yield llm, prompt
 
     edu.description_generated = response.content
     return {
@@ -423,28 +506,12 @@ def synth_sumup_edu_description(state: PrivateSelectEduState) -> dict:
         "education": state['educations_with_description']
     }
 
+@llm_node
 def translate_and_harmonize_exp(state: CVGenState) -> dict:
     """
     Traduit et harmonise les expériences en fonction de la langue du CV.
     """
-
-    class ExperienceWithTranslation(BaseModel):
-        """
-        Expérience avec la traduction et l'harmonisation.
-        """
-        exp_id: str = Field(description="Identifiant unique de l'expérience inchangé")
-        title_refined: str = Field(description="Titre de l'expérience traduit et harmonisé, retourné dans la langue attendue")
-        company_refined: str = Field(description="Entreprise de l'expérience traduit et harmonisé, retourné dans la langue attendue")
-        location_refined: str = Field(description="Lieu de l'expérience traduit et harmonisé, retourné dans la langue attendue. str vide si lieu non renseigné.")
-        dates_refined: str = Field(description="Dates de l'expérience retournées dans la langue attendue avec seulement les mois et années")
-        bullets: List[str] = Field(description="Bullets de l'expérience traduits et harmonisés, retournés dans la langue attendue")
-    class OutputTranslation(BaseModel):
-        """
-        Sortie de la LLM pour la traduction et l'harmonisation.
-        """
-        experiences: List[ExperienceWithTranslation]
-
-    llm = get_llm(temperature=0.5).with_structured_output(OutputTranslation)
+    llm = get_llm(temperature=0.5, schema=OutputExpTranslation)
 
     experiences_text = "\n".join(
         f"- [ID: {exp.exp_id}] **{exp.title_raw}** chez **{exp.company_raw}** à **{exp.location_raw}** ({exp.dates_raw})\n"
@@ -460,7 +527,7 @@ def translate_and_harmonize_exp(state: CVGenState) -> dict:
         f"Il faut que tout soit retourné dans la langue attendue."
     )
     
-    response = llm.invoke(prompt)
+    response = yield llm, prompt
 
     experiences_with_translation = []
     for exp in state.experiences:
@@ -478,27 +545,12 @@ def translate_and_harmonize_exp(state: CVGenState) -> dict:
         "experiences": experiences_with_translation
     }
 
+@llm_node
 def translate_and_harmonize_edu(state: CVGenState) -> dict:
     """
     Traduit et harmonise les éducations en fonction de la langue du CV.
     """
-    class EducationWithTranslation(BaseModel):
-        """
-        Éducation avec la traduction et l'harmonisation.
-        """
-        edu_id: str = Field(description="Identifiant unique de l'éducation inchangé")
-        degree_refined: str = Field(description="Diplôme traduit et harmonisé, retourné dans la langue attendue")
-        institution_refined: str = Field(description="Institution traduite et harmonisée, retournée dans la langue attendue")
-        location_refined: str = Field(description="Lieu de l'éducation traduit et harmonisé, retourné dans la langue attendue. str vide si lieu non renseigné.")
-        dates_refined: str = Field(description="Années seulement de l'éducation")
-        description_refined: str = Field(description="Description générée de l'éducation traduite et harmonisée, retournée dans la langue attendue")
-    class OutputTranslation(BaseModel):
-        """
-        Sortie de la LLM pour la traduction et l'harmonisation.
-        """
-        educations: List[EducationWithTranslation]
-
-    llm = get_llm(temperature=0.5).with_structured_output(OutputTranslation)
+    llm = get_llm(temperature=0.5, schema=OutputEduTranslation)
 
     educations_text = "\n".join(
         f"- [ID: {edu.edu_id}] **{edu.degree_raw}** à **{edu.institution_raw}** à **{edu.location_raw}** ({edu.dates_raw})\n  Description: {edu.description_generated}"
@@ -513,7 +565,7 @@ def translate_and_harmonize_edu(state: CVGenState) -> dict:
         f"Il faut que tout soit retourné dans la langue attendue."
     )
     
-    response = llm.invoke(prompt)
+    response = yield llm, prompt
 
     for edu in state.education:
         for translated_edu in response.educations:
@@ -529,6 +581,7 @@ def translate_and_harmonize_edu(state: CVGenState) -> dict:
         "education": state.education
     }
 
+@llm_node
 def give_title(state: CVGenState) -> dict:
     """
     Génère un titre pour le CV adapté pour le candidat et la fiche de poste dans la bonne langue.
@@ -559,7 +612,7 @@ def give_title(state: CVGenState) -> dict:
         f"Donner seulement le titre, sans aucun commentaire."
     )
 
-    response = llm.invoke(prompt)
+    response = yield llm, prompt
 
     state.head.title_refined = response.content
 
@@ -567,6 +620,7 @@ def give_title(state: CVGenState) -> dict:
         "head": state.head
     }
 
+@llm_node
 def give_phone(state: CVGenState) -> dict:
     """
     Traduit le numéro de téléphone en fonction de la langue et le met en format international si nécessaire.
@@ -580,7 +634,7 @@ def give_phone(state: CVGenState) -> dict:
         f"Donner seulement le numéro de téléphone, sans aucun commentaire."
     )
 
-    response = llm.invoke(prompt)
+    response = yield llm, prompt
 
     state.head.tel_refined = response.content
 
@@ -588,23 +642,12 @@ def give_phone(state: CVGenState) -> dict:
         "head": state.head
     }
 
+@llm_node
 def translate_sections(state: CVGenState) -> dict:
     """
     Traduit les titres des sections du CV en fonction de la langue spécifiée.
     """
-    llm = get_llm(temperature=0.8)
-
-    class SectionsOutput(BaseModel):
-        """
-        Sortie de la LLM pour les titres des sections du CV.
-        """
-        experience_section_name: str = Field(description="Titre de la section expérience professionnelle")
-        skills_section_name: str = Field(description="Titre de la section compétences")
-        education_section_name: str = Field(description="Titre de la section éducation")
-        languages_section_name: str = Field(description="Titre de la section langues")
-        hobbies_section_name: str = Field(description="Titre de la section centres d'intérêt")
-
-    llm = llm.with_structured_output(SectionsOutput)
+    llm = get_llm(temperature=0.8, schema=SectionsOutput)
 
     prompt = (
         f"Langue attendue: {state.language_cv}\n\n"
@@ -617,7 +660,7 @@ def translate_sections(state: CVGenState) -> dict:
         f"Veuillez traduire ces titres en fonction de la langue spécifiée."
     )
 
-    response = llm.invoke(prompt)
+    response = yield llm, prompt
 
     state.sections['experience'] = response.experience_section_name
     state.sections['skills'] = response.skills_section_name
@@ -629,26 +672,12 @@ def translate_sections(state: CVGenState) -> dict:
         "sections": state.sections
     }
 
+@llm_node
 def translate_langues(state: CVGenState) -> dict:
     """
     Traduit la liste des langues à partir de la chaîne brute langues_raw en fonction de la langue spécifiée.
     """
-    llm = get_llm(temperature=0.8)
-
-    class LanguageOutput(BaseModel):
-        """
-        Structure pour une langue dans la sortie LLM
-        """
-        language: str = Field(description="Nom de la langue dans la langue spécifiée")
-        level: str = Field(description="Niveau de maîtrise dans la langue spécifiée")
-
-    class LanguesOutput(BaseModel):
-        """
-        Sortie de la LLM pour les langues du CV.
-        """
-        langues: List[LanguageOutput] = Field(description="Liste des langues maîtrisées et leur niveau")
-
-    llm = llm.with_structured_output(LanguesOutput)
+    llm = get_llm(temperature=0.8, schema=LanguesOutput)
 
     prompt = (
         f"Langue attendue: {state.language_cv}\n\n"
@@ -658,7 +687,7 @@ def translate_langues(state: CVGenState) -> dict:
         f"Pour chaque langue, donnez son nom et son niveau de maîtrise."
     )
 
-    response = llm.invoke(prompt)
+    response = yield llm, prompt
 
     # Convertir les LanguageOutput en CVLanguage
     state.langues = [CVLanguage(language=lang.language, level=lang.level) for lang in response.langues]
@@ -667,20 +696,13 @@ def translate_langues(state: CVGenState) -> dict:
         "langues": state.langues
     }
 
+@llm_node
 def generate_hobbies_text(state: CVGenState) -> dict:
     """
     Génère un petit texte sur les hobbies pour le CV, dans la langue attendue pour le CV,
     en fonction de la fiche de poste et de hobbies_raw.
     """
-    llm = get_llm(temperature=0.8)
-
-    class HobbiesOutput(BaseModel):
-        """
-        Sortie de la LLM pour les hobbies du CV.
-        """
-        hobbies_text: str = Field(description="Texte généré pour les hobbies")
-
-    llm = llm.with_structured_output(HobbiesOutput)
+    llm = get_llm(temperature=0.8, schema=HobbiesOutput)
 
     prompt = (
         f"Tu es un assistant qui rédige un court paragraphe sur les hobbies pour un CV. En te basant sur la langue attendue, la fiche de poste et les infos sur le candidat, liste des éléments concis, factuels et professionnels. Sois sélectif et évite le verbiage, en restant sous 50 mots."
@@ -691,7 +713,7 @@ def generate_hobbies_text(state: CVGenState) -> dict:
         f"Informations sur les hobbies du candidat: {state.hobbies_raw}\n\n"
         )
 
-    response = llm.invoke(prompt)
+    response = yield llm, prompt
 
     state.hobbies_refined = response.hobbies_text
 
@@ -699,25 +721,14 @@ def generate_hobbies_text(state: CVGenState) -> dict:
         "hobbies_refined": state.hobbies_refined
     }
 
+@llm_node
 def generate_skills_text(state: CVGenState) -> dict:
     """
     Génère un texte structuré sur les compétences pour le CV, dans la langue attendue pour le CV,
     en fonction de la fiche de poste, des compétences brutes, des expériences et de leurs résumés, 
     ainsi que des formations et de leurs résumés.
     """
-    llm = get_llm(temperature=0.8)
-
-    class Skill(BaseModel):
-        name: str = Field(description="Nom de la compétence dans la langue spécifiée")
-        items: List[str] = Field(description="Liste des items de la compétence dans la langue spécifiée. 1 item est un ou deux mots maximum.")
-
-    class SkillsOutput(BaseModel):
-        """
-        Sortie de la LLM pour les compétences du CV.
-        """
-        competences: List[Skill] = Field(description="Liste des compétences dans la langue spécifiée pour le CV")
-
-    llm = llm.with_structured_output(SkillsOutput)
+    llm = get_llm(temperature=0.8, schema=SkillsOutput)
 
     prompt = (
         f"Langue attendue: {state.language_cv}\n\n"
@@ -732,7 +743,7 @@ def generate_skills_text(state: CVGenState) -> dict:
         f"Génère les compétences dans la langue spécifiée les plus pertinentes pour le poste visé. Cela apparaitra sur le CV.Il faut être concis (max 4 catégories, cela peut être moins). Il faut que chaque item soit un ou deux mots maximum."
     )
 
-    response = llm.invoke(prompt)
+    response = yield llm, prompt
 
     state.competences = {skill.name: skill.items for skill in response.competences}
 
@@ -741,54 +752,20 @@ def generate_skills_text(state: CVGenState) -> dict:
     }
 
 
-def create_cv_chain() -> StateGraph:
+def add_summary_nodes(chain: StateGraph, use_async: bool = False) -> None:
     """
-    Construit le graphe principal avec:
-      - 3 nœuds en parallèle au départ : detect_language, summarize_job, summarize_exp_orch
-      - route_experiences() pour router en parallèle vers le sous-graphe
-      - synth_sumup_exp pour consolider
-      - agg_sum pour la sortie finale
+    Ajoute au graphe les résumés des expériences et des formations, qui ne dépendent
+    pas du poste visé: START -> orchestrateurs -> workers en parallèle -> synth_sumup_*.
     """
-    
-    chain = StateGraph(CVGenState)
-    
-    # Ajout des nœuds principaux
-    chain.add_node("detect_language", detect_language)
-    chain.add_node("summarize_job", summarize_job)
-    chain.add_node("summarize_exp_orch", summarize_exp_orch)
-    chain.add_node("exp_worker", exp_worker)
-    chain.add_node("synth_sumup_exp", synth_sumup_exp)
-    chain.add_node("summarize_edu_orch", summarize_edu_orch)
-    chain.add_node("edu_worker", edu_worker)
-    chain.add_node("synth_sumup_edu", synth_sumup_edu)
-    chain.add_node("agg_sum", agg_sum)
-
-    chain.add_node("select_exp", select_exp)
-    chain.add_node("give_nb_bullets", give_nb_bullets)
-    chain.add_node("write_bullets", write_bullets)
-    chain.add_node("synth_sumup_bullets", synth_sumup_bullets)
-
-    chain.add_node("select_edu_and_give_nb_mots", select_edu_and_give_nb_mots)
-    chain.add_node("write_edu_description", write_edu_description)
-    chain.add_node("synth_sumup_edu_description", synth_sumup_edu_description)
-
-    chain.add_node("translate_and_harmonize_exp", translate_and_harmonize_exp)
-    chain.add_node("translate_and_harmonize_edu", translate_and_harmonize_edu)
-
-    chain.add_node("translate_sections", translate_sections)
-    chain.add_node("give_title", give_title)
-    chain.add_node("give_phone", give_phone)
-
-    chain.add_node("generate_hobbies_text", generate_hobbies_text)
-    chain.add_node("generate_skills_text", generate_skills_text)
-
-    chain.add_node("translate_langues", translate_langues)
-    # 1) Au départ, on lance en parallèle ces trois nœuds
-    chain.add_edge(START, "detect_language")
-    chain.add_edge(START, "summarize_job")
+    chain.add_node("summarize_exp_orch", select_node(summarize_exp_orch, use_async))
+    chain.add_node("exp_worker", select_node(exp_worker, use_async))
+    chain.add_node("synth_sumup_exp", select_node(synth_sumup_exp, use_async))
+    chain.add_node("summarize_edu_orch", select_node(summarize_edu_orch, use_async))
+    chain.add_node("edu_worker", select_node(edu_worker, use_async))
+    chain.add_node("synth_sumup_edu", select_node(synth_sumup_edu, use_async))
+
     chain.add_edge(START, "summarize_exp_orch")
     chain.add_edge(START, "summarize_edu_orch")
-    # 2) Orchestration des expériences vers le sous-graphe
     chain.add_conditional_edges(
         "summarize_exp_orch",
         route_experiences,
@@ -799,15 +776,83 @@ def create_cv_chain() -> StateGraph:
         route_educations,
         ["edu_worker"]
     )
-    # 3) Lorsque chaque sous-graphe se termine, on va vers synth_sumup_exp
     chain.add_edge("exp_worker", "synth_sumup_exp")
     chain.add_edge("edu_worker", "synth_sumup_edu")
+
+
+def create_cv_summaries_graph(use_async: bool = False) -> StateGraph:
+    """
+    Construit le graphe qui ne calcule que les résumés des expériences et des formations.
+    Utilisé par la génération par lot: les résumés sont calculés une seule fois par profil
+    puis réutilisés par create_cv_chain(precomputed_summaries=True) pour chaque offre.
+
+    Args:
+        use_async (bool): Si True, les nœuds LLM utilisent leur jumelle asynchrone (ainvoke)
+    """
+    chain = StateGraph(CVGenState)
+    add_summary_nodes(chain, use_async)
+    chain.add_edge(["synth_sumup_exp", "synth_sumup_edu"], END)
+    return chain
+
+
+def create_cv_chain(use_async: bool = False, precomputed_summaries: bool = False) -> StateGraph:
+    """
+    Construit le graphe principal avec:
+      - 3 nœuds en parallèle au départ : detect_language, summarize_job, summarize_exp_orch
+      - route_experiences() pour router en parallèle vers le sous-graphe
+      - synth_sumup_exp pour consolider
+      - agg_sum pour la sortie finale
+
+    Args:
+        use_async (bool): Si True, les nœuds LLM utilisent leur jumelle asynchrone (ainvoke)
+            et le graphe compilé doit être exécuté avec ainvoke / astream.
+        precomputed_summaries (bool): Si True, les expériences et formations de l'état
+            d'entrée portent déjà leur résumé (voir create_cv_summaries_graph) et le graphe
+            démarre directement sur les nœuds qui dépendent du poste visé.
+    """
+    
+    chain = StateGraph(CVGenState)
+    
+    # Ajout des nœuds principaux
+    chain.add_node("detect_language", select_node(detect_language, use_async))
+    chain.add_node("summarize_job", select_node(summarize_job, use_async))
+    if not precomputed_summaries:
+        add_summary_nodes(chain, use_async)
+    chain.add_node("agg_sum", select_node(agg_sum, use_async))
+
+    chain.add_node("select_exp", select_node(select_exp, use_async))
+    chain.add_node("give_nb_bullets", select_node(give_nb_bullets, use_async))
+    chain.add_node("write_bullets", select_node(write_bullets, use_async))
+    chain.add_node("synth_sumup_bullets", select_node(synth_sumup_bullets, use_async))
+
+    chain.add_node("select_edu_and_give_nb_mots", select_node(select_edu_and_give_nb_mots, use_async))
+    chain.add_node("write_edu_description", select_node(write_edu_description, use_async))
+    chain.add_node("synth_sumup_edu_description", select_node(synth_sumup_edu_description, use_async))
+
+    chain.add_node("translate_and_harmonize_exp", select_node(translate_and_harmonize_exp, use_async))
+    chain.add_node("translate_and_harmonize_edu", select_node(translate_and_harmonize_edu, use_async))
+
+    chain.add_node("translate_sections", select_node(translate_sections, use_async))
+    chain.add_node("give_title", select_node(give_title, use_async))
+    chain.add_node("give_phone", select_node(give_phone, use_async))
+
+    chain.add_node("generate_hobbies_text", select_node(generate_hobbies_text, use_async))
+    chain.add_node("generate_skills_text", select_node(generate_skills_text, use_async))
+
+    chain.add_node("translate_langues", select_node(translate_langues, use_async))
+    # 1) Au départ, on lance en parallèle ces nœuds
+    #    (les orchestrateurs de résumés et leurs workers sont ajoutés par add_summary_nodes)
+    chain.add_edge(START, "detect_language")
+    chain.add_edge(START, "summarize_job")
     
-    # 4) Quand detect_language, summarize_job et synth_sumup_exp sont terminés,
+    # 2) Quand detect_language, summarize_job et les résumés sont terminés,
     #    on passe à l'agrégation finale (agg_sum)
-    chain.add_edge(["detect_language", "summarize_job", "synth_sumup_exp", "synth_sumup_edu"], "agg_sum")
+    if precomputed_summaries:
+        chain.add_edge(["detect_language", "summarize_job"], "agg_sum")
+    else:
+        chain.add_edge(["detect_language", "summarize_job", "synth_sumup_exp", "synth_sumup_edu"], "agg_sum")
     
-    # 5) 2e partie du graphe
+    # 3) 2e partie du graphe
     chain.add_edge("agg_sum", "select_exp")
     chain.add_edge("select_exp", "give_nb_bullets")
 
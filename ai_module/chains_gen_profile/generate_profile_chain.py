@@ -1,13 +1,145 @@
 from langgraph.graph import StateGraph, START, END
 from ai_module.lg_models import ProfileState, GeneralInfo, GlobalExperience, GlobalEducation, GlobalExperienceList, GlobalEducationList
 from ai_module.llm_config import get_llm
+from ai_module.llm_node import llm_node, select_node
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.prompts import PromptTemplate
 import logging
+from functools import lru_cache
 from typing import List
 
 logger = logging.getLogger(__name__)
 
+def build_head_chain():
+    """
+    Construit la chaîne prompt | llm | parser d'extraction de l'en-tête.
+    Le calcul des format_instructions (schéma JSON pydantic) est fait ici, une seule fois.
+    """
+    # Utilisation de get_llm() comme dans parallel_tasks.py
+    llm = get_llm()
+
+    # Définir le parser JSON
+    parser = JsonOutputParser(pydantic_object=GeneralInfo)
+
+    # Création du prompt
+    prompt = PromptTemplate(
+        template=(
+            """
+            Analyse le texte suivant décrivant un profil candidat et génère un JSON structuré.
+            Pour chaque champ, fournis une description concise mais exhaustive, sans phrases complètes.
+
+            Le JSON doit contenir les champs suivants :
+            - "name": Nom complet uniquement
+            - "phone": Numéro de téléphone uniquement
+            - "email": Adresse email uniquement
+            - "general_title": Titre professionnel et profil général en quelques mots clés
+            - "skills": Liste exhaustive des compétences techniques et professionnelles, séparées par des virgules
+            - "langues": Liste des langues avec niveau et détails pertinents (certifications, séjours, etc.)
+            - "hobbies": Liste des centres d'intérêt avec détails pertinents, séparés par des virgules"
+
+            {format_instructions}
+
+            Texte source :
+            {source}
+            """
+        ),
+        input_variables=["source"],
+        partial_variables={"format_instructions": parser.get_format_instructions()}
+    )
+
+    return prompt | llm | parser
+
+def build_exp_chain():
+    """
+    Construit la chaîne prompt | llm | parser d'extraction des expériences.
+    Le calcul des format_instructions (schéma JSON pydantic) est fait ici, une seule fois.
+    """
+    # Utilisation de get_llm()
+    llm = get_llm()
+
+    # Définir le parser JSON
+    parser = JsonOutputParser(pydantic_object=GlobalExperienceList)
+
+    # Création du prompt
+    prompt = PromptTemplate(
+        template="""
+        Analyse méticuleusement le texte suivant et extrais toutes les informations concernant les expériences professionnelles.
+        Génère un JSON structuré en incluant absolument tous les détails présents dans le texte source, sans omettre aucune information :
+
+        Pour chaque expérience :
+        - "intitule": Intitulé exact et complet du poste
+        - "dates": Période d'emploi précise
+        - "etablissement": Nom complet de l'entreprise
+        - "lieu": Localisation détaillée
+        - "description": Description EXHAUSTIVE de l'expérience, incluant :
+          * Toutes les responsabilités mentionnées
+          * Tous les projets cités
+          * Toutes les technologies utilisées
+          * Tous les accomplissements
+          * Tout autre détail présent dans le texte source
+
+        IMPORTANT : Ne fais aucune synthèse ou résumé. Inclus absolument tous les détails mentionnés dans le texte source.
+
+        {format_instructions}
+
+        Texte source :
+        {source}
+        """,
+        input_variables=["source"],
+        partial_variables={"format_instructions": parser.get_format_instructions()},
+    )
+
+    return prompt | llm | parser
+
+def build_edu_chain():
+    """
+    Construit la chaîne prompt | llm | parser d'extraction des formations.
+    Le calcul des format_instructions (schéma JSON pydantic) est fait ici, une seule fois.
+    """
+    # Utilisation de get_llm()
+    llm = get_llm()
+
+    # Définir le parser JSON
+    parser = JsonOutputParser(pydantic_object=GlobalEducationList)
+
+    # Création du prompt
+    prompt = PromptTemplate(
+        template="""
+        Analyse méticuleusement le texte suivant et extrais toutes les informations concernant les formations académiques.
+        Génère un JSON structuré en incluant absolument tous les détails présents dans le texte source, sans omettre aucune information :
+
+        Pour chaque formation :
+        - "intitule": Nom complet et exact du diplôme
+        - "dates": Période précise de formation
+        - "etablissement": Nom complet de l'institution
+        - "lieu": Localisation détaillée
+        - "description": Description EXHAUSTIVE de la formation, incluant :
+          * Toutes les spécialisations
+          * Tous les résultats académiques
+          * Tous les projets réalisés
+          * Toutes les compétences acquises
+          * Tout autre détail présent dans le texte source
+
+        IMPORTANT : Ne fais aucune synthèse ou résumé. Inclus absolument tous les détails mentionnés dans le texte source.
+
+        {format_instructions}
+
+        Texte source :
+        {source}
+        """,
+        input_variables=["source"],
+        partial_variables={"format_instructions": parser.get_format_instructions()},
+    )
+
+    return prompt | llm | parser
+
+# Chaînes construites une seule fois par processus. Les runnables LangChain sont sans état
+# et peuvent être invoqués en parallèle par plusieurs threads.
+get_head_chain = lru_cache(maxsize=None)(build_head_chain)
+get_exp_chain = lru_cache(maxsize=None)(build_exp_chain)
+get_edu_chain = lru_cache(maxsize=None)(build_edu_chain)
+
+@llm_node
 def generate_structured_head_node(state: ProfileState) -> dict:
     """
     Nœud LangGraph pour générer un en-tête structuré à partir d'un texte brut.
@@ -19,45 +151,11 @@ def generate_structured_head_node(state: ProfileState) -> dict:
         dict: État mis à jour avec les informations d'en-tête
     """
     try:
-        logger.info("Initialisation du parser et du modèle...")
-
-        # Utilisation de get_llm() comme dans parallel_tasks.py
-        llm = get_llm()
-
-        # Définir le parser JSON
-        parser = JsonOutputParser(pydantic_object=GeneralInfo)
-
-        # Création du prompt
-        prompt = PromptTemplate(
-            template=(
-                """
-                Analyse le texte suivant décrivant un profil candidat et génère un JSON structuré.
-                Pour chaque champ, fournis une description concise mais exhaustive, sans phrases complètes.
-                
-                Le JSON doit contenir les champs suivants :
-                - "name": Nom complet uniquement
-                - "phone": Numéro de téléphone uniquement
-                - "email": Adresse email uniquement
-                - "general_title": Titre professionnel et profil général en quelques mots clés
-                - "skills": Liste exhaustive des compétences techniques et professionnelles, séparées par des virgules
-                - "langues": Liste des langues avec niveau et détails pertinents (certifications, séjours, etc.)
-                - "hobbies": Liste des centres d'intérêt avec détails pertinents, séparés par des virgules"
-                
-                {format_instructions}
-                
-                Texte source :
-                {source}
-                """
-            ),
-            input_variables=["source"],
-            partial_variables={"format_instructions": parser.get_format_instructions()}
-        )
-
-        # Création et exécution de la chaîne
-        json_chain = prompt | llm | parser
+        # Chaîne construite une seule fois par processus
+        json_chain = get_head_chain()
         
         logger.info("Génération de l'en-tête structuré...")
-        result = json_chain.invoke({"source": state.input_text})
+        result = yield json_chain, {"source": state.input_text}
         
         # Vérifier le type du résultat
         logger.info(f"Type du résultat: {type(result)}")
@@ -102,6 +200,7 @@ def generate_structured_head_node(state: ProfileState) -> dict:
         logger.error(f"Erreur lors de la génération de l'en-tête structuré: {str(e)}")
         raise
 
+@llm_node
 def generate_exp_node(state: ProfileState) -> dict:
     """
     Nœud LangGraph pour générer les expériences professionnelles structurées à partir d'un texte brut.
@@ -113,48 +212,11 @@ def generate_exp_node(state: ProfileState) -> dict:
         dict: État mis à jour avec les informations d'expérience
     """
     try:
-        logger.info("Initialisation du parser et du modèle pour les expériences...")
-
-        # Utilisation de get_llm()
-        llm = get_llm()
-
-        # Définir le parser JSON
-        parser = JsonOutputParser(pydantic_object=GlobalExperienceList)
-
-        # Création du prompt
-        prompt = PromptTemplate(
-            template="""
-            Analyse méticuleusement le texte suivant et extrais toutes les informations concernant les expériences professionnelles.
-            Génère un JSON structuré en incluant absolument tous les détails présents dans le texte source, sans omettre aucune information :
-            
-            Pour chaque expérience :
-            - "intitule": Intitulé exact et complet du poste
-            - "dates": Période d'emploi précise
-            - "etablissement": Nom complet de l'entreprise
-            - "lieu": Localisation détaillée
-            - "description": Description EXHAUSTIVE de l'expérience, incluant :
-              * Toutes les responsabilités mentionnées
-              * Tous les projets cités
-              * Toutes les technologies utilisées
-              * Tous les accomplissements
-              * Tout autre détail présent dans le texte source
-            
-            IMPORTANT : Ne fais aucune synthèse ou résumé. Inclus absolument tous les détails mentionnés dans le texte source.
-            
-            {format_instructions}
-            
-            Texte source :
-            {source}
-            """,
-            input_variables=["source"],
-            partial_variables={"format_instructions": parser.get_format_instructions()},
-        )
-
-        # Création et exécution de la chaîne
-        json_chain = prompt | llm | parser
+        # Chaîne construite une seule fois par processus
+        json_chain = get_exp_chain()
         
         logger.info("Génération des expériences structurées...")
-        result = json_chain.invoke({"source": state.input_text})
+        result = yield json_chain, {"source": state.input_text}
         
         # Vérifier le type du résultat
         logger.info(f"Type du résultat des expériences: {type(result)}")
@@ -183,6 +245,7 @@ def generate_exp_node(state: ProfileState) -> dict:
         logger.error(f"Erreur lors de la génération des expériences: {str(e)}")
         raise
 
+@llm_node
 def generate_edu_node(state: ProfileState) -> dict:
     """
     Nœud LangGraph pour générer les formations éducatives structurées à partir d'un texte brut.
@@ -194,48 +257,11 @@ def generate_edu_node(state: ProfileState) -> dict:
         dict: État mis à jour avec les informations d'éducation
     """
     try:
-        logger.info("Initialisation du parser et du modèle pour les formations...")
-
-        # Utilisation de get_llm()
-        llm = get_llm()
-
-        # Définir le parser JSON
-        parser = JsonOutputParser(pydantic_object=GlobalEducationList)
-
-        # Création du prompt
-        prompt = PromptTemplate(
-            template="""
-            Analyse méticuleusement le texte suivant et extrais toutes les informations concernant les formations académiques.
-            Génère un JSON structuré en incluant absolument tous les détails présents dans le texte source, sans omettre aucune information :
-            
-            Pour chaque formation :
-            - "intitule": Nom complet et exact du diplôme
-            - "dates": Période précise de formation
-            - "etablissement": Nom complet de l'institution
-            - "lieu": Localisation détaillée
-            - "description": Description EXHAUSTIVE de la formation, incluant :
-              * Toutes les spécialisations
-              * Tous les résultats académiques
-              * Tous les projets réalisés
-              * Toutes les compétences acquises
-              * Tout autre détail présent dans le texte source
-            
-            IMPORTANT : Ne fais aucune synthèse ou résumé. Inclus absolument tous les détails mentionnés dans le texte source.
-            
-            {format_instructions}
-            
-            Texte source :
-            {source}
-            """,
-            input_variables=["source"],
-            partial_variables={"format_instructions": parser.get_format_instructions()},
-        )
-
-        # Création et exécution de la chaîne
-        json_chain = prompt | llm | parser
+        # Chaîne construite une seule fois par processus
+        json_chain = get_edu_chain()
         
         logger.info("Génération des formations structurées...")
-        result = json_chain.invoke({"source": state.input_text})
+        result = yield json_chain, {"source": state.input_text}
         
         # Vérifier le type du résultat
         logger.info(f"Type du résultat des formations: {type(result)}")
@@ -264,10 +290,13 @@ def generate_edu_node(state: ProfileState) -> dict:
         logger.error(f"Erreur lors de la génération des formations: {str(e)}")
         raise
 
-def create_profile_graph() -> StateGraph:
+def create_profile_graph(use_async: bool = False) -> StateGraph:
     """
     Crée et configure le graphe d'états pour la génération de profil complet.
     
+    Args:
+        use_async (bool): Si True, les nœuds utilisent leur jumelle asynchrone (ainvoke)
+        
     Returns:
         StateGraph: Le graphe prêt à être compilé et exécuté
     """
@@ -275,9 +304,9 @@ def create_profile_graph() -> StateGraph:
     graph = StateGraph(ProfileState)
     
     # Ajout des nœuds
-    graph.add_node("extract_head", generate_structured_head_node)
-    graph.add_node("extract_experiences", generate_exp_node)
-    graph.add_node("extract_education", generate_edu_node)
+    graph.add_node("extract_head", select_node(generate_structured_head_node, use_async))
+    graph.add_node("extract_experiences", select_node(generate_exp_node, use_async))
+    graph.add_node("extract_education", select_node(generate_edu_node, use_async))
     
     # Configuration des transitions parallèles
     graph.add_edge(START, "extract_head")
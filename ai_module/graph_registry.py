@@ -0,0 +1,106 @@
+"""Registre des graphes LangGraph compilés, partagés par tous les threads du processus"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+GraphKey = Tuple[str, Tuple[Tuple[str, Hashable], ...]]
+
+class GraphRegistry:
+    """
+    Compile chaque graphe une seule fois par processus puis le réutilise.
+
+    Un graphe est identifié par son nom et par les options passées à son constructeur,
+    ce qui permet de conserver plusieurs variantes d'un même graphe.
+    Les graphes compilés sont sans état (pas de checkpointer) et peuvent donc être
+    invoqués en parallèle par plusieurs threads.
+    """
+
+    def __init__(self):
+        self._builders: Dict[str, Callable[..., Any]] = {}
+        self._compiled: Dict[GraphKey, Any] = {}
+        self._compile_times: Dict[GraphKey, float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _make_key(name: str, options: Dict[str, Hashable]) -> GraphKey:
+        return name, tuple(sorted(options.items()))
+
+    def register(self, name: str, builder: Callable[..., Any]) -> None:
+        """
+        Déclare un constructeur de graphe.
+
+        Args:
+            name (str): Nom du graphe (ex: "cv", "profile")
+            builder (Callable): Fonction retournant un StateGraph non compilé
+        """
+        self._builders[name] = builder
+
+    def get(self, name: str, **options: Hashable) -> Any:
+        """
+        Retourne le graphe compilé, en le compilant au premier appel.
+
+        Args:
+            name (str): Nom du graphe
+            **options: Options transmises au constructeur, qui identifient la variante
+
+        Returns:
+            Le graphe compilé
+        """
+        key = self._make_key(name, options)
+        compiled = self._compiled.get(key)
+        if compiled is not None:
+            return compiled
+
+        with self._lock:
+            compiled = self._compiled.get(key)
+            if compiled is None:
+                if name not in self._builders:
+                    raise KeyError(f"Aucun graphe enregistré sous le nom '{name}'")
+                start = time.perf_counter()
+                compiled = self._builders[name](**options).compile()
+                elapsed = time.perf_counter() - start
+                self._compiled[key] = compiled
+                self._compile_times[key] = elapsed
+                logger.info(f"Graphe '{name}' {dict(options) or ''} compilé en {elapsed * 1000:.2f} ms")
+        return compiled
+
+    def warm_up(self, variants: Optional[Iterable[Tuple[str, Dict[str, Hashable]]]] = None) -> float:
+        """
+        Compile à l'avance les graphes demandés (tous les graphes enregistrés par défaut).
+
+        Args:
+            variants: Liste de couples (nom, options) à compiler
+
+        Returns:
+            float: Durée totale de la compilation en secondes
+        """
+        if variants is None:
+            variants = [(name, {}) for name in self._builders]
+        start = time.perf_counter()
+        for name, options in variants:
+            self.get(name, **options)
+        return time.perf_counter() - start
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retourne les durées de compilation (en ms) de chaque variante compilée par ce processus"""
+        with self._lock:
+            return {
+                "compiled": len(self._compiled),
+                "compile_times_ms": {
+                    f"{name}{dict(options) if options else ''}": round(seconds * 1000, 2)
+                    for (name, options), seconds in self._compile_times.items()
+                },
+            }
+
+    def clear(self) -> None:
+        """Oublie les graphes compilés (ils seront recompilés au prochain accès)"""
+        with self._lock:
+            self._compiled.clear()
+            self._compile_times.clear()
+
+
+graph_registry = GraphRegistry()
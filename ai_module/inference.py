@@ -1,11 +1,35 @@
-from ai_module.chains_gen_cv.gen_cv_chain import create_cv_chain
+from ai_module.chains_gen_cv.gen_cv_chain import create_cv_chain, create_cv_summaries_graph
 from ai_module.lg_models import CVGenState, ProfileState
 from ai_module.chains_gen_profile.generate_profile_chain import create_profile_graph
+from ai_module.graph_registry import graph_registry
 import logging
-from typing import Dict
+from typing import Any, Dict, Iterator, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Les graphes sont compilés une seule fois par processus
+graph_registry.register("cv", create_cv_chain)
+graph_registry.register("profile", create_profile_graph)
+graph_registry.register("cv_summaries", create_cv_summaries_graph)
+
+def warm_up_graphs() -> float:
+    """
+    Compile tous les graphes à l'avance, typiquement au démarrage d'un worker gunicorn.
+    
+    Returns:
+        float: Durée de la compilation en secondes
+    """
+    elapsed = graph_registry.warm_up([
+        ("cv", {}),
+        ("profile", {}),
+        ("cv", {"use_async": True}),
+        ("profile", {"use_async": True}),
+        ("cv_summaries", {}),
+        ("cv", {"precomputed_summaries": True}),
+    ])
+    logger.info(f"Graphes compilés au démarrage en {elapsed * 1000:.2f} ms")
+    return elapsed
+
 def generate_profile(profile_state: ProfileState) -> ProfileState:
     """
     Exécute le workflow LangGraph pour extraire les informations structurées d'un CV brut
@@ -19,8 +43,8 @@ def generate_profile(profile_state: ProfileState) -> ProfileState:
     logger.info("Démarrage de l'extraction du profil avec LangGraph")
     
     try:
-        # Création et compilation du graphe
-        profile_graph = create_profile_graph().compile()
+        # Graphe compilé une seule fois par processus
+        profile_graph = graph_registry.get("profile")
         
         # Exécution du graphe
         result = profile_graph.invoke(profile_state)
@@ -37,12 +61,38 @@ def generate_profile(profile_state: ProfileState) -> ProfileState:
         return profile_state
 
 
-def generate_cv(state: CVGenState) -> CVGenState:
+def summarize_profile_for_cv(state: CVGenState) -> CVGenState:
+    """
+    Calcule les résumés des expériences et des formations, qui ne dépendent pas du poste visé.
+    L'état retourné peut servir de base à plusieurs appels à generate_cv(..., precomputed_summaries=True).
+    
+    Args:
+        state (CVGenState): L'état initial contenant les données brutes du profil
+        
+    Returns:
+        CVGenState: L'état avec les résumés des expériences et des formations
+    """
+    logger.info("Calcul des résumés des expériences et formations avec LangChain")
+    
+    try:
+        summaries_graph = graph_registry.get("cv_summaries")
+        
+        result = summaries_graph.invoke(state)
+        
+        return CVGenState.from_dict(result)
+    except Exception as e:
+        logger.error(f"Erreur lors du calcul des résumés du profil: {str(e)}", exc_info=True)
+        raise
+
+
+def generate_cv(state: CVGenState, precomputed_summaries: bool = False) -> CVGenState:
     """
     Exécute la chaîne de traitement LangChain pour générer un CV optimisé
     
     Args:
         state (CVGenState): L'état global initial contenant les données brutes du profil
+        precomputed_summaries (bool): Si True, l'état porte déjà les résumés calculés par
+            summarize_profile_for_cv et seuls les nœuds dépendant du poste sont exécutés
         
     Returns:
         CVGenState: L'état global mis à jour avec les données optimisées pour le CV
@@ -50,8 +100,11 @@ def generate_cv(state: CVGenState) -> CVGenState:
     logger.info("Démarrage de la génération du CV avec LangChain")
     
     try:
-        # Obtenir le graphe compilé (lazy loading)
-        compiled_gencv_graph = create_cv_chain().compile()
+        # Obtenir le graphe compilé (compilé au démarrage ou au premier appel)
+        if precomputed_summaries:
+            compiled_gencv_graph = graph_registry.get("cv", precomputed_summaries=True)
+        else:
+            compiled_gencv_graph = graph_registry.get("cv")
         
         result = compiled_gencv_graph.invoke(state)
                 
@@ -66,3 +119,93 @@ def generate_cv(state: CVGenState) -> CVGenState:
         logger.error(f"Erreur lors de la génération du CV: {str(e)}", exc_info=True)
         # En cas d'erreur, on lève l'exception pour la gérer au niveau supérieur
         raise
+
+
+def stream_cv(state: CVGenState) -> Iterator[Tuple[str, Any]]:
+    """
+    Exécute le graphe de génération de CV en émettant un événement à chaque fin de nœud.
+    
+    Les événements sont des tuples (type, valeur):
+      - ("node", nom_du_noeud): émis dès qu'une tâche du graphe se termine
+      - ("state", CVGenState): état consolidé à la fin de chaque étape du graphe
+    Le dernier événement "state" contient le résultat final.
+    
+    Args:
+        state (CVGenState): L'état global initial contenant les données brutes du profil
+        
+    Yields:
+        Tuple[str, Any]: Type de l'événement et sa valeur
+    """
+    logger.info("Démarrage de la génération du CV en streaming avec LangChain")
+    
+    try:
+        compiled_gencv_graph = graph_registry.get("cv")
+        
+        # "updates" signale chaque nœud terminé, "values" donne l'état complet après chaque étape
+        for mode, chunk in compiled_gencv_graph.stream(state, stream_mode=["updates", "values"]):
+            if mode == "updates":
+                for node_name in chunk:
+                    yield "node", node_name
+            else:
+                yield "state", CVGenState.from_dict(chunk)
+        
+        logger.info("Génération du CV en streaming terminée avec succès")
+    except Exception as e:
+        logger.error(f"Erreur lors de la génération du CV en streaming: {str(e)}", exc_info=True)
+        raise
+
+
+async def agenerate_profile(profile_state: ProfileState) -> ProfileState:
+    """
+    Version asynchrone de generate_profile: les nœuds appellent le LLM via ainvoke.
+    
+    Args:
+        profile_state (ProfileState): L'état contenant le texte brut à analyser
+        
+    Returns:
+        ProfileState: L'état mis à jour avec les informations extraites (head, experiences, education)
+    """
+    logger.info("Démarrage de l'extraction du profil avec LangGraph (asyncio)")
+    
+    try:
+        profile_graph = graph_registry.get("profile", use_async=True)
+        
+        result = await profile_graph.ainvoke(profile_state)
+
+        result = ProfileState.from_dict(result)
+        
+        logger.info("Extraction du profil terminée avec succès")
+        
+        return result
+    except Exception as e:
+        logger.error(f"Erreur lors de l'extraction du profil: {str(e)}", exc_info=True)
+        # En cas d'erreur, on retourne l'état initial
+        return profile_state
+
+
+async def agenerate_cv(state: CVGenState) -> CVGenState:
+    """
+    Version asynchrone de generate_cv: les branches parallèles du graphe sont des
+    coroutines sur une seule boucle au lieu d'occuper un thread chacune.
+    
+    Args:
+        state (CVGenState): L'état global initial contenant les données brutes du profil
+        
+    Returns:
+        CVGenState: L'état global mis à jour avec les données optimisées pour le CV
+    """
+    logger.info("Démarrage de la génération du CV avec LangChain (asyncio)")
+    
+    try:
+        compiled_gencv_graph = graph_registry.get("cv", use_async=True)
+        
+        result = await compiled_gencv_graph.ainvoke(state)
+                
+        result = CVGenState.from_dict(result)
+        
+        logger.info("Génération du CV terminée avec succès")
+        
+        return result
+    except Exception as e:
+        logger.error(f"Erreur lors de la génération du CV: {str(e)}", exc_info=True)
+        raise
@@ -1,10 +1,151 @@
 """Configuration commune du LLM pour tous les modèles"""
 
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple, Type
+
+import httpx
 from langchain_openai import ChatOpenAI
 
-def get_llm(model: str = "gpt-4o-mini", temperature: float = 0.2):
-    """Retourne une instance configurée du LLM"""
-    return ChatOpenAI(
-        model=model,
-        temperature=temperature
-    )
\ No newline at end of file
+from backend.config import load_config
+
+# Limites du pool de connexions HTTP partagé par tous les clients du processus
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "16"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+LLM_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "120"))
+
+
+class ConnectionStats:
+    """Compte les requêtes HTTP et les nouvelles connexions ouvertes vers l'API OpenAI"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def record_new_connection(self) -> None:
+        with self._lock:
+            self.new_connections += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "reused_connections": max(self.requests - self.new_connections, 0),
+            }
+
+
+connection_stats = ConnectionStats()
+
+
+def _trace(event_name: str, info: dict) -> None:
+    """Trace httpcore: une connexion TCP terminée correspond à une nouvelle connexion"""
+    if event_name == "connection.connect_tcp.complete":
+        connection_stats.record_new_connection()
+
+
+async def _atrace(event_name: str, info: dict) -> None:
+    _trace(event_name, info)
+
+
+def _on_request(request: httpx.Request) -> None:
+    connection_stats.record_request()
+    request.extensions["trace"] = _trace
+
+
+async def _aon_request(request: httpx.Request) -> None:
+    connection_stats.record_request()
+    request.extensions["trace"] = _atrace
+
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+    )
+
+
+_http_client: Optional[httpx.Client] = None
+_http_async_client: Optional[httpx.AsyncClient] = None
+_llm_cache: Dict[Tuple[str, float, Optional[Type[Any]], Optional[str]], Any] = {}
+_lock = threading.RLock()
+
+
+def get_http_client() -> httpx.Client:
+    """Retourne le client HTTP synchrone partagé (pool de connexions keep-alive)"""
+    global _http_client
+    if _http_client is None:
+        with _lock:
+            if _http_client is None:
+                _http_client = httpx.Client(
+                    limits=_pool_limits(),
+                    timeout=LLM_HTTP_TIMEOUT,
+                    event_hooks={"request": [_on_request]},
+                )
+    return _http_client
+
+
+def get_http_async_client() -> httpx.AsyncClient:
+    """Retourne le client HTTP asynchrone partagé (pool de connexions keep-alive)"""
+    global _http_async_client
+    if _http_async_client is None:
+        with _lock:
+            if _http_async_client is None:
+                _http_async_client = httpx.AsyncClient(
+                    limits=_pool_limits(),
+                    timeout=LLM_HTTP_TIMEOUT,
+                    event_hooks={"request": [_aon_request]},
+                )
+    return _http_async_client
+
+
+def get_llm(model: str = "gpt-4o-mini", temperature: float = 0.2, schema: Optional[Type[Any]] = None):
+    """
+    Retourne une instance configurée du LLM, partagée par tous les appels ayant la même clé.
+
+    Args:
+        model (str): Nom du modèle OpenAI
+        temperature (float): Température d'échantillonnage
+        schema (Optional[Type]): Modèle pydantic de sortie structurée. Doit être une classe
+            définie au niveau module, sinon chaque appel créerait une nouvelle entrée.
+
+    Returns:
+        Le modèle de chat, éventuellement enveloppé par with_structured_output
+    """
+    # Clé résolue par la configuration (variable d'environnement, fichier local ou Secret Manager);
+    # après une rotation du secret, de nouveaux clients sont créés avec la nouvelle clé
+    api_key = load_config().OPENAI_API_KEY
+    key = (model, temperature, schema, api_key)
+    llm = _llm_cache.get(key)
+    if llm is not None:
+        return llm
+
+    with _lock:
+        llm = _llm_cache.get(key)
+        if llm is None:
+            if schema is not None:
+                llm = get_llm(model, temperature).with_structured_output(schema)
+            else:
+                llm = ChatOpenAI(
+                    model=model,
+                    temperature=temperature,
+                    api_key=api_key,
+                    http_client=get_http_client(),
+                    http_async_client=get_http_async_client(),
+                )
+            _llm_cache[key] = llm
+    return llm
+
+
+def get_llm_stats() -> Dict[str, int]:
+    """Retourne les compteurs de réutilisation des connexions et la taille du cache de clients"""
+    stats = connection_stats.snapshot()
+    stats["cached_clients"] = len(_llm_cache)
+    return stats
@@ -0,0 +1,68 @@
+"""
+Nœuds LangGraph exécutables en synchrone ou en asyncio à partir d'une seule définition.
+
+Un nœud décoré par `llm_node` est un générateur qui cède ses appels LLM sous la forme
+`response = yield runnable, entree` au lieu d'appeler `runnable.invoke(entree)`.
+Le décorateur retourne la version synchrone du nœud (appels via `invoke`) et expose
+sa jumelle asynchrone (appels via `ainvoke`) dans l'attribut `async_node`.
+"""
+
+from functools import wraps
+from typing import Any, Callable, Generator, Tuple
+
+LLMCall = Tuple[Any, Any]
+NodeGenerator = Generator[LLMCall, Any, dict]
+
+
+def llm_node(step: Callable[[Any], NodeGenerator]) -> Callable[[Any], dict]:
+    """
+    Transforme un nœud générateur en nœud LangGraph synchrone doté d'une jumelle asynchrone.
+
+    Args:
+        step (Callable): Fonction génératrice recevant l'état et cédant (runnable, entree)
+
+    Returns:
+        Callable: Le nœud synchrone, avec l'attribut `async_node`
+    """
+    @wraps(step)
+    def node(state):
+        gen = step(state)
+        try:
+            runnable, payload = next(gen)
+            while True:
+                try:
+                    response = runnable.invoke(payload)
+                except Exception as e:
+                    runnable, payload = gen.throw(e)
+                else:
+                    runnable, payload = gen.send(response)
+        except StopIteration as stop:
+            return stop.value
+
+    # LangGraph déduit le schéma d'entrée du nœud de ses annotations: les conserver
+    @wraps(step)
+    async def async_node(state):
+        gen = step(state)
+        try:
+            runnable, payload = next(gen)
+            while True:
+                try:
+                    response = await runnable.ainvoke(payload)
+                except Exception as e:
+                    runnable, payload = gen.throw(e)
+                else:
+                    runnable, payload = gen.send(response)
+        except StopIteration as stop:
+            return stop.value
+
+    async_node.__name__ = f"a{step.__name__}"
+    async_node.__qualname__ = f"a{step.__qualname__}"
+    node.async_node = async_node
+    return node
+
+
+def select_node(node: Callable, use_async: bool) -> Callable:
+    """Retourne la jumelle asynchrone du nœud si demandée et disponible, sinon le nœud lui-même"""
+    if use_async:
+        return getattr(node, "async_node", node)
+    return node
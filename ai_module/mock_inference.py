@@ -1,5 +1,5 @@
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, Tuple
 from ai_module.lg_models import ProfileState, CVGenState, GeneralInfo, GlobalExperience, GlobalEducation, CVExperience, CVEducation, CVLanguage
 
 logger = logging.getLogger(__name__)
@@ -92,12 +92,31 @@ def generate_profile(profile_state: ProfileState) -> ProfileState:
     return profile_state
 
 
-def generate_cv(state: CVGenState) -> CVGenState:
+def summarize_profile_for_cv(state: CVGenState) -> CVGenState:
+    """
+    Mock de summarize_profile_for_cv: renseigne des résumés fictifs.
+    
+    Args:
+        state (CVGenState): L'état initial
+        
+    Returns:
+        CVGenState: L'état avec les résumés des expériences et des formations
+    """
+    logger.info("Utilisation du mock summarize_profile_for_cv")
+    for exp in state.experiences:
+        exp.summary = f"Résumé de l'expérience {exp.title_raw}"
+    for edu in state.education:
+        edu.summary = f"Résumé de la formation {edu.degree_raw}"
+    return state
+
+
+def generate_cv(state: CVGenState, precomputed_summaries: bool = False) -> CVGenState:
     """
     Mock de la fonction generate_cv qui retourne un CVGenState modifié avec des valeurs statiques.
     
     Args:
         state (CVGenState): L'état global initial
+        precomputed_summaries (bool): Ignoré par le mock
         
     Returns:
         CVGenState: L'état global modifié avec des valeurs mock
@@ -219,4 +238,42 @@ def generate_cv(state: CVGenState) -> CVGenState:
             )
         ]
     
-    return state
\ No newline at end of file
+    return state
+
+
+async def agenerate_profile(profile_state: ProfileState) -> ProfileState:
+    """Mock asynchrone de generate_profile"""
+    return generate_profile(profile_state)
+
+
+async def agenerate_cv(state: CVGenState) -> CVGenState:
+    """Mock asynchrone de generate_cv"""
+    return generate_cv(state)
+
+
+# Nœuds émis par le mock de stream_cv, dans l'ordre d'exécution du vrai graphe
+MOCK_STREAM_NODES = [
+    "detect_language", "summarize_job", "summarize_exp_orch", "summarize_edu_orch",
+    "exp_worker", "edu_worker", "synth_sumup_exp", "synth_sumup_edu", "agg_sum",
+    "select_exp", "give_nb_bullets", "write_bullets", "synth_sumup_bullets",
+    "select_edu_and_give_nb_mots", "write_edu_description", "synth_sumup_edu_description",
+    "translate_and_harmonize_exp", "translate_and_harmonize_edu",
+    "translate_sections", "give_title", "give_phone",
+    "generate_hobbies_text", "generate_skills_text", "translate_langues",
+]
+
+
+def stream_cv(state: CVGenState) -> Iterator[Tuple[str, Any]]:
+    """
+    Mock de stream_cv: émet les nœuds du graphe puis l'état final de generate_cv.
+    
+    Args:
+        state (CVGenState): L'état global initial
+        
+    Yields:
+        Tuple[str, Any]: Type de l'événement ("node" ou "state") et sa valeur
+    """
+    logger.info("Utilisation du mock stream_cv")
+    for node_name in MOCK_STREAM_NODES:
+        yield "node", node_name
+    yield "state", generate_cv(state)
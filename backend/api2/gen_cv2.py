@@ -1,12 +1,23 @@
+import asyncio
+import json
 import logging
 import time
 import os
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
 from backend.config import load_config
 from dotenv import load_dotenv
-from backend.models import ProfileDocument, CVDocument, CallDocument, UsageDocument
+from backend.base_firestore import FirestoreModel, single_read_latency
+from backend.models import ProfileDocument, CVDocument, CallDocument
 from ai_module.lg_models import CVGenState
-from flask import jsonify
+from flask import jsonify, Response, stream_with_context
+from ai_module.async_runner import run_async
 from backend.utils.utils_gcs2 import upload_to_firebase_storage
+from backend.jobs import get_job_runner, JobQueueFullError
+from backend.single_flight import coalesce_generation, make_flight_key
+from backend.metrics import metrics
+from backend.session import firestore_session, flush_current_session
+from backend.usage_limiter import record_usage
+from backend.call_log import log_call
 
 load_dotenv()
 logger = logging.getLogger(__name__)
@@ -14,77 +25,479 @@ config = load_config()
 
 # Import conditionnel basé sur la configuration
 if config.MOCK_OPENAI:
-    from ai_module.mock_inference import generate_cv
+    from ai_module.mock_inference import generate_cv, agenerate_cv, stream_cv
 else:
-    from ai_module.inference import generate_cv
+    from ai_module.inference import generate_cv, agenerate_cv, stream_cv
 
-def generate_cv_endpoint(user_id: str, cv_id: str):
+class CVGenerationError(Exception):
+    """Erreur métier de la génération de CV, associée à un code HTTP"""
+
+    def __init__(self, message: str, status_code: int = 500):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def _noop_progress(step: str, percent: int) -> None:
+    pass
+
+
+def record_cv_call(user_id: str, call_recorded: bool = False) -> None:
     """
-    Endpoint pour générer un CV structuré.
-    Version 2 de l'API utilisant ProfileDocument et CVDocument.
+    Enregistre l'appel et incrémente l'usage de l'utilisateur (incrément atomique, sans lecture).
+    
+    Args:
+        user_id (str): ID de l'utilisateur
+        call_recorded (bool): Si True, le document d'appel a déjà été écrit (aprefetch_cv_generation)
+    """
+    if not call_recorded:
+        CallDocument.create_call(user_id, "generate_cv_v2")
+    record_usage(user_id)
+
+
+# Documents lus en amont par prefetch_cv_generation: (profil, CV)
+PrefetchedDocuments = Tuple[Optional[ProfileDocument], Optional[CVDocument]]
+
+
+def build_read_stats(mode: str, documents_read: int, elapsed_ms: float) -> Dict[str, Any]:
+    """
+    Construit les statistiques d'une lecture groupée de documents.
+    Le temps gagné compare la lecture groupée à autant de lectures successives que de documents,
+    chacune de la durée moyenne mesurée des lectures unitaires du processus (get_by_id).
+    
+    Args:
+        mode (str): "batch" (get_all) ou "gather" (lectures asynchrones concurrentes)
+        documents_read (int): Nombre de documents lus
+        elapsed_ms (float): Durée mesurée de la lecture groupée
+        
+    Returns:
+        Dict[str, Any]: Statistiques; ms_saved vaut None tant qu'aucune lecture unitaire n'a été mesurée
+    """
+    round_trips_saved = documents_read - 1
+    single_read_ms = single_read_latency.average_ms()
+    ms_saved = None
+    if single_read_ms is not None:
+        ms_saved = round(documents_read * single_read_ms - elapsed_ms, 2)
+    metrics.increment("firestore.batched_reads.round_trips_saved", round_trips_saved)
+    return {
+        "mode": mode,
+        "documents_read": documents_read,
+        "round_trips_saved": round_trips_saved,
+        "batch_read_ms": round(elapsed_ms, 2),
+        "single_read_ms": round(single_read_ms, 2) if single_read_ms is not None else None,
+        "ms_saved": ms_saved,
+    }
+
+
+def format_ms_saved(read_stats: Dict[str, Any]) -> str:
+    """Texte du temps gagné pour les logs"""
+    if read_stats["ms_saved"] is None:
+        return "temps gagné inconnu: aucune lecture unitaire mesurée"
+    return f"{read_stats['ms_saved']:.2f} ms gagnées"
+
+
+def prefetch_cv_generation(user_id: str, cv_id: str) -> Tuple[PrefetchedDocuments, Dict[str, Any]]:
+    """
+    Lit en un seul appel Firestore le profil et le CV nécessaires à la génération,
+    au lieu de deux lectures successives.
     
     Args:
         user_id (str): ID de l'utilisateur
         cv_id (str): ID du document CV dans Firestore
         
     Returns:
-        Response: Réponse JSON avec le CV généré
+        Tuple: Les documents (profil, CV) à passer à run_cv_generation, et les statistiques de lecture
     """
-    start_time = time.time()
-    try:
+    start = time.perf_counter()
+    profile_document, cv_document = FirestoreModel.get_many([
+        (ProfileDocument, user_id),
+        (CVDocument, cv_id),
+    ])
+    elapsed_ms = (time.perf_counter() - start) * 1000
 
-    # Créer un document d'appel et incrémenter l'usage
-        CallDocument.create_call(user_id, "generate_cv_v2")
-        usage_doc = UsageDocument.get_or_create(user_id)
-        usage_doc.increment_usage()
-        logger.info(f"Génération du CV {cv_id} pour l'utilisateur {user_id}")
+    # Une lecture groupée au lieu de deux lectures successives
+    read_stats = build_read_stats("batch", 2, elapsed_ms)
+    logger.info(
+        f"Lecture groupée profil/CV en {elapsed_ms:.2f} ms: "
+        f"{read_stats['round_trips_saved']} aller-retour Firestore évité ({format_ms_saved(read_stats)})"
+    )
+    return (profile_document, cv_document), read_stats
 
-        # Récupérer le profil existant
-        profile_document = ProfileDocument.from_firestore_id(user_id)
-        if not profile_document:
-            logger.warning(f"Profil avec l'ID {user_id} non trouvé dans Firestore")
-            return jsonify({"error": "Profil non trouvé"}), 404
+
+async def aprefetch_cv_generation(user_id: str, cv_id: str) -> Tuple[PrefetchedDocuments, Dict[str, Any]]:
+    """
+    Variante asynchrone de prefetch_cv_generation: les lectures du profil et du CV
+    sont lancées ensemble avec asyncio.gather. Le document d'appel n'est écrit qu'une
+    fois les lectures réussies, pour ne pas journaliser un appel qui échoue aussitôt.
+    Exécutée sur la boucle partagée, hors de la session de la requête: les documents lus
+    sont passés explicitement à la suite de la génération.
+    
+    Args:
+        user_id (str): ID de l'utilisateur
+        cv_id (str): ID du document CV dans Firestore
         
-        # Récupérer le job_raw à partir du cv dans la collection cvs
-        cv_document = CVDocument.from_firestore_id(cv_id)
-        if not cv_document:
-            logger.warning(f"CV avec l'ID {cv_id} non trouvé dans Firestore")
-            return jsonify({"error": "CV non trouvé"}), 404
-            
-        job_raw = cv_document.job_raw if hasattr(cv_document, 'job_raw') else ""
+    Returns:
+        Tuple: Mêmes valeurs que prefetch_cv_generation; le document d'appel est déjà écrit
+    """
+    start = time.perf_counter()
+    profile_document, cv_document = await asyncio.gather(ProfileDocument.aget(user_id), CVDocument.aget(cv_id))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    call = CallDocument(user_id=user_id, endpoint="generate_cv_v2")
+    if config.CALL_LOG_BUFFERED:
+        # Document d'appel écrit en arrière-plan par le journal des appels, sans bloquer la boucle
+        log_call(call, block=False)
+    else:
+        await call.asave()
+
+    # Lectures concurrentes au lieu de deux allers-retours successifs
+    read_stats = build_read_stats("gather", 2, elapsed_ms)
+    logger.info(
+        f"Lecture profil/CV en parallèle en {elapsed_ms:.2f} ms: "
+        f"{read_stats['round_trips_saved']} aller(s)-retour(s) Firestore évité(s) ({format_ms_saved(read_stats)})"
+    )
+    return (profile_document, cv_document), read_stats
+
+
+def prefetch_and_record_call(user_id: str, cv_id: str) -> Tuple[PrefetchedDocuments, Dict[str, Any]]:
+    """
+    Lit le profil et le CV, enregistre l'appel et incrémente l'usage.
+    Avec ASYNC_FIRESTORE, les appels Firestore sont concurrents sur le client asynchrone.
+    
+    Args:
+        user_id (str): ID de l'utilisateur
+        cv_id (str): ID du document CV dans Firestore
         
-        # Créer un objet CVGenState à partir du profil et du job_raw
-        cv_state = CVGenState.from_profile_document(profile_document, cv_document.cv_name, job_raw)
+    Returns:
+        Tuple: Les documents (profil, CV) à passer à run_cv_generation et les statistiques de lecture
+    """
+    if config.ASYNC_FIRESTORE:
+        prefetched, read_stats = run_async(aprefetch_cv_generation(user_id, cv_id), timeout=config.ASYNC_FIRESTORE_TIMEOUT)
+        record_cv_call(user_id, call_recorded=True)
+    else:
+        prefetched, read_stats = prefetch_cv_generation(user_id, cv_id)
+        record_cv_call(user_id)
+    return prefetched, read_stats
+
+
+def load_cv_generation_inputs(user_id: str, cv_id: str,
+                              prefetched: Optional[PrefetchedDocuments] = None) -> Tuple[CVDocument, CVGenState]:
+    """
+    Charge le profil et le CV, puis construit l'état initial du graphe.
+    
+    Args:
+        user_id (str): ID de l'utilisateur
+        cv_id (str): ID du document CV dans Firestore
+        prefetched (Optional[PrefetchedDocuments]): Profil et CV déjà lus par prefetch_cv_generation
         
-        # Appel synchrone à generate_cv
-        cv_state = generate_cv(cv_state)
+    Returns:
+        Tuple[CVDocument, CVGenState]: Le document CV et l'état initial de la génération
         
-        # Mettre à jour le CVDocument
-        cv_document.update_from_cv_state(cv_state)
+    Raises:
+        CVGenerationError: Si le profil ou le CV est introuvable
+    """
+    if prefetched is not None:
+        profile_document, cv_document = prefetched
+    else:
+        profile_document = ProfileDocument.from_firestore_id(user_id)
+        cv_document = CVDocument.from_firestore_id(cv_id)
+
+    # Vérifier le profil existant
+    if not profile_document:
+        logger.warning(f"Profil avec l'ID {user_id} non trouvé dans Firestore")
+        raise CVGenerationError("Profil non trouvé", 404)
+    
+    # Vérifier le cv dans la collection cvs, qui porte le job_raw
+    if not cv_document:
+        logger.warning(f"CV avec l'ID {cv_id} non trouvé dans Firestore")
+        raise CVGenerationError("CV non trouvé", 404)
         
-        # Sauvegarde synchrone
-        cv_document.save()
+    job_raw = cv_document.job_raw if hasattr(cv_document, 'job_raw') else ""
+    
+    # Créer un objet CVGenState à partir du profil et du job_raw
+    cv_state = CVGenState.from_profile_document(profile_document, cv_document.cv_name, job_raw)
+    return cv_document, cv_state
+
+
+def finalize_cv_generation(user_id: str, cv_id: str, cv_document: CVDocument, cv_state: CVGenState,
+                           progress: Callable[[str, int], None] = _noop_progress) -> Dict[str, Any]:
+    """
+    Sauvegarde le CV généré, produit le PDF et l'upload vers le stockage.
+    
+    Args:
+        user_id (str): ID de l'utilisateur
+        cv_id (str): ID du document CV dans Firestore
+        cv_document (CVDocument): Document CV à mettre à jour
+        cv_state (CVGenState): État final du graphe de génération
+        progress (Callable): Callback appelé avec (étape, pourcentage)
         
-        # Générer le PDF
-        output_dir = os.path.join("temp", user_id, "cvs")
-        os.makedirs(output_dir, exist_ok=True)
-        output_path = os.path.join(output_dir, f"{cv_document.cv_name}.pdf")
+    Returns:
+        Dict[str, Any]: URL du CV généré
+    """
+    # Mettre à jour le CVDocument
+    # (dans une session, les sauvegardes successives du document donnent une seule écriture)
+    progress("saving", 70)
+    cv_document.update_from_cv_state(cv_state)
+    
+    # Sauvegarde synchrone
+    cv_document.save()
+    
+    # Générer le PDF
+    progress("rendering_pdf", 80)
+    output_dir = os.path.join("temp", user_id, "cvs")
+    os.makedirs(output_dir, exist_ok=True)
+    # Nommé par cv_id: plusieurs CV du même nom peuvent être rendus en parallèle
+    output_path = os.path.join(output_dir, f"{cv_id}.pdf")
+    
+    # Générer le PDF
+    cv_document.cv_data.generate_pdf(output_path, user_id=user_id)
+    
+    # Upload du PDF vers GCS
+    progress("uploading", 90)
+    cv_url = upload_to_firebase_storage(output_path, user_id, cv_id)
+    
+    # Mettre à jour l'URL du CV dans le document
+    cv_document.cv_url = cv_url
+    cv_document.save()
+
+    # Dans une session, le CV est écrit avant que le résultat soit retourné ou partagé
+    # avec les requêtes regroupées: une erreur d'écriture fait échouer la génération
+    flush_current_session()
+
+    return {"cv_id": cv_id, "cv_url": cv_url}
+
+
+def run_cv_generation(user_id: str, cv_id: str, progress: Callable[[str, int], None] = _noop_progress,
+                      prefetched: Optional[PrefetchedDocuments] = None) -> Dict[str, Any]:
+    """
+    Génère le CV, le sauvegarde, produit le PDF et l'upload vers le stockage.
+    Ne dépend pas du contexte Flask: utilisable depuis un job en arrière-plan.
+    
+    Args:
+        user_id (str): ID de l'utilisateur
+        cv_id (str): ID du document CV dans Firestore
+        progress (Callable): Callback appelé avec (étape, pourcentage)
+        prefetched (Optional[PrefetchedDocuments]): Profil et CV déjà lus par prefetch_cv_generation
         
-        # Générer le PDF
-        cv_document.cv_data.generate_pdf(output_path, user_id=user_id)
+    Returns:
+        Dict[str, Any]: URL du CV généré
         
-        # Upload du PDF vers GCS
-        cv_url = upload_to_firebase_storage(output_path, user_id, cv_id)
+    Raises:
+        CVGenerationError: Si le profil ou le CV est introuvable
+    """
+    logger.info(f"Génération du CV {cv_id} pour l'utilisateur {user_id}")
+    progress("loading", 5)
+    cv_document, cv_state = load_cv_generation_inputs(user_id, cv_id, prefetched)
+
+    def generate_and_finalize() -> Dict[str, Any]:
+        progress("generating", 10)
+        if config.ASYNC_GRAPHS:
+            # Exécution sur la boucle asyncio partagée: une coroutine par branche du graphe
+            state = run_async(agenerate_cv(cv_state))
+        else:
+            # Appel synchrone à generate_cv
+            state = generate_cv(cv_state)
         
-        # Mettre à jour l'URL du CV dans le document
-        cv_document.cv_url = cv_url
-        cv_document.save()
+        return finalize_cv_generation(user_id, cv_id, cv_document, state, progress)
+
+    # Les requêtes identiques en cours (double clic, nouvel essai) partagent une seule génération.
+    # Les identifiants exp_id / edu_id sont tirés au hasard à chaque chargement: exclus de l'empreinte.
+    inputs = cv_state.model_dump(mode="json", exclude={
+        "experiences": {"__all__": {"exp_id"}},
+        "education": {"__all__": {"edu_id"}},
+    })
+    result, shared = coalesce_generation(make_flight_key(user_id, cv_id, inputs), generate_and_finalize)
+    if shared:
+        logger.info(f"CV {cv_id}: résultat partagé avec une génération identique en cours")
+    return result
+
+
+def generate_cv_endpoint(user_id: str, cv_id: str):
+    """
+    Endpoint pour générer un CV structuré.
+    Version 2 de l'API utilisant ProfileDocument et CVDocument.
+    
+    Args:
+        user_id (str): ID de l'utilisateur
+        cv_id (str): ID du document CV dans Firestore
+        
+    Returns:
+        Response: Réponse JSON avec le CV généré
+    """
+    start_time = time.time()
+    try:
+
+        # Lecture groupée du profil et du CV, document d'appel et incrément de l'usage
+        # (l'usage est vérifié avant l'endpoint par check_rate_limit)
+        prefetched, read_stats = prefetch_and_record_call(user_id, cv_id)
+
+        result = run_cv_generation(user_id, cv_id, prefetched=prefetched)
         
         execution_time = time.time() - start_time
         logger.info(f"CV généré et sauvegardé pour l'utilisateur {user_id} en {execution_time:.2f} secondes")
-        return jsonify({"success": True, "execution_time": execution_time, "cv_url": cv_url}), 200
+        return jsonify({
+            "success": True,
+            "execution_time": execution_time,
+            "cv_url": result["cv_url"],
+            "firestore_reads": read_stats
+        }), 200
+
+    except CVGenerationError as e:
+        return jsonify({"error": e.message}), e.status_code
         
     except Exception as e:
         execution_time = time.time() - start_time
         logger.error(f"Erreur lors de la génération du CV après {execution_time:.2f} secondes: {str(e)}", exc_info=True)
         return jsonify({"error": str(e), "execution_time": execution_time}), 500
+
+
+def generate_cv_async_endpoint(user_id: str, cv_id: str):
+    """
+    Endpoint asynchrone de génération de CV: met la génération en file et
+    retourne immédiatement 202 avec l'ID du job à suivre sur /api/v2/jobs/<job_id>.
+    
+    Args:
+        user_id (str): ID de l'utilisateur
+        cv_id (str): ID du document CV dans Firestore
+        
+    Returns:
+        Response: Réponse JSON avec l'ID du job
+    """
+    try:
+        job_id = get_job_runner().submit(
+            user_id,
+            "generate_cv",
+            {"cv_id": cv_id},
+            lambda progress: run_cv_generation(user_id, cv_id, progress)
+        )
+        # Appel facturé seulement une fois le job accepté (pas sur un refus 503)
+        record_cv_call(user_id)
+
+        return jsonify({
+            "success": True,
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": f"/api/v2/jobs/{job_id}"
+        }), 202
+
+    except JobQueueFullError as e:
+        logger.warning(f"File des jobs pleine, génération du CV {cv_id} refusée")
+        return jsonify({"error": str(e)}), 503
+
+    except Exception as e:
+        logger.error(f"Erreur lors de la mise en file de la génération du CV: {str(e)}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """
+    Formate un événement server-sent events.
+    
+    Args:
+        event (str): Nom de l'événement
+        data (Dict[str, Any]): Données de l'événement, sérialisées en JSON
+        
+    Returns:
+        str: L'événement prêt à être envoyé
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _cv_data_snapshot(cv_document: CVDocument, cv_state: CVGenState) -> Dict[str, Any]:
+    """Retourne le cv_data correspondant à l'état, sans sauvegarde dans Firestore"""
+    cv_document.update_from_cv_state(cv_state, save_to_firestore=False)
+    return cv_document.cv_data.model_dump(mode="json")
+
+
+def stream_cv_generation(user_id: str, cv_id: str, cv_document: CVDocument, cv_state: CVGenState,
+                         start_time: Optional[float] = None) -> Iterator[str]:
+    """
+    Exécute la génération et émet sa progression au format server-sent events.
+    
+    Événements émis:
+      - node: un nœud du graphe est terminé ({"node", "completed"})
+      - cv_data: champs de cv_data modifiés depuis le dernier envoi ({"fields"})
+      - step: début de la finalisation (sauvegarde, PDF, upload)
+      - done: CV sauvegardé et uploadé ({"cv_id", "cv_url", "execution_time"})
+      - error: échec de la génération ({"error"})
+    
+    Args:
+        user_id (str): ID de l'utilisateur
+        cv_id (str): ID du document CV dans Firestore
+        cv_document (CVDocument): Document CV chargé
+        cv_state (CVGenState): État initial de la génération
+        start_time (Optional[float]): Début de la requête, pour le temps d'exécution
+        
+    Yields:
+        str: Événements SSE
+    """
+    start_time = start_time or time.time()
+    try:
+        # Référence: seuls les champs modifiés par les nœuds sont envoyés
+        sent_cv_data = _cv_data_snapshot(cv_document, cv_state)
+        final_state = cv_state
+        completed = 0
+
+        for kind, value in stream_cv(cv_state):
+            if kind == "node":
+                completed += 1
+                yield format_sse("node", {"node": value, "completed": completed})
+                continue
+
+            final_state = value
+            cv_data = _cv_data_snapshot(cv_document, value)
+            changed = {key: val for key, val in cv_data.items() if sent_cv_data.get(key) != val}
+            if changed:
+                sent_cv_data = cv_data
+                yield format_sse("cv_data", {"fields": changed})
+
+        # Sauvegarde, rendu du PDF et upload
+        yield format_sse("step", {"step": "finalizing"})
+        # Le flux s'exécute après la fin de la session de l'endpoint: session dédiée
+        with firestore_session():
+            result = finalize_cv_generation(user_id, cv_id, cv_document, final_state)
+
+        execution_time = time.time() - start_time
+        logger.info(f"CV généré en streaming pour l'utilisateur {user_id} en {execution_time:.2f} secondes")
+        yield format_sse("done", {**result, "execution_time": execution_time})
+
+    except Exception as e:
+        execution_time = time.time() - start_time
+        logger.error(f"Erreur lors de la génération du CV en streaming après {execution_time:.2f} secondes: {str(e)}", exc_info=True)
+        yield format_sse("error", {"error": str(e), "execution_time": execution_time})
+
+
+def generate_cv_stream_endpoint(user_id: str, cv_id: str):
+    """
+    Endpoint de génération de CV qui diffuse la progression en server-sent events:
+    fin de chaque nœud du graphe, champs de cv_data au fur et à mesure, puis URL du PDF.
+    
+    Args:
+        user_id (str): ID de l'utilisateur
+        cv_id (str): ID du document CV dans Firestore
+        
+    Returns:
+        Response: Flux text/event-stream, ou réponse JSON d'erreur avant le début du flux
+    """
+    start_time = time.time()
+    try:
+        prefetched, _ = prefetch_and_record_call(user_id, cv_id)
+        cv_document, cv_state = load_cv_generation_inputs(user_id, cv_id, prefetched)
+
+    except CVGenerationError as e:
+        return jsonify({"error": e.message}), e.status_code
+
+    except Exception as e:
+        logger.error(f"Erreur lors de la préparation de la génération du CV: {str(e)}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+    events = stream_cv_generation(user_id, cv_id, cv_document, cv_state, start_time)
+    return Response(
+        stream_with_context(events),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Désactive la mise en tampon des proxys pour recevoir les événements immédiatement
+            "X-Accel-Buffering": "no",
+        },
+    )
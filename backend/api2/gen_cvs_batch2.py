@@ -0,0 +1,148 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+from flask import jsonify
+from backend.config import load_config
+from backend.models import ProfileDocument, CVDocument
+from ai_module.lg_models import CVGenState
+from backend.api2.gen_cv2 import record_cv_call, finalize_cv_generation
+from backend.session import firestore_session
+
+logger = logging.getLogger(__name__)
+config = load_config()
+
+# Import conditionnel basé sur la configuration
+if config.MOCK_OPENAI:
+    from ai_module.mock_inference import generate_cv, summarize_profile_for_cv
+else:
+    from ai_module.inference import generate_cv, summarize_profile_for_cv
+
+
+def generate_one_cv_from_summaries(user_id: str, cv_id: str, cv_document: CVDocument,
+                                   base_state: CVGenState) -> Dict[str, Any]:
+    """
+    Génère un CV du lot à partir de l'état commun portant déjà les résumés du profil.
+
+    Args:
+        user_id (str): ID de l'utilisateur
+        cv_id (str): ID du document CV dans Firestore
+        cv_document (CVDocument): Document CV chargé
+        base_state (CVGenState): État commun au lot, avec les résumés calculés
+
+    Returns:
+        Dict[str, Any]: Statut, URL et durées de la génération de ce CV
+    """
+    start = time.perf_counter()
+    try:
+        # Copie profonde: les nœuds du graphe modifient les expériences et formations
+        cv_state = base_state.model_copy(deep=True)
+        cv_state.job_raw = getattr(cv_document, "job_raw", "") or ""
+
+        cv_state = generate_cv(cv_state, precomputed_summaries=True)
+        generated = time.perf_counter()
+
+        # Session propre à ce thread: le CV est écrit une seule fois
+        with firestore_session():
+            result = finalize_cv_generation(user_id, cv_id, cv_document, cv_state)
+        finished = time.perf_counter()
+
+        return {
+            **result,
+            "status": "succeeded",
+            "timings": {
+                "generation": round(generated - start, 3),
+                "finalize": round(finished - generated, 3),
+                "total": round(finished - start, 3),
+            },
+        }
+    except Exception as e:
+        logger.error(f"Erreur lors de la génération du CV {cv_id} du lot: {str(e)}", exc_info=True)
+        return {
+            "cv_id": cv_id,
+            "status": "failed",
+            "error": str(e),
+            "timings": {"total": round(time.perf_counter() - start, 3)},
+        }
+
+
+def generate_cvs_batch_endpoint(user_id: str, cv_ids: List[str]):
+    """
+    Endpoint de génération de plusieurs CV pour un même profil.
+    Le profil est lu une seule fois et les résumés des expériences et formations,
+    indépendants de l'offre, sont calculés une seule fois pour tout le lot.
+    Seuls les nœuds dépendant de l'offre, le rendu PDF et l'upload sont exécutés
+    pour chaque CV, en parallèle.
+
+    Args:
+        user_id (str): ID de l'utilisateur
+        cv_ids (List[str]): IDs des documents CV dans Firestore
+
+    Returns:
+        Response: Réponse JSON avec le statut et les durées de chaque CV
+    """
+    start_time = time.time()
+
+    if not isinstance(cv_ids, list) or not cv_ids or not all(isinstance(cv_id, str) for cv_id in cv_ids):
+        return jsonify({"error": "cv_ids doit être une liste non vide d'identifiants"}), 400
+    cv_ids = list(dict.fromkeys(cv_ids))  # Dédoublonnage en conservant l'ordre
+    if len(cv_ids) > config.BATCH_MAX_CVS:
+        return jsonify({"error": f"Un lot ne peut pas dépasser {config.BATCH_MAX_CVS} CV"}), 400
+
+    try:
+        timings = {}
+
+        # Lecture unique du profil
+        profile_document = ProfileDocument.from_firestore_id(user_id)
+        if not profile_document:
+            logger.warning(f"Profil avec l'ID {user_id} non trouvé dans Firestore")
+            return jsonify({"error": "Profil non trouvé"}), 404
+
+        results: Dict[str, Dict[str, Any]] = {}
+        cv_documents: Dict[str, CVDocument] = {}
+        for cv_id in cv_ids:
+            cv_document = CVDocument.from_firestore_id(cv_id)
+            if cv_document:
+                cv_documents[cv_id] = cv_document
+            else:
+                logger.warning(f"CV avec l'ID {cv_id} non trouvé dans Firestore")
+                results[cv_id] = {"cv_id": cv_id, "status": "not_found", "error": "CV non trouvé"}
+        timings["loading"] = round(time.time() - start_time, 3)
+
+        if cv_documents:
+            # Un appel facturé par CV effectivement généré
+            for cv_id in cv_documents:
+                record_cv_call(user_id)
+
+            # Résumés indépendants de l'offre, calculés une seule fois pour le lot
+            summaries_start = time.time()
+            base_state = summarize_profile_for_cv(CVGenState.from_profile_document(profile_document, "", ""))
+            timings["summaries"] = round(time.time() - summaries_start, 3)
+
+            # Nœuds dépendant de l'offre, rendu PDF et upload en parallèle
+            generation_start = time.time()
+            max_workers = min(config.BATCH_MAX_WORKERS, len(cv_documents))
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cv-batch") as executor:
+                futures = {
+                    cv_id: executor.submit(generate_one_cv_from_summaries, user_id, cv_id, cv_document, base_state)
+                    for cv_id, cv_document in cv_documents.items()
+                }
+                for cv_id, future in futures.items():
+                    results[cv_id] = future.result()
+            timings["generation"] = round(time.time() - generation_start, 3)
+
+        execution_time = time.time() - start_time
+        nb_succeeded = sum(1 for result in results.values() if result["status"] == "succeeded")
+        logger.info(f"Lot de {len(cv_ids)} CV pour l'utilisateur {user_id}: {nb_succeeded} générés en {execution_time:.2f} secondes")
+
+        return jsonify({
+            "success": nb_succeeded == len(cv_ids),
+            "execution_time": execution_time,
+            "timings": timings,
+            "results": [results[cv_id] for cv_id in cv_ids],
+        }), 200
+
+    except Exception as e:
+        execution_time = time.time() - start_time
+        logger.error(f"Erreur lors de la génération du lot de CV après {execution_time:.2f} secondes: {str(e)}", exc_info=True)
+        return jsonify({"error": str(e), "execution_time": execution_time}), 500
@@ -3,9 +3,11 @@ import time
 from backend.config import load_config
 from dotenv import load_dotenv
 from backend.utils.utils_gcs2 import get_concatenated_text_files
-from backend.models import ProfileDocument, CallDocument, UsageDocument
+from backend.models import ProfileDocument, CallDocument
+from backend.usage_limiter import record_usage
 from ai_module.lg_models import ProfileState
 from flask import jsonify
+from ai_module.async_runner import run_async
 
 load_dotenv()
 logger = logging.getLogger(__name__)
@@ -13,9 +15,9 @@ config = load_config()
 
 # Import conditionnel basé sur la configuration
 if config.MOCK_OPENAI:
-    from ai_module.mock_inference import generate_profile
+    from ai_module.mock_inference import generate_profile, agenerate_profile
 else:
-    from ai_module.inference import generate_profile
+    from ai_module.inference import generate_profile, agenerate_profile
 
 def generate_profile_endpoint(user_id: str):
     """
@@ -34,8 +36,7 @@ def generate_profile_endpoint(user_id: str):
 
         # Enregistrer l'appel et mettre à jour l'utilisation en parallèle
         CallDocument.create_call(user_id, "generate_profile_v2")
-        usage_doc = UsageDocument.get_or_create(user_id)
-        usage_doc.increment_usage()
+        record_usage(user_id)
 
         # Récupérer le profil existant pour l'URL LinkedIn si disponible
         profile_document = ProfileDocument.from_firestore_id(user_id)
@@ -47,8 +48,12 @@ def generate_profile_endpoint(user_id: str):
         # Créer un objet ProfileState avec le texte brut
         profile_state = ProfileState.from_input_text(text_content)
         
-        # Appel synchrone à generate_profile
-        profile_state = generate_profile(profile_state)
+        if config.ASYNC_GRAPHS:
+            # Exécution sur la boucle asyncio partagée: une coroutine par branche du graphe
+            profile_state = run_async(agenerate_profile(profile_state))
+        else:
+            # Appel synchrone à generate_profile
+            profile_state = generate_profile(profile_state)
         
         # Créer ou mettre à jour le ProfileDocument
         profile_document = ProfileDocument.from_profile_state(profile_state, user_id)
@@ -0,0 +1,28 @@
+import logging
+from flask import jsonify
+from backend.jobs import get_job_runner
+
+logger = logging.getLogger(__name__)
+
+def get_job_status_endpoint(user_id: str, job_id: str):
+    """
+    Endpoint de suivi d'un job asynchrone.
+    
+    Args:
+        user_id (str): ID de l'utilisateur authentifié
+        job_id (str): ID du job
+        
+    Returns:
+        Response: Réponse JSON avec l'état et la progression du job
+    """
+    try:
+        job = get_job_runner().get(job_id)
+        # Un utilisateur ne peut consulter que ses propres jobs
+        if not job or job.user_id != user_id:
+            return jsonify({"error": "Job non trouvé"}), 404
+
+        return jsonify(job.to_status()), 200
+
+    except Exception as e:
+        logger.error(f"Erreur lors de la récupération du job {job_id}: {str(e)}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
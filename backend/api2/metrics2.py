@@ -0,0 +1,19 @@
+import logging
+from flask import jsonify
+from backend.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+def get_metrics_endpoint():
+    """
+    Endpoint de lecture des métriques du processus (compteurs et statistiques des composants).
+    
+    Returns:
+        Response: Réponse JSON avec les métriques
+    """
+    try:
+        return jsonify(metrics.snapshot()), 200
+
+    except Exception as e:
+        logger.error(f"Erreur lors de la lecture des métriques: {str(e)}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
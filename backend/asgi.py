@@ -0,0 +1,20 @@
+"""
+Point d'entrée ASGI de l'application.
+
+Permet de servir les endpoints v2 avec un serveur ASGI, par exemple :
+    uvicorn backend.asgi:asgi_app --host 0.0.0.0 --port 8080
+ou avec gunicorn :
+    gunicorn -k uvicorn.workers.UvicornWorker backend.asgi:asgi_app
+
+Associé à ASYNC_GRAPHS=1, les appels LLM des graphes sont des coroutines sur la
+boucle partagée (ai_module.async_runner) plutôt qu'un thread par branche.
+
+L'application Flask reste synchrone: WsgiToAsgi l'exécute dans un pool de threads, et
+chaque requête occupe toujours un thread, bloqué dans run_async jusqu'à la fin de la
+génération. Seules les branches parallèles du graphe cessent de consommer des threads;
+le nombre de requêtes simultanées reste borné par la taille de ce pool.
+"""
+from asgiref.wsgi import WsgiToAsgi
+from backend.main import app
+
+asgi_app = WsgiToAsgi(app)
@@ -1,8 +1,8 @@
 from flask import request, jsonify
 from functools import wraps
-from firebase_admin import auth
 import logging
 from backend.config import load_config
+from backend.auth_cache import verify_token
 
 logger = logging.getLogger(__name__)
 config = load_config()
@@ -14,6 +14,7 @@ def auth_required(f):
         if not config.CHECK_AUTH:
             # En développement, utiliser un ID factice
             request.user_id = "test_user"
+            request.user_claims = {}
             return f(*args, **kwargs)
             
         auth_header = request.headers.get('Authorization')
@@ -22,11 +23,26 @@ def auth_required(f):
             
         token = auth_header.split('Bearer ')[1]
         try:
-            decoded_token = auth.verify_id_token(token)
+            decoded_token = verify_token(token)
             request.user_id = decoded_token['uid']
+            request.user_claims = decoded_token
             return f(*args, **kwargs)
         except Exception as e:
             logger.error(f"Erreur d'authentification: {str(e)}")
             return jsonify({"error": "Token invalide"}), 401
             
-    return decorated_function 
\ No newline at end of file
+    return decorated_function 
+
+def admin_required(f):
+    """
+    Décorateur réservant un endpoint aux utilisateurs portant le claim 'admin',
+    à placer après auth_required. En environnement local, l'endpoint reste accessible.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if config.ENV != "local" and not getattr(request, "user_claims", {}).get("admin"):
+            logger.warning(f"Accès administrateur refusé à l'utilisateur {getattr(request, 'user_id', None)}")
+            return jsonify({"error": "Accès réservé aux administrateurs"}), 403
+        return f(*args, **kwargs)
+
+    return decorated_function
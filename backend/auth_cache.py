@@ -0,0 +1,262 @@
+"""
+Cache des jetons d'identification Firebase vérifiés.
+
+auth.verify_id_token vérifie la signature du jeton à chaque appel. Les jetons
+vérifiés sont conservés dans un cache LRU borné, indexé par l'empreinte SHA-256
+du jeton (le jeton lui-même n'est pas conservé), jusqu'à leur expiration (`exp`).
+
+La vérification de révocation (check_revoked, un appel à Firebase Auth) est
+optionnelle: avec AUTH_REVOCATION_CHECK_INTERVAL > 0, elle est faite à la
+première vérification du jeton puis au plus une fois par intervalle.
+
+Les clés publiques de signature sont téléchargées au démarrage puis rafraîchies
+par un thread en arrière-plan, dans le cache HTTP du vérificateur de firebase_admin:
+une requête n'attend jamais leur téléchargement. Ce rafraîchissement utilise des
+attributs privés de firebase_admin (vérifiés avec la version 6.7.0 de requirements.txt):
+s'ils sont absents au démarrage, il est désactivé et les clés sont téléchargées par
+verify_id_token comme sans cache.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from firebase_admin import auth
+
+from backend.config import load_config
+from backend.metrics import metrics
+
+logger = logging.getLogger(__name__)
+config = load_config()
+
+# Claims décodés, expiration (timestamp `exp`), dernière vérification de révocation (monotonic)
+CacheEntry = Tuple[Dict[str, Any], float, float]
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class TokenCache:
+    """Cache LRU des jetons vérifiés, borné en nombre d'entrées, thread-safe"""
+
+    def __init__(self, max_entries: int, revocation_interval: float):
+        self.max_entries = max_entries
+        self.revocation_interval = revocation_interval
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.revocation_checks = 0
+        self.rejected = 0
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """
+        Retourne les claims du jeton, depuis le cache ou après vérification par Firebase.
+
+        Args:
+            token (str): Jeton d'identification Firebase
+
+        Returns:
+            Dict[str, Any]: Claims décodés du jeton
+
+        Raises:
+            Exception: Erreur de firebase_admin si le jeton est invalide, expiré ou révoqué
+        """
+        key = _token_key(token)
+        entry = self._get(key)
+        if entry is not None:
+            claims, _, checked_at = entry
+            if not self._revocation_due(checked_at):
+                return dict(claims)
+            # Jeton en cache dont la révocation doit être revérifiée
+            self._verify_and_store(key, token, check_revoked=True)
+            return dict(claims)
+
+        claims = self._verify_and_store(key, token, check_revoked=self.revocation_interval > 0)
+        return dict(claims)
+
+    def _revocation_due(self, checked_at: float) -> bool:
+        return self.revocation_interval > 0 and time.monotonic() - checked_at >= self.revocation_interval
+
+    def _verify_and_store(self, key: str, token: str, check_revoked: bool) -> Dict[str, Any]:
+        try:
+            claims = auth.verify_id_token(token, check_revoked=check_revoked)
+        except Exception:
+            with self._lock:
+                self.rejected += 1
+                self._entries.pop(key, None)
+            raise
+        with self._lock:
+            if check_revoked:
+                self.revocation_checks += 1
+            self._entries.pop(key, None)
+            self._entries[key] = (claims, float(claims.get("exp", 0)), time.monotonic())
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return claims
+
+    def _get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[1] <= time.time():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retourne les compteurs du cache et du rafraîchissement des clés"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "enabled": config.AUTH_TOKEN_CACHE_ENABLED,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "revocation_checks": self.revocation_checks,
+                "rejected": self.rejected,
+            }
+        stats["signing_keys"] = _key_refresher.get_stats()
+        return stats
+
+
+class SigningKeyRefresher:
+    """
+    Télécharge les clés publiques de signature des jetons dans le cache HTTP
+    (cachecontrol) du vérificateur de firebase_admin, puis les rafraîchit
+    périodiquement dans un thread daemon.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._fetch_keys = None
+        self.disabled_reason: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.refreshes = 0
+        self.errors = 0
+        self.last_refresh: Optional[float] = None
+        self.last_duration_ms: Optional[float] = None
+
+    def refresh(self) -> bool:
+        """
+        Télécharge les clés si la copie en cache a expiré (sinon aucune requête réseau).
+
+        Returns:
+            bool: True si les clés sont disponibles
+        """
+        start = time.perf_counter()
+        try:
+            response = self._fetch_keys()
+            if response.status != 200:
+                raise RuntimeError(f"statut HTTP {response.status}")
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            logger.warning(f"Échec du rafraîchissement des clés de signature Firebase: {str(e)}")
+            return False
+        with self._lock:
+            self.refreshes += 1
+            self.last_refresh = time.time()
+            self.last_duration_ms = round((time.perf_counter() - start) * 1000, 2)
+        return True
+
+    @staticmethod
+    def _resolve_key_fetcher():
+        """
+        Retourne une fonction téléchargeant les clés avec le client HTTP du vérificateur interne
+        de firebase_admin: ses clés sont celles utilisées par verify_id_token.
+        Attributs privés vérifiés avec firebase_admin 6.7.0: auth._get_client(app)._token_verifier.request
+        et _token_gen.ID_TOKEN_CERT_URI.
+
+        Raises:
+            ImportError, AttributeError: Si la version installée ne les fournit plus
+        """
+        from firebase_admin import _token_gen
+        request = auth._get_client(None)._token_verifier.request
+        cert_uri = _token_gen.ID_TOKEN_CERT_URI
+        if not callable(request) or not isinstance(cert_uri, str):
+            raise AttributeError("vérificateur de jetons de firebase_admin inattendu")
+        return lambda: request(url=cert_uri)
+
+    def start(self) -> None:
+        """Démarre le thread de préchargement et de rafraîchissement (une seule fois)"""
+        with self._lock:
+            if self._thread is not None or self.disabled_reason is not None:
+                return
+            try:
+                self._fetch_keys = self._resolve_key_fetcher()
+            except Exception as e:
+                self.disabled_reason = f"{type(e).__name__}: {str(e)}"
+                logger.error(
+                    "Rafraîchissement des clés de signature Firebase désactivé: attributs internes de "
+                    f"firebase_admin introuvables (vérifiés avec la version 6.7.0): {self.disabled_reason}"
+                )
+                return
+            self._thread = threading.Thread(target=self._run, name="auth-keys-refresh", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        # Préchargement hors du démarrage du processus, avant les premières requêtes
+        if self.refresh():
+            logger.info(f"Clés de signature Firebase préchargées en {self.last_duration_ms} ms")
+        while not self._stop.wait(self.interval):
+            self.refresh()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "refresh_interval": self.interval,
+                "disabled_reason": self.disabled_reason,
+                "refreshes": self.refreshes,
+                "errors": self.errors,
+                "last_refresh_age": round(time.time() - self.last_refresh, 1) if self.last_refresh else None,
+                "last_duration_ms": self.last_duration_ms,
+            }
+
+
+# Cache et rafraîchissement uniques du processus
+token_cache = TokenCache(config.AUTH_TOKEN_CACHE_SIZE, config.AUTH_REVOCATION_CHECK_INTERVAL)
+_key_refresher = SigningKeyRefresher(config.AUTH_KEYS_REFRESH_INTERVAL)
+metrics.register_collector("auth_cache", token_cache.get_stats)
+
+
+def verify_token(token: str) -> Dict[str, Any]:
+    """
+    Vérifie un jeton d'identification Firebase, via le cache s'il est activé.
+
+    Args:
+        token (str): Jeton d'identification Firebase
+
+    Returns:
+        Dict[str, Any]: Claims décodés du jeton
+    """
+    if not config.AUTH_TOKEN_CACHE_ENABLED:
+        return auth.verify_id_token(token)
+    return token_cache.verify(token)
+
+
+def start_signing_key_refresh() -> None:
+    """Précharge les clés de signature et démarre leur rafraîchissement en arrière-plan"""
+    _key_refresher.start()
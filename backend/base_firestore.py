@@ -1,19 +1,152 @@
 import firebase_admin
 from firebase_admin import credentials
 from firebase_admin import firestore
+from firebase_admin import firestore_async
+import asyncio
 import os
+import json
+import logging
+import threading
+import time
 from datetime import datetime
-from typing import ClassVar, TypeVar, Type, Optional, Dict, Any, List, Generic
-from pydantic import BaseModel, Field
+from typing import ClassVar, TypeVar, Type, Optional, Dict, Any, AsyncIterator, Iterator, List, Generic, Sequence, Set, Tuple
+from google.api_core.exceptions import (
+    Aborted, DeadlineExceeded, InternalServerError, NotFound, ResourceExhausted, ServiceUnavailable,
+)
+from pydantic import BaseModel, Field, PrivateAttr
+from backend.session import get_current_session
+from backend.model_cache import document_cache, cache_enabled_for
+from backend.metrics import metrics
+from backend.config import load_config
+from backend.local_firestore import get_local_client
+
+logger = logging.getLogger(__name__)
+config = load_config()
 
 # Type générique pour les modèles Firestore
 T = TypeVar('T', bound='FirestoreModel')
 
+# Écriture préparée par FirestoreModel.prepare_write: ("set" | "update" | "noop", données)
+PreparedWrite = Tuple[str, Dict[str, Any]]
+
+# Filtre de requête: (champ, opérateur, valeur), ex: ("user_id", "==", "abc")
+QueryFilter = Tuple[str, str, Any]
+
+# Nombre de documents lus par appel Firestore lors du parcours d'une requête
+DEFAULT_PAGE_SIZE = 300
+
+# Limite de Firestore pour le nombre d'opérations d'un lot
+MAX_BATCH_WRITES = 500
+
+# Nouvelles tentatives d'un lot en cas d'erreur transitoire de Firestore
+BULK_MAX_RETRIES = 5
+BULK_BACKOFF_BASE = 0.5  # En secondes, doublé à chaque tentative
+BULK_BACKOFF_MAX = 10.0  # En secondes
+TRANSIENT_ERRORS = (Aborted, DeadlineExceeded, InternalServerError, ResourceExhausted, ServiceUnavailable)
+# Erreurs après lesquelles le lot a pu être appliqué: à ne pas renvoyer pour des opérations non idempotentes
+AMBIGUOUS_ERRORS = (DeadlineExceeded, InternalServerError, ServiceUnavailable)
+# Erreurs garantissant que le lot n'a pas été appliqué
+REJECTED_ERRORS = (Aborted, ResourceExhausted)
+
+
+class BatchCommitError(Exception):
+    """
+    Levée lorsqu'un lot échoue définitivement: les lots précédents restent validés.
+    
+    Attributes:
+        committed (List[Any]): Éléments des lots validés
+        uncommitted (List[Any]): Éléments non appliqués (lots suivants, et lot refusé)
+        unknown (List[Any]): Éléments du lot dont le résultat est inconnu (erreur ambiguë)
+    """
+    
+    def __init__(self, description: str, committed: List[Any], uncommitted: List[Any], unknown: List[Any], cause: Exception):
+        super().__init__(f"Échec d'un lot ({description}): {type(cause).__name__}: {str(cause)}")
+        self.committed = committed
+        self.uncommitted = uncommitted
+        self.unknown = unknown
+        self.cause = cause
+
+
+def diff_fields(old: Dict[str, Any], new: Dict[str, Any], prefix: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    """
+    Calcule les champs modifiés entre deux états d'un document, sous forme de chemins.
+    Les sous-dictionnaires sont comparés récursivement; les listes sont remplacées entièrement.
+    
+    Args:
+        old (Dict[str, Any]): État enregistré dans Firestore
+        new (Dict[str, Any]): État courant
+        prefix (Tuple[str, ...]): Chemin du dictionnaire comparé
+        
+    Returns:
+        Dict[str, Any]: {chemin Firestore: nouvelle valeur ou DELETE_FIELD}
+    """
+    changes: Dict[str, Any] = {}
+    for key in old.keys() | new.keys():
+        path = prefix + (key,)
+        if key not in new:
+            changes[firestore.FieldPath(*path).to_api_repr()] = firestore.DELETE_FIELD
+        elif key not in old:
+            changes[firestore.FieldPath(*path).to_api_repr()] = new[key]
+        elif isinstance(old[key], dict) and isinstance(new[key], dict) and new[key]:
+            changes.update(diff_fields(old[key], new[key], path))
+        elif old[key] != new[key]:
+            changes[firestore.FieldPath(*path).to_api_repr()] = new[key]
+    return changes
+
+
+def payload_size(data: Dict[str, Any]) -> int:
+    """Taille approximative en octets d'une écriture, pour les logs"""
+    return len(json.dumps(data, default=str, ensure_ascii=False).encode("utf-8"))
+
+
+class ReadLatency:
+    """
+    Durée des lectures d'un seul document (get_by_id), en moyenne mobile exponentielle.
+    Sert de référence pour chiffrer le temps gagné par les lectures groupées.
+    """
+
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._average_ms: Optional[float] = None
+        self.samples = 0
+
+    def observe(self, elapsed_ms: float) -> None:
+        with self._lock:
+            if self._average_ms is None:
+                self._average_ms = elapsed_ms
+            else:
+                self._average_ms += self.alpha * (elapsed_ms - self._average_ms)
+            self.samples += 1
+
+    def average_ms(self) -> Optional[float]:
+        """Retourne la durée moyenne d'une lecture, ou None si aucune lecture n'a été mesurée"""
+        with self._lock:
+            return self._average_ms
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            average = round(self._average_ms, 2) if self._average_ms is not None else None
+            return {"single_read_ms": average, "samples": self.samples}
+
+
+# Durée des lectures unitaires du processus
+single_read_latency = ReadLatency()
+metrics.register_collector("firestore_reads", single_read_latency.get_stats)
+
 class FirestoreModel(BaseModel):
     """Classe de base pour tous les modèles Firestore basée sur Pydantic"""
     
     id: Optional[str] = None
     collection_name: ClassVar[str] = ""  # Doit être défini dans les sous-classes
+    # Dans une session (backend.session), save() est différé jusqu'à la fin de la requête.
+    # False pour les documents lus par d'autres threads ou instances pendant la requête.
+    deferred_writes: ClassVar[bool] = True
+    # Durée de vie en secondes des lectures dans le cache partagé entre requêtes (0: pas de cache)
+    cache_ttl: ClassVar[float] = 0
+    
+    # État du document lors de la dernière lecture ou écriture, pour n'envoyer que les champs modifiés
+    _persisted: Optional[Dict[str, Any]] = PrivateAttr(default=None)
     
     @classmethod
     def initialize_firebase(cls):
@@ -31,10 +164,24 @@ class FirestoreModel(BaseModel):
     
     @classmethod
     def get_db(cls):
-        """Récupère l'instance de la base de données Firestore"""
+        """Récupère le client de la base de données: Firestore ou substitut local selon FIRESTORE_BACKEND"""
+        if config.FIRESTORE_BACKEND != "firestore":
+            return get_local_client()
         cls.initialize_firebase()
         return firestore.client()
     
+    @classmethod
+    def get_async_db(cls):
+        """
+        Récupère le client asynchrone (AsyncClient) de Firestore, ou le substitut local selon FIRESTORE_BACKEND.
+        Le client asynchrone se lie à la boucle qui l'utilise: les méthodes a* sont à exécuter
+        sur la boucle partagée du processus (ai_module.async_runner).
+        """
+        if config.FIRESTORE_BACKEND != "firestore":
+            return get_local_client()
+        cls.initialize_firebase()
+        return firestore_async.client()
+    
     @classmethod
     def from_dict(cls: Type[T], data: Dict[str, Any], doc_id: Optional[str] = None) -> T:
         """Crée une instance de l'objet à partir d'un dictionnaire"""
@@ -42,50 +189,716 @@ class FirestoreModel(BaseModel):
             return cls(**data, id=doc_id)
         return cls(**data)
     
+    @classmethod
+    def from_stored_data(cls: Type[T], data: Dict[str, Any], doc_id: str) -> T:
+        """
+        Construit une instance à partir des données d'un document Firestore, marquée comme enregistrée.
+        
+        Args:
+            data (Dict[str, Any]): Données du document
+            doc_id (str): Identifiant du document
+            
+        Returns:
+            T: L'instance construite
+        """
+        instance = cls(**data)
+        instance.id = doc_id
+        # État enregistré issu de to_dict: champs inconnus et valeurs nulles ignorés à toute profondeur
+        instance.mark_persisted()
+        return instance
+    
     @classmethod
     def from_doc_snapshot(cls: Type[T], doc) -> T:
         """Crée une instance à partir d'un DocumentSnapshot Firestore"""
-        data = doc.to_dict()
-        return cls.from_dict(data, doc.id)
+        return cls.from_stored_data(doc.to_dict(), doc.id)
     
     
+    @classmethod
+    def from_raw_data(cls: Type[T], raw_data: Dict[str, Any], doc_id: str) -> Optional[T]:
+        """
+        Construit une instance à partir des données brutes d'un document Firestore.
+        
+        Args:
+            raw_data (Dict[str, Any]): Données du document
+            doc_id (str): Identifiant du document
+            
+        Returns:
+            Optional[T]: L'instance construite ou None si les données sont invalides
+        """
+        try:
+            return cls.from_stored_data(raw_data, doc_id)
+        except Exception as e:
+            logger.error(f"Erreur lors de la construction de l'objet {cls.__name__}: {e}")
+            return None
+    
+    @classmethod
+    def get_by_id(cls: Type[T], doc_id: str) -> Optional[T]:
+        """
+        Lit un document par son ID. Dans une session, un document déjà lu est servi depuis la mémoire;
+        sinon, le cache partagé entre requêtes est consulté si le modèle l'active (cache_ttl).
+        
+        Args:
+            doc_id (str): L'identifiant du document dans Firestore
+            
+        Returns:
+            Optional[T]: L'instance construite ou None si le document n'existe pas
+        """
+        found, instance = cls._read_from_memory(doc_id)
+        if found:
+            return instance
+        read_token = document_cache.read_token()
+        start = time.perf_counter()
+        snapshot = cls.get_db().collection(cls.collection_name).document(doc_id).get()
+        single_read_latency.observe((time.perf_counter() - start) * 1000)
+        return cls._register_read(doc_id, snapshot, read_token)
+    
+    @classmethod
+    def _read_from_memory(cls: Type[T], doc_id: str) -> Tuple[bool, Optional[T]]:
+        """
+        Cherche un document dans la session courante, puis dans le cache partagé.
+        
+        Returns:
+            Tuple[bool, Optional[T]]: (trouvé, instance ou None si le document n'existe pas)
+        """
+        session = get_current_session()
+        if session is not None and session.contains(cls, doc_id):
+            return True, session.get(cls, doc_id)
+        if cache_enabled_for(cls) and (cached := document_cache.get((cls.collection_name, doc_id))) is not None:
+            instance = cls.from_raw_data(cached, doc_id)
+            if session is not None:
+                session.register(cls, doc_id, instance)
+            return True, instance
+        return False, None
+    
+    @classmethod
+    def _register_read(cls: Type[T], doc_id: str, snapshot, read_token: int) -> Optional[T]:
+        """
+        Construit l'instance d'un document lu dans Firestore et l'enregistre dans le cache et la session.
+        read_token est le jeton du cache pris avant la lecture (voir DocumentCache.put).
+        """
+        instance = None
+        if snapshot is not None and snapshot.exists and (raw_data := snapshot.to_dict()):
+            instance = cls.from_raw_data(raw_data, doc_id)
+            if instance is not None and cache_enabled_for(cls):
+                document_cache.put((cls.collection_name, doc_id), raw_data, cls.cache_ttl, read_token)
+        session = get_current_session()
+        if session is not None:
+            session.register(cls, doc_id, instance)
+        return instance
+    
+    @classmethod
+    def get_many(cls, requests: Sequence[Tuple[Type["FirestoreModel"], str]]) -> List[Optional["FirestoreModel"]]:
+        """
+        Lit plusieurs documents, éventuellement de collections différentes, en un seul appel.
+        Dans une session, seuls les documents pas encore lus sont demandés à Firestore;
+        les documents présents dans le cache partagé (cache_ttl) ne sont pas demandés non plus.
+        
+        Args:
+            requests (Sequence[Tuple[Type[FirestoreModel], str]]): Couples (modèle, ID du document)
+            
+        Returns:
+            List[Optional[FirestoreModel]]: Instances typées dans l'ordre des requêtes,
+                None pour les documents inexistants ou invalides
+        """
+        if not requests:
+            return []
+        
+        fetched: Dict[Tuple[str, str], Optional["FirestoreModel"]] = {}
+        to_fetch = []
+        for model, doc_id in requests:
+            found, instance = model._read_from_memory(doc_id)
+            if found:
+                fetched[(model.collection_name, doc_id)] = instance
+            else:
+                to_fetch.append((model, doc_id))
+        
+        if to_fetch:
+            db = cls.get_db()
+            refs = [db.collection(model.collection_name).document(doc_id) for model, doc_id in to_fetch]
+            read_token = document_cache.read_token()
+            # get_all ne garantit pas l'ordre des réponses: association par chemin du document
+            snapshots = {snapshot.reference.path: snapshot for snapshot in db.get_all(refs)}
+            for (model, doc_id), ref in zip(to_fetch, refs):
+                fetched[(model.collection_name, doc_id)] = model._register_read(doc_id, snapshots.get(ref.path), read_token)
+        
+        return [fetched[(model.collection_name, doc_id)] for model, doc_id in requests]
+    
+    @classmethod
+    async def aget(cls: Type[T], doc_id: str) -> Optional[T]:
+        """
+        Variante asynchrone de get_by_id, sur le client asynchrone de Firestore.
+        
+        Args:
+            doc_id (str): L'identifiant du document dans Firestore
+            
+        Returns:
+            Optional[T]: L'instance construite ou None si le document n'existe pas
+        """
+        found, instance = cls._read_from_memory(doc_id)
+        if found:
+            return instance
+        ref = cls.get_async_db().collection(cls.collection_name).document(doc_id)
+        read_token = document_cache.read_token()
+        return cls._register_read(doc_id, await _io(ref.get), read_token)
+    
+    @classmethod
+    async def aget_many(cls, requests: Sequence[Tuple[Type["FirestoreModel"], str]]) -> List[Optional["FirestoreModel"]]:
+        """
+        Variante asynchrone de get_many: un seul appel get_all sur le client asynchrone.
+        
+        Args:
+            requests (Sequence[Tuple[Type[FirestoreModel], str]]): Couples (modèle, ID du document)
+            
+        Returns:
+            List[Optional[FirestoreModel]]: Les instances dans l'ordre des demandes,
+                None pour les documents inexistants ou invalides
+        """
+        fetched: Dict[Tuple[str, str], Optional["FirestoreModel"]] = {}
+        to_fetch = []
+        for model, doc_id in requests:
+            found, instance = model._read_from_memory(doc_id)
+            if found:
+                fetched[(model.collection_name, doc_id)] = instance
+            else:
+                to_fetch.append((model, doc_id))
+        
+        if to_fetch:
+            db = cls.get_async_db()
+            refs = [db.collection(model.collection_name).document(doc_id) for model, doc_id in to_fetch]
+            read_token = document_cache.read_token()
+            snapshots = {snapshot.reference.path: snapshot for snapshot in await _collect(db.get_all, refs)}
+            for (model, doc_id), ref in zip(to_fetch, refs):
+                fetched[(model.collection_name, doc_id)] = model._register_read(doc_id, snapshots.get(ref.path), read_token)
+        
+        return [fetched[(model.collection_name, doc_id)] for model, doc_id in requests]
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convertit l'objet en dictionnaire pour stockage Firestore"""
         # Exclure id et les champs None
-        data = self.model_dump(exclude={'id'}, exclude_none=True)
-        return data
+        return self.model_dump(exclude={'id'}, exclude_none=True)
     
-    def save(self, doc_id: Optional[str] = None) -> str:
-        """Sauvegarde l'objet dans Firestore"""
-        db = self.get_db()
+    def mark_persisted(self) -> None:
+        """Enregistre l'état courant comme identique au document Firestore"""
+        # model_dump retourne des conteneurs neufs: pas de copie nécessaire
+        self._persisted = self.to_dict()
+    
+    def changed_fields(self) -> Dict[str, Any]:
+        """Retourne les champs modifiés depuis la dernière lecture ou écriture (chemins pointés)"""
+        if self._persisted is None:
+            return self.to_dict()
+        return diff_fields(self._persisted, self.to_dict())
+    
+    def prepare_write(self, full: bool = False) -> PreparedWrite:
+        """
+        Prépare l'écriture du document: set complet ou update des seuls champs modifiés.
+        
+        Args:
+            full (bool): Si True, réécrit le document complet avec set()
+            
+        Returns:
+            PreparedWrite: ("set", données), ("update", champs modifiés) ou ("noop", {})
+        """
         data = self.to_dict()
+        if full or self._persisted is None:
+            mode, payload = "set", data
+        else:
+            payload = diff_fields(self._persisted, data)
+            mode = "update" if payload else "noop"
         
-        if doc_id:
-            # Sauvegarde avec un ID spécifique
-            db.collection(self.collection_name).document(doc_id).set(data)
-            self.id = doc_id
-            return doc_id
-        elif self.id:
-            # Mise à jour d'un document existant
-            db.collection(self.collection_name).document(self.id).set(data)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"{self.collection_name}/{self.id}: {mode} de {len(payload)} champ(s), "
+                f"{payload_size(payload)} octets (document complet: {payload_size(data)} octets)"
+            )
+        return mode, payload
+    
+    def save(self, doc_id: Optional[str] = None, full: bool = False) -> str:
+        """
+        Sauvegarde l'objet dans Firestore (à la fin de la session si une session est active).
+        Un document lu depuis Firestore est mis à jour avec les seuls champs modifiés.
+        
+        Args:
+            doc_id (Optional[str]): ID du document à écrire, sinon l'ID de l'objet ou un ID généré
+            full (bool): Si True, réécrit le document complet avec set()
+            
+        Returns:
+            str: ID du document
+        """
+        db = self.get_db()
+        
+        if doc_id and doc_id != self.id:
+            # Écriture vers un autre document: l'état enregistré ne s'applique pas
+            self._persisted = None
+        
+        session = get_current_session()
+        if session is not None and self.deferred_writes:
+            if doc_id:
+                self.id = doc_id
+            elif not self.id:
+                # ID généré localement, comme le ferait add()
+                self.id = db.collection(self.collection_name).document().id
+            session.add(self, full)
+            return self.id
+        
+        if doc_id or self.id:
+            self.id = doc_id or self.id
+            write_document(db.collection(self.collection_name).document(self.id), self, full)
             return self.id
         else:
             # Création d'un nouveau document avec ID auto-généré
-            doc_ref = db.collection(self.collection_name).add(data)[1]
+            doc_ref = db.collection(self.collection_name).add(self.to_dict())[1]
             self.id = doc_ref.id
+            self.mark_persisted()
             return doc_ref.id
+    
+    async def asave(self, doc_id: Optional[str] = None, full: bool = False) -> str:
+        """
+        Variante asynchrone de save, sur le client asynchrone de Firestore.
+        Dans une session, l'écriture est différée comme avec save().
+        
+        Args:
+            doc_id (Optional[str]): ID du document à écrire, sinon l'ID de l'objet ou un ID généré
+            full (bool): Si True, réécrit le document complet avec set()
+            
+        Returns:
+            str: ID du document
+        """
+        if get_current_session() is not None and self.deferred_writes:
+            # Aucun appel réseau: le document est écrit à la fin de la session
+            return self.save(doc_id, full)
+        
+        if doc_id and doc_id != self.id:
+            self._persisted = None
+        collection = self.get_async_db().collection(self.collection_name)
+        # ID généré localement pour un nouveau document, comme le ferait add()
+        self.id = doc_id or self.id or collection.document().id
+        await awrite_document(collection.document(self.id), self, full)
+        return self.id
 
     @classmethod
-    def list_all(cls: Type[T]) -> List[T]:
-        """Récupère tous les documents d'une collection"""
-        db = cls.get_db()
-        docs = db.collection(cls.collection_name).stream()
-        return [cls.from_doc_snapshot(doc) for doc in docs]
+    def _build_query(cls, filters: Optional[Sequence[QueryFilter]] = None, select: Optional[Sequence[str]] = None,
+                     order_by: Optional[Sequence[str]] = None, db=None):
+        """Construit la requête Firestore: filtres, projection et tri ("-champ" pour un tri décroissant)"""
+        query = (db or cls.get_db()).collection(cls.collection_name)
+        for field, operator, value in filters or ():
+            query = query.where(field, operator, value)
+        if select is not None:
+            query = query.select(list(select))
+        for field in order_by or ():
+            if field.startswith("-"):
+                query = query.order_by(field[1:], direction=firestore.Query.DESCENDING)
+            else:
+                query = query.order_by(field)
+        return query
+    
+    @classmethod
+    def iter_pages(cls, filters: Optional[Sequence[QueryFilter]] = None, select: Optional[Sequence[str]] = None,
+                   order_by: Optional[Sequence[str]] = None, limit: Optional[int] = None,
+                   page_size: int = DEFAULT_PAGE_SIZE, raw: bool = False) -> Iterator[List[Any]]:
+        """
+        Parcourt une requête page par page: chaque page est lue par un appel Firestore
+        qui reprend après le dernier document de la page précédente (curseur).
+        Seule la page courante est en mémoire.
         
+        Args:
+            filters (Optional[Sequence[QueryFilter]]): Filtres (champ, opérateur, valeur)
+            select (Optional[Sequence[str]]): Champs à lire (projection), uniquement en mode raw
+            order_by (Optional[Sequence[str]]): Champs de tri, préfixés par "-" pour un tri décroissant
+            limit (Optional[int]): Nombre maximal de documents à retourner
+            page_size (int): Nombre de documents lus par appel
+            raw (bool): Si True, retourne les dictionnaires bruts (avec leur "id") sans validation pydantic
+            
+        Returns:
+            Iterator[List[Any]]: Pages de modèles, ou de dictionnaires en mode raw
+            
+        Raises:
+            ValueError: Si une projection est demandée sans le mode raw
+        """
+        cls._check_query_args(select, page_size, raw)
+        query = cls._build_query(filters, select, order_by)
+        remaining = limit
+        last_snapshot = None
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            page_query = query.limit(size)
+            if last_snapshot is not None:
+                page_query = page_query.start_after(last_snapshot)
+            snapshots = list(page_query.stream())
+            if not snapshots:
+                return
+            yield cls._build_page(snapshots, raw)
+            
+            if len(snapshots) < size:
+                return
+            last_snapshot = snapshots[-1]
+            if remaining is not None:
+                remaining -= len(snapshots)
+    
+    @staticmethod
+    def _check_query_args(select: Optional[Sequence[str]], page_size: int, raw: bool) -> None:
+        if select is not None and not raw:
+            # Un modèle partiel écraserait les champs non lus lors de save()
+            raise ValueError("La projection (select) nécessite raw=True")
+        if page_size <= 0:
+            raise ValueError("page_size doit être strictement positif")
+    
+    @classmethod
+    def _build_page(cls, snapshots: Sequence[Any], raw: bool) -> List[Any]:
+        if raw:
+            return [{**(snapshot.to_dict() or {}), "id": snapshot.id} for snapshot in snapshots]
+        return [cls.from_doc_snapshot(snapshot) for snapshot in snapshots]
+    
+    @classmethod
+    async def aiter_pages(cls, filters: Optional[Sequence[QueryFilter]] = None, select: Optional[Sequence[str]] = None,
+                          order_by: Optional[Sequence[str]] = None, limit: Optional[int] = None,
+                          page_size: int = DEFAULT_PAGE_SIZE, raw: bool = False) -> AsyncIterator[List[Any]]:
+        """
+        Variante asynchrone de iter_pages (mêmes arguments), sur le client asynchrone de Firestore.
+        
+        Returns:
+            AsyncIterator[List[Any]]: Pages de modèles, ou de dictionnaires en mode raw
+        """
+        cls._check_query_args(select, page_size, raw)
+        query = cls._build_query(filters, select, order_by, db=cls.get_async_db())
+        remaining = limit
+        last_snapshot = None
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            page_query = query.limit(size)
+            if last_snapshot is not None:
+                page_query = page_query.start_after(last_snapshot)
+            snapshots = await _collect(page_query.stream)
+            if not snapshots:
+                return
+            yield cls._build_page(snapshots, raw)
+            
+            if len(snapshots) < size:
+                return
+            last_snapshot = snapshots[-1]
+            if remaining is not None:
+                remaining -= len(snapshots)
+    
+    @classmethod
+    async def aiter_query(cls, filters: Optional[Sequence[QueryFilter]] = None, select: Optional[Sequence[str]] = None,
+                          order_by: Optional[Sequence[str]] = None, limit: Optional[int] = None,
+                          page_size: int = DEFAULT_PAGE_SIZE, raw: bool = False) -> AsyncIterator[Any]:
+        """
+        Variante asynchrone de iter_query (mêmes arguments).
+        
+        Returns:
+            AsyncIterator[Any]: Modèles, ou dictionnaires en mode raw
+        """
+        async for page in cls.aiter_pages(filters, select, order_by, limit, page_size, raw):
+            for item in page:
+                yield item
+    
+    @classmethod
+    def iter_query(cls, filters: Optional[Sequence[QueryFilter]] = None, select: Optional[Sequence[str]] = None,
+                   order_by: Optional[Sequence[str]] = None, limit: Optional[int] = None,
+                   page_size: int = DEFAULT_PAGE_SIZE, raw: bool = False) -> Iterator[Any]:
+        """
+        Parcourt les documents d'une requête un par un, avec une pagination par curseur.
+        Mêmes arguments que iter_pages.
+        
+        Returns:
+            Iterator[Any]: Modèles, ou dictionnaires en mode raw
+        """
+        for page in cls.iter_pages(filters, select, order_by, limit, page_size, raw):
+            yield from page
+    
+    @classmethod
+    def list_all(cls: Type[T], limit: Optional[int] = None) -> List[T]:
+        """Récupère tous les documents d'une collection (iter_query pour les grandes collections)"""
+        return list(cls.iter_query(limit=limit))
+        
+    @classmethod
+    def query(cls: Type[T], field: str, operator: str, value: Any, limit: Optional[int] = None) -> List[T]:
+        """Effectue une requête simple sur la collection (iter_query pour les grands résultats)"""
+        return list(cls.iter_query(filters=[(field, operator, value)], limit=limit))
+    
+    @classmethod
+    async def aquery(cls: Type[T], field: str, operator: str, value: Any, limit: Optional[int] = None) -> List[T]:
+        """Variante asynchrone de query"""
+        return [item async for item in cls.aiter_query(filters=[(field, operator, value)], limit=limit)]
+    
+    @staticmethod
+    def save_many(models: Sequence["FirestoreModel"], full: bool = False) -> Dict[str, Any]:
+        """
+        Écrit plusieurs modèles, éventuellement de collections différentes, par lots de 500 écritures.
+        Les écritures sont immédiates, même dans une session. Les modèles lus depuis Firestore
+        ne reçoivent que leurs champs modifiés; les modèles sans ID reçoivent un ID généré.
+        
+        Args:
+            models (Sequence[FirestoreModel]): Modèles à écrire
+            full (bool): Si True, réécrit les documents complets avec set()
+            
+        Returns:
+            Dict[str, Any]: Rapport d'écriture (voir bulk_write)
+        """
+        for model in models:
+            if not model.id:
+                model.id = model.get_db().collection(model.collection_name).document().id
+        return bulk_write([(model, full) for model in models])
+    
     @classmethod
-    def query(cls: Type[T], field: str, operator: str, value: Any) -> List[T]:
-        """Effectue une requête simple sur la collection"""
+    def delete_many(cls, docs: Sequence[Any]) -> Dict[str, Any]:
+        """
+        Supprime plusieurs documents de la collection par lots de 500 suppressions.
+        
+        Args:
+            docs (Sequence[Any]): Modèles ou IDs de documents de la collection
+            
+        Returns:
+            Dict[str, Any]: Rapport de suppression (voir bulk_write)
+        """
+        doc_ids = [doc if isinstance(doc, str) else doc.id for doc in docs]
         db = cls.get_db()
-        query = db.collection(cls.collection_name).where(field, operator, value)
-        docs = query.stream()
-        return [cls.from_doc_snapshot(doc) for doc in docs] 
\ No newline at end of file
+        refs = [db.collection(cls.collection_name).document(doc_id) for doc_id in doc_ids if doc_id]
+        
+        def add_deletes(batch, chunk):
+            for ref in chunk:
+                batch.delete(ref)
+            return chunk
+        
+        report = _commit_in_batches(db, refs, add_deletes, "suppression")
+        metrics.increment("firestore.bulk.documents_deleted", report["documents"])
+        session = get_current_session()
+        for ref in refs:
+            document_cache.invalidate((cls.collection_name, ref.id))
+            if session is not None:
+                session.register(cls, ref.id, None)
+        return report
+
+def _commit_with_retry(db, build_batch, description: str, retry_on=TRANSIENT_ERRORS, recover=None) -> Tuple[Any, int]:
+    """
+    Construit et valide un lot, avec de nouvelles tentatives espacées exponentiellement
+    en cas d'erreur transitoire. Le lot est reconstruit à chaque tentative.
+    
+    Args:
+        db: Client Firestore
+        build_batch (Callable): Fonction remplissant un lot et retournant son contenu
+        description (str): Nature des opérations, pour les logs
+        retry_on (Tuple[type, ...]): Erreurs donnant lieu à une nouvelle tentative
+        recover (Optional[Callable]): Fonction (erreur, contenu) appelée pour les autres erreurs;
+            si elle retourne True, le lot est reconstruit et renvoyé aussitôt
+        
+    Returns:
+        Tuple[Any, int]: Contenu du lot validé et nombre de nouvelles tentatives
+    """
+    attempt = 0
+    while True:
+        batch = db.batch()
+        content = build_batch(batch)
+        if not content:
+            return content, attempt
+        try:
+            batch.commit()
+            return content, attempt
+        except retry_on as e:
+            if attempt >= BULK_MAX_RETRIES:
+                raise
+            delay = min(BULK_BACKOFF_BASE * 2 ** attempt, BULK_BACKOFF_MAX)
+            attempt += 1
+            metrics.increment("firestore.bulk.retries")
+            logger.warning(f"Lot refusé ({description}, {type(e).__name__}), nouvelle tentative {attempt} dans {delay:.1f} s")
+            time.sleep(delay)
+        except Exception as e:
+            if recover is None or not recover(e, content):
+                raise
+            metrics.increment("firestore.bulk.recovered")
+            logger.warning(f"Lot refusé ({description}, {type(e).__name__}), renvoyé après correction")
+
+
+def _commit_in_batches(db, items: Sequence[Any], add_to_batch, description: str, on_commit=None,
+                       retry_on=TRANSIENT_ERRORS, recover=None) -> Dict[str, Any]:
+    """
+    Découpe des opérations en lots de MAX_BATCH_WRITES et les valide l'un après l'autre.
+    
+    Args:
+        db: Client Firestore
+        items (Sequence[Any]): Éléments à traiter
+        add_to_batch (Callable): Fonction (lot, tranche) ajoutant les opérations d'une tranche
+            au lot et retournant les éléments effectivement ajoutés
+        description (str): Nature des opérations, pour les logs
+        on_commit (Optional[Callable]): Fonction appelée avec le contenu de chaque lot validé
+        retry_on (Tuple[type, ...]): Erreurs donnant lieu à une nouvelle tentative d'un lot
+        recover (Optional[Callable]): Correction d'un lot refusé (voir _commit_with_retry)
+        
+    Returns:
+        Dict[str, Any]: Rapport: documents traités et ignorés, lots, nouvelles tentatives,
+            durée et débit en documents par seconde
+            
+    Raises:
+        BatchCommitError: Si un lot échoue définitivement, avec les éléments validés et non validés
+    """
+    start = time.perf_counter()
+    written = 0
+    batches = 0
+    retries = 0
+    for offset in range(0, len(items), MAX_BATCH_WRITES):
+        chunk = items[offset:offset + MAX_BATCH_WRITES]
+        try:
+            content, chunk_retries = _commit_with_retry(
+                db, lambda batch: add_to_batch(batch, chunk), description, retry_on, recover
+            )
+        except Exception as e:
+            ambiguous = isinstance(e, AMBIGUOUS_ERRORS)
+            raise BatchCommitError(
+                description,
+                committed=list(items[:offset]),
+                uncommitted=list(items[offset + (len(chunk) if ambiguous else 0):]),
+                unknown=list(chunk) if ambiguous else [],
+                cause=e,
+            ) from e
+        retries += chunk_retries
+        if content:
+            batches += 1
+            written += len(content)
+            if on_commit is not None:
+                on_commit(content)
+    elapsed = time.perf_counter() - start
+    
+    report = {
+        "documents": written,
+        "skipped": len(items) - written,
+        "batches": batches,
+        "retries": retries,
+        "elapsed_ms": round(elapsed * 1000, 2),
+        "docs_per_second": round(written / elapsed, 1) if elapsed > 0 and written else 0.0,
+    }
+    if written:
+        logger.info(
+            f"{description.capitalize()} de {written} document(s) en {batches} lot(s) en {report['elapsed_ms']:.2f} ms "
+            f"({report['docs_per_second']} documents/s, {retries} nouvelle(s) tentative(s))"
+        )
+    return report
+
+
+def bulk_write(items: Sequence[Tuple[FirestoreModel, bool]]) -> Dict[str, Any]:
+    """
+    Écrit des modèles par lots, selon prepare_write (set complet ou champs modifiés).
+    Les modèles sans modification ne sont pas écrits. Après la validation de chaque lot,
+    ses modèles sont marqués comme enregistrés et retirés du cache de lecture.
+    Un lot refusé parce qu'un document mis à jour a été supprimé depuis sa lecture est
+    renvoyé avec ce document réécrit entièrement, comme dans write_document.
+    Si un lot échoue définitivement, les lots précédents restent écrits.
+    
+    Args:
+        items (Sequence[Tuple[FirestoreModel, bool]]): Couples (modèle avec ID, set complet)
+        
+    Returns:
+        Dict[str, Any]: Rapport: documents écrits et ignorés, lots, nouvelles tentatives,
+            durée, débit en documents par seconde
+    """
+    if not items:
+        return {"documents": 0, "skipped": 0, "batches": 0, "retries": 0, "elapsed_ms": 0.0, "docs_per_second": 0.0}
+    db = items[0][0].get_db()
+    # Chemins des documents supprimés depuis leur lecture, à réécrire entièrement
+    missing: Set[str] = set()
+    
+    def add_writes(batch, chunk):
+        pending = []
+        for instance, full in chunk:
+            ref = db.collection(instance.collection_name).document(instance.id)
+            if write_document(ref, instance, full or ref.path in missing, batch=batch) != "noop":
+                pending.append(instance)
+        return pending
+    
+    def recover_missing(error, instances):
+        if not isinstance(error, NotFound):
+            return False
+        # Un update() du lot vise un document supprimé: lot annulé en entier, documents absents recherchés
+        refs = [db.collection(instance.collection_name).document(instance.id) for instance in instances]
+        refs = [ref for ref in refs if ref.path not in missing]
+        absent = {snapshot.reference.path for snapshot in db.get_all(refs) if not snapshot.exists}
+        missing.update(absent)
+        return bool(absent)
+    
+    def mark_committed(instances):
+        for instance in instances:
+            instance.mark_persisted()
+            document_cache.invalidate((instance.collection_name, instance.id))
+    
+    report = _commit_in_batches(db, items, add_writes, "écriture", mark_committed, recover=recover_missing)
+    metrics.increment("firestore.bulk.documents_written", report["documents"])
+    return report
+
+
+async def _io(fn, *args: Any, **kwargs: Any) -> Any:
+    """
+    Exécute un appel de la base depuis une coroutine: coroutine du client asynchrone de Firestore,
+    ou appel bloquant du substitut local dans un thread.
+    """
+    if config.FIRESTORE_BACKEND != "firestore":
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    return await fn(*args, **kwargs)
+
+
+async def _collect(fn, *args: Any) -> List[Any]:
+    """Collecte un flux de snapshots (stream, get_all): générateur asynchrone, ou itérateur du substitut local"""
+    if config.FIRESTORE_BACKEND != "firestore":
+        return await asyncio.to_thread(lambda: list(fn(*args)))
+    return [item async for item in fn(*args)]
+
+
+def write_document(ref, instance: FirestoreModel, full: bool = False, batch=None) -> str:
+    """
+    Écrit un modèle dans Firestore, directement ou dans un lot, selon prepare_write.
+    
+    Args:
+        ref: Référence du document
+        instance (FirestoreModel): Modèle à écrire
+        full (bool): Si True, réécrit le document complet avec set()
+        batch: Lot Firestore dans lequel ajouter l'écriture (écriture immédiate si None).
+            Dans ce cas, l'appelant appelle mark_persisted() et invalide le cache après le commit du lot.
+        
+    Returns:
+        str: Mode d'écriture utilisé ("set", "update" ou "noop")
+    """
+    mode, payload = instance.prepare_write(full)
+    if mode == "set":
+        if batch is not None:
+            batch.set(ref, payload)
+        else:
+            ref.set(payload)
+    elif mode == "update":
+        if batch is not None:
+            batch.update(ref, payload)
+        else:
+            try:
+                ref.update(payload)
+            except NotFound:
+                # Document supprimé depuis sa lecture: le recréer entièrement
+                mode = "set"
+                ref.set(instance.to_dict())
+    if batch is None:
+        instance.mark_persisted()
+        document_cache.invalidate((instance.collection_name, instance.id))
+    return mode
+
+
+async def awrite_document(ref, instance: FirestoreModel, full: bool = False) -> str:
+    """
+    Variante asynchrone de write_document (écriture immédiate).
+    
+    Args:
+        ref: Référence du document, sur le client asynchrone
+        instance (FirestoreModel): Modèle à écrire
+        full (bool): Si True, réécrit le document complet avec set()
+        
+    Returns:
+        str: Mode d'écriture utilisé ("set", "update" ou "noop")
+    """
+    mode, payload = instance.prepare_write(full)
+    if mode == "set":
+        await _io(ref.set, payload)
+    elif mode == "update":
+        try:
+            await _io(ref.update, payload)
+        except NotFound:
+            # Document supprimé depuis sa lecture: le recréer entièrement
+            mode = "set"
+            await _io(ref.set, instance.to_dict())
+    instance.mark_persisted()
+    document_cache.invalidate((instance.collection_name, instance.id))
+    return mode
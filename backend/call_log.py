@@ -0,0 +1,204 @@
+"""
+Écriture en arrière-plan du journal des appels (collection 'calls').
+
+Avec CALL_LOG_BUFFERED, CallDocument.create_call ne fait plus d'appel Firestore:
+le document reçoit un ID généré localement et est placé dans une file bornée. Un
+thread écrit la file par lots, toutes les CALL_LOG_FLUSH_MS millisecondes ou dès
+que CALL_LOG_BATCH_SIZE documents sont en attente.
+
+File pleine: selon CALL_LOG_FULL_POLICY, le document est abandonné ("drop") ou
+l'appelant attend une place au plus CALL_LOG_BLOCK_TIMEOUT secondes ("block"). Depuis
+une boucle asyncio (block=False), le document est toujours abandonné sans attente.
+Les documents en attente sont écrits à l'arrêt du worker (hook gunicorn worker_exit)
+ou du processus (atexit).
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from backend.base_firestore import FirestoreModel
+from backend.config import load_config
+from backend.metrics import metrics
+
+logger = logging.getLogger(__name__)
+config = load_config()
+
+
+class CallLogWriter:
+    """File bornée de documents à écrire, vidée par lots par un thread daemon"""
+
+    def __init__(self, max_queue: int, flush_interval_ms: float, batch_size: int,
+                 full_policy: str = "drop", block_timeout: float = 1.0):
+        self.flush_interval = flush_interval_ms / 1000
+        self.batch_size = batch_size
+        self.full_policy = full_policy
+        self.block_timeout = block_timeout
+        self._queue: "queue.Queue[FirestoreModel]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.queued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def enqueue(self, document: FirestoreModel, block: bool = True) -> bool:
+        """
+        Place un document dans la file d'écriture.
+
+        Args:
+            document (FirestoreModel): Document à écrire, avec son ID
+            block (bool): Si False, n'attend jamais une place dans la file, quelle que soit
+                CALL_LOG_FULL_POLICY (appel depuis une boucle asyncio)
+
+        Returns:
+            bool: False si le document a été abandonné (file pleine ou writer arrêté)
+        """
+        if self._stopping.is_set():
+            # Après la vidange de l'arrêt: écriture immédiate plutôt qu'une perte
+            document.save()
+            return True
+        self._start()
+        try:
+            if block and self.full_policy == "block":
+                self._queue.put(document, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(document)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            metrics.increment("call_log.dropped")
+            logger.warning(f"File du journal des appels pleine: document {document.collection_name}/{document.id} abandonné")
+            return False
+        with self._lock:
+            self.queued += 1
+        if self._stopping.is_set():
+            # Vidange de l'arrêt commencée pendant l'ajout: le document n'est peut-être plus lu
+            self._flush_remaining()
+        return True
+
+    def _take_batch(self, wait: bool) -> List[FirestoreModel]:
+        """Retourne jusqu'à batch_size documents, en attendant au plus flush_interval le premier"""
+        batch: List[FirestoreModel] = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if wait and timeout > 0:
+                    batch.append(self._queue.get(timeout=timeout))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[FirestoreModel]) -> None:
+        if not batch:
+            return
+        try:
+            with self._write_lock:
+                report = FirestoreModel.save_many(batch)
+        except Exception as e:
+            with self._lock:
+                self.failed += len(batch)
+            metrics.increment("call_log.failed", len(batch))
+            logger.error(f"Erreur lors de l'écriture de {len(batch)} document(s) du journal des appels: {str(e)}")
+            return
+        with self._lock:
+            self.flushed += report["documents"]
+            self.batches += 1
+        metrics.increment("call_log.flushed", report["documents"])
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._write(self._take_batch(wait=True))
+
+    def _start(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="call-log-writer", daemon=True)
+            self._thread.start()
+        atexit.register(self.drain)
+
+    def _flush_remaining(self) -> None:
+        """Écrit immédiatement les documents encore en file"""
+        while True:
+            batch = self._take_batch(wait=False)
+            if not batch:
+                break
+            self._write(batch)
+
+    def drain(self, timeout: float = 10.0) -> int:
+        """
+        Arrête le thread d'écriture et écrit les documents encore en file.
+
+        Args:
+            timeout (float): Attente maximale de la fin du lot en cours, en secondes
+
+        Returns:
+            int: Nombre de documents écrits par la vidange
+        """
+        if self._stopping.is_set():
+            return 0
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        flushed_before = self.flushed
+        self._flush_remaining()
+        written = self.flushed - flushed_before
+        if written:
+            logger.info(f"Journal des appels: {written} document(s) écrit(s) à l'arrêt")
+        return written
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retourne les compteurs du journal des appels"""
+        with self._lock:
+            return {
+                "enabled": config.CALL_LOG_BUFFERED,
+                "pending": self._queue.qsize(),
+                "max_queue": self._queue.maxsize,
+                "full_policy": self.full_policy,
+                "queued": self.queued,
+                "flushed": self.flushed,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "batches": self.batches,
+            }
+
+
+# Writer unique du processus
+call_log_writer = CallLogWriter(
+    config.CALL_LOG_MAX_QUEUE,
+    config.CALL_LOG_FLUSH_MS,
+    config.CALL_LOG_BATCH_SIZE,
+    config.CALL_LOG_FULL_POLICY,
+    config.CALL_LOG_BLOCK_TIMEOUT,
+)
+metrics.register_collector("call_log", call_log_writer.get_stats)
+
+
+def log_call(document: FirestoreModel, block: bool = True) -> None:
+    """
+    Écrit un document du journal des appels: en arrière-plan avec CALL_LOG_BUFFERED,
+    sinon immédiatement (ou à la fin de la session active).
+
+    Args:
+        document (FirestoreModel): Document à écrire
+        block (bool): Si False, le document est abandonné plutôt que d'attendre une place
+            dans une file pleine (appel depuis une boucle asyncio)
+    """
+    if not config.CALL_LOG_BUFFERED:
+        document.save()
+        return
+    if not document.id:
+        # ID généré localement, comme le ferait add()
+        document.id = document.get_db().collection(document.collection_name).document().id
+    call_log_writer.enqueue(document, block=block)
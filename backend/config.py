@@ -1,9 +1,20 @@
 import os
+import json
+import time
+import threading
+from abc import ABC, abstractmethod
 from pathlib import Path
-from google.cloud import secretmanager
+from typing import Dict, Optional, Tuple
 
 import logging
 
+logger = logging.getLogger(__name__)
+
+# Instant de référence pour mesurer le démarrage à froid du conteneur
+_BOOT_TIME = time.perf_counter()
+_startup_timings: Dict[str, float] = {}
+_startup_lock = threading.Lock()
+
 def configure_logging():
     logging.basicConfig(
         level=logging.INFO,  # Capture uniquement les logs INFO et supérieurs
@@ -22,42 +33,290 @@ def configure_logging():
     logging.getLogger("cv_automation").setLevel(logging.INFO)
 
 
+def record_startup_timing(step: str, seconds: float) -> None:
+    """
+    Enregistre la durée d'une étape du démarrage à froid.
+
+    Args:
+        step (str): Nom de l'étape (ex: "load_config", "secret:OPENAI_API_KEY")
+        seconds (float): Durée de l'étape en secondes
+    """
+    with _startup_lock:
+        _startup_timings[step] = _startup_timings.get(step, 0.0) + seconds
+
+
+def get_startup_report() -> Dict[str, float]:
+    """
+    Retourne les durées de démarrage enregistrées, en millisecondes.
+
+    Returns:
+        Dict[str, float]: Durée de chaque étape et temps total depuis l'import de la configuration
+    """
+    with _startup_lock:
+        report = {step: round(seconds * 1000, 2) for step, seconds in _startup_timings.items()}
+    report["total_since_config_import"] = round((time.perf_counter() - _BOOT_TIME) * 1000, 2)
+    return report
+
+
+def log_startup_report() -> None:
+    """Affiche le rapport de démarrage à froid dans les logs"""
+    report = get_startup_report()
+    details = ", ".join(f"{step}={ms:.2f}ms" for step, ms in report.items())
+    logger.info(f"Rapport de démarrage à froid: {details}")
+
+
+# ====== Fournisseurs de secrets ======
+
+class SecretProvider(ABC):
+    """Interface commune des fournisseurs de secrets"""
+
+    name = "base"
+
+    @abstractmethod
+    def get(self, secret_name: str) -> Optional[str]:
+        """Retourne la valeur du secret ou None s'il est introuvable"""
+
+
+class EnvSecretProvider(SecretProvider):
+    """Lit les secrets dans les variables d'environnement (ex: --update-secrets de Cloud Run)"""
+
+    name = "env"
+
+    def get(self, secret_name: str) -> Optional[str]:
+        return os.getenv(secret_name) or None
+
+
+class LocalFileSecretProvider(SecretProvider):
+    """Lit les secrets dans un fichier JSON local, pour les exécutions hors ligne"""
+
+    name = "local_file"
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or os.getenv("SECRETS_FILE", ".secrets.json"))
+
+    def get(self, secret_name: str) -> Optional[str]:
+        if not self.path.exists():
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f).get(secret_name)
+        except Exception as e:
+            logger.error(f"Erreur lors de la lecture du fichier de secrets {self.path}: {str(e)}")
+            return None
+
+
+class SecretManagerProvider(SecretProvider):
+    """Lit les secrets dans Google Secret Manager. Le client n'est créé qu'au premier accès."""
+
+    name = "secret_manager"
+
+    def __init__(self, project_number: str, version: str = "latest"):
+        self.project_number = project_number
+        self.version = version
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    def _get_client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    # Import différé: la bibliothèque gRPC est coûteuse à charger
+                    from google.cloud import secretmanager
+                    self._client = secretmanager.SecretManagerServiceClient()
+        return self._client
+
+    def get(self, secret_name: str) -> Optional[str]:
+        name = f"projects/{self.project_number}/secrets/{secret_name}/versions/{self.version}"
+        response = self._get_client().access_secret_version(request={"name": name})
+        return response.payload.data.decode("UTF-8")
+
+
+class SecretCache:
+    """
+    Résout les secrets à la demande auprès d'une chaîne de fournisseurs
+    et conserve les valeurs pendant `refresh_interval` secondes.
+    """
+
+    def __init__(self, providers, refresh_interval: float = 3600):
+        self.providers = list(providers)
+        self.refresh_interval = refresh_interval
+        self._values: Dict[str, Tuple[Optional[str], float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, secret_name: str) -> Optional[str]:
+        """
+        Retourne la valeur du secret, en la rafraîchissant si elle a expiré.
+        En cas d'échec du rafraîchissement, l'ancienne valeur est conservée.
+
+        Args:
+            secret_name (str): Nom du secret
+
+        Returns:
+            Optional[str]: Valeur du secret ou None si aucun fournisseur ne le connaît
+        """
+        cached = self._values.get(secret_name)
+        if cached and time.monotonic() - cached[1] < self.refresh_interval:
+            return cached[0]
+
+        with self._lock:
+            cached = self._values.get(secret_name)
+            if cached and time.monotonic() - cached[1] < self.refresh_interval:
+                return cached[0]
+
+            start = time.perf_counter()
+            try:
+                value = self._resolve(secret_name)
+            except Exception as e:
+                logger.error(f"Erreur lors de la résolution du secret {secret_name}: {str(e)}")
+                if cached:
+                    return cached[0]
+                raise
+            elapsed = time.perf_counter() - start
+            if cached is None:
+                record_startup_timing(f"secret:{secret_name}", elapsed)
+            logger.info(f"Secret {secret_name} résolu en {elapsed * 1000:.2f} ms")
+
+            self._values[secret_name] = (value, time.monotonic())
+            return value
+
+    def _resolve(self, secret_name: str) -> Optional[str]:
+        for provider in self.providers:
+            value = provider.get(secret_name)
+            if value:
+                logger.info(f"Secret {secret_name} fourni par '{provider.name}'")
+                return value
+        logger.warning(f"Secret {secret_name} introuvable")
+        return None
+
+
+class LazySecret:
+    """Attribut de configuration dont la valeur est résolue au premier accès"""
+
+    def __init__(self, secret_name: str):
+        self.secret_name = secret_name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return instance.secrets.get(self.secret_name)
+
+
+# ====== Configurations ======
+
 class BaseConfig:
     # Valeurs communes à tous les environnements
     TEMP_PATH = Path("/tmp")  # Chemin temporaire
     BUCKET_NAME = "cv-generator-447314.firebasestorage.app"
+    GCP_PROJECT_NUMBER = "177360827241"
     ENV = None
-    OPENAI_API_KEY = None
+    OPENAI_API_KEY = LazySecret("OPENAI_API_KEY")
     CHECK_AUTH = True  # Valeur par défaut
     CHECK_RATE_LIMIT = True
+    SECRET_REFRESH_INTERVAL = int(os.getenv("SECRET_REFRESH_INTERVAL", "3600"))  # En secondes
+    # Exécution des graphes LangGraph en asyncio (ainvoke) sur une boucle partagée
+    ASYNC_GRAPHS = os.getenv("ASYNC_GRAPHS", "0") == "1"
+    # Jobs asynchrones (POST /api/v2/generate-cv avec "async": true)
+    JOB_STORE = os.getenv("JOB_STORE", "firestore")  # "firestore" ou "memory"
+    JOB_MAX_WORKERS = int(os.getenv("JOB_MAX_WORKERS", "4"))
+    JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "32"))
+    # Génération par lot (POST /api/v2/generate-cvs)
+    BATCH_MAX_CVS = int(os.getenv("BATCH_MAX_CVS", "10"))
+    BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "4"))
+    # Regroupement des générations identiques en cours (single-flight)
+    SINGLE_FLIGHT_TIMEOUT = int(os.getenv("SINGLE_FLIGHT_TIMEOUT", "600"))  # Attente max d'un suiveur, en secondes
+    SINGLE_FLIGHT_LEASE = os.getenv("SINGLE_FLIGHT_LEASE", "0") == "1"  # Bail Firestore entre instances
+    LEASE_TTL = int(os.getenv("LEASE_TTL", "300"))  # En secondes
+    LEASE_POLL_INTERVAL = float(os.getenv("LEASE_POLL_INTERVAL", "1.0"))  # En secondes
+    # Cache de lecture des documents entre requêtes (TTL par modèle: attribut cache_ttl)
+    MODEL_CACHE_ENABLED = os.getenv("MODEL_CACHE", "0") == "1"
+    MODEL_CACHE_MAX_BYTES = int(os.getenv("MODEL_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    # Stockage des documents: "firestore", ou substitut local "memory" / "sqlite" (backend.local_firestore)
+    FIRESTORE_BACKEND = os.getenv("FIRESTORE_BACKEND", "firestore")
+    FIRESTORE_SQLITE_PATH = os.getenv("FIRESTORE_SQLITE_PATH", "/tmp/firestore_local.sqlite3")
+    FIRESTORE_LATENCY_MS = float(os.getenv("FIRESTORE_LATENCY_MS", "0"))  # Latence simulée par appel
+    FIRESTORE_SEED_FILE = os.getenv("FIRESTORE_SEED_FILE", "")  # JSON {collection: {id: document}}
+    # Lectures préalables à la génération concurrentes sur le client Firestore asynchrone
+    ASYNC_FIRESTORE = os.getenv("ASYNC_FIRESTORE", "0") == "1"
+    ASYNC_FIRESTORE_TIMEOUT = float(os.getenv("ASYNC_FIRESTORE_TIMEOUT", "10"))  # En secondes
+    # Cache des jetons d'identification vérifiés (backend.auth_cache)
+    AUTH_TOKEN_CACHE_ENABLED = os.getenv("AUTH_TOKEN_CACHE", "1") == "1"
+    AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+    AUTH_REVOCATION_CHECK_INTERVAL = float(os.getenv("AUTH_REVOCATION_CHECK_INTERVAL", "0"))  # En secondes, 0: désactivé
+    AUTH_KEYS_REFRESH_INTERVAL = float(os.getenv("AUTH_KEYS_REFRESH_INTERVAL", "600"))  # En secondes
+    # Contrôle d'admission en mémoire et écriture différée de l'usage (backend.usage_limiter)
+    USAGE_LIMITER_ENABLED = os.getenv("USAGE_LIMITER", "0") == "1"
+    USAGE_STALENESS = float(os.getenv("USAGE_STALENESS", "30"))  # Âge max de l'état d'un utilisateur, en secondes
+    USAGE_FLUSH_INTERVAL = float(os.getenv("USAGE_FLUSH_INTERVAL", "1.0"))  # En secondes
+    USAGE_LIMITER_MAX_USERS = int(os.getenv("USAGE_LIMITER_MAX_USERS", "100000"))
+    # Écriture du journal des appels en arrière-plan, par lots (backend.call_log)
+    CALL_LOG_BUFFERED = os.getenv("CALL_LOG_BUFFERED", "0") == "1"
+    CALL_LOG_FLUSH_MS = float(os.getenv("CALL_LOG_FLUSH_MS", "500"))
+    CALL_LOG_BATCH_SIZE = int(os.getenv("CALL_LOG_BATCH_SIZE", "100"))
+    CALL_LOG_MAX_QUEUE = int(os.getenv("CALL_LOG_MAX_QUEUE", "10000"))
+    CALL_LOG_FULL_POLICY = os.getenv("CALL_LOG_FULL_POLICY", "drop")  # "drop" ou "block"
+    CALL_LOG_BLOCK_TIMEOUT = float(os.getenv("CALL_LOG_BLOCK_TIMEOUT", "1.0"))  # En secondes
+    # Téléchargement parallèle des fichiers sources du profil (backend.utils.utils_gcs2)
+    SOURCE_DOWNLOAD_WORKERS = int(os.getenv("SOURCE_DOWNLOAD_WORKERS", "8"))
+    # Cache du texte extrait des PDF sources: objet {source}.txt.gz et répertoire local
+    SOURCE_TEXT_CACHE_ENABLED = os.getenv("SOURCE_TEXT_CACHE", "0") == "1"
+    SOURCE_TEXT_CACHE_DIR = os.getenv("SOURCE_TEXT_CACHE_DIR", "/tmp/source_text_cache")
+    # Extraction du texte des PDF sources (backend.utils.pdf_extraction)
+    PDF_PROCESS_POOL = os.getenv("PDF_PROCESS_POOL", "0") == "1"  # Pool de processus "spawn"
+    PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2"))
+    PDF_WORKER_MAX_TASKS = int(os.getenv("PDF_WORKER_MAX_TASKS", "50"))  # Extractions avant remplacement d'un processus
+    PDF_TIMEOUT = float(os.getenv("PDF_TIMEOUT", "30"))  # Par fichier, en secondes (pool uniquement)
+    PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "50"))  # 0: toutes les pages
+    PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(20 * 1024 * 1024)))
+
+    def __init__(self):
+        self.secrets = SecretCache(self.build_secret_providers(), self.SECRET_REFRESH_INTERVAL)
+
+    def build_secret_providers(self):
+        """Retourne la chaîne de fournisseurs de secrets, par ordre de priorité"""
+        return [EnvSecretProvider(), LocalFileSecretProvider()]
 
 class LocalConfig(BaseConfig):
     ENV = "local"
     MOCK_OPENAI = True
     CHECK_AUTH = False  # Désactive l'authentification en dev
-    CHECK_RATE_LIMIT = False
+    CHECK_RATE_LIMIT = os.getenv("CHECK_RATE_LIMIT", "0") == "1"  # Activé par tests/test_endpoints.sh
+    JOB_STORE = os.getenv("JOB_STORE", "memory")
 
 class DevConfig(BaseConfig):
     ENV = "dev"
     MOCK_OPENAI = False
     CHECK_AUTH = False
-    secret_manager_client = secretmanager.SecretManagerServiceClient()
-    response = secret_manager_client.access_secret_version(request={"name": "projects/177360827241/secrets/OPENAI_API_KEY/versions/1"})
-    OPENAI_API_KEY = response.payload.data.decode("UTF-8")
+
+    def build_secret_providers(self):
+        return [EnvSecretProvider(), SecretManagerProvider(self.GCP_PROJECT_NUMBER, version="1")]
 
 class ProdConfig(BaseConfig):
     ENV = "prod"
     MOCK_OPENAI = False
     CHECK_AUTH = True  # Active l'authentification en prod
-    secret_manager_client = secretmanager.SecretManagerServiceClient()
-    response = secret_manager_client.access_secret_version(request={"name": "projects/177360827241/secrets/OPENAI_API_KEY/versions/1"})
-    OPENAI_API_KEY = response.payload.data.decode("UTF-8")
-
-def load_config():
-    env = os.getenv("ENV", "local")
-    if env == "prod":
-        return ProdConfig()
-    elif env == "local":
-        return LocalConfig()
-    else:
-        return DevConfig()
+
+    def build_secret_providers(self):
+        return [EnvSecretProvider(), SecretManagerProvider(self.GCP_PROJECT_NUMBER, version="1")]
+
+_config: Optional[BaseConfig] = None
+_config_lock = threading.Lock()
+
+def load_config() -> BaseConfig:
+    """
+    Retourne la configuration du processus, créée une seule fois.
+    Aucun appel réseau n'est fait ici: les secrets sont résolus au premier accès.
+    """
+    global _config
+    if _config is None:
+        with _config_lock:
+            if _config is None:
+                start = time.perf_counter()
+                env = os.getenv("ENV", "local")
+                if env == "prod":
+                    _config = ProdConfig()
+                elif env == "local":
+                    _config = LocalConfig()
+                else:
+                    _config = DevConfig()
+                record_startup_timing("load_config", time.perf_counter() - start)
+    return _config
@@ -0,0 +1,47 @@
+"""Configuration gunicorn: hooks exécutés dans chaque worker"""
+
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def post_worker_init(worker):
+    """
+    Résout la clé OpenAI et compile les graphes LangGraph avant que le worker ne reçoive
+    des requêtes, puis affiche le rapport de démarrage à froid.
+    """
+    from backend.config import load_config, log_startup_report, record_startup_timing
+
+    config = load_config()
+    if not config.MOCK_OPENAI:
+        try:
+            # Durée enregistrée par SecretCache dans le rapport de démarrage
+            config.secrets.get("OPENAI_API_KEY")
+        except Exception as e:
+            # Le secret sera de nouveau demandé au premier appel du LLM
+            logger.error(f"Erreur lors de la résolution de la clé OpenAI au démarrage: {str(e)}")
+
+        try:
+            from ai_module.inference import warm_up_graphs
+
+            start = time.perf_counter()
+            warm_up_graphs()
+            record_startup_timing("graph_warm_up", time.perf_counter() - start)
+        except Exception as e:
+            # La compilation sera refaite au premier appel
+            logger.error(f"Erreur lors de la compilation des graphes au démarrage: {str(e)}", exc_info=True)
+
+    log_startup_report()
+
+
+def worker_exit(server, worker):
+    """Écrit les données gardées en mémoire avant l'arrêt du worker"""
+    from backend.call_log import call_log_writer
+    from backend.usage_limiter import usage_limiter
+
+    try:
+        call_log_writer.drain()
+        usage_limiter.flush()
+    except Exception as e:
+        logger.error(f"Erreur lors de l'écriture des données en attente à l'arrêt du worker: {str(e)}", exc_info=True)
@@ -0,0 +1,150 @@
+"""
+Exécution des générations en arrière-plan (mode asynchrone des endpoints v2).
+
+Les jobs sont exécutés par un pool de threads borné et leur état est stocké
+dans la collection 'jobs', ou en mémoire pour les exécutions locales.
+"""
+import copy
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, UTC
+from typing import Any, Callable, Dict, Optional
+
+from backend.config import load_config
+from backend.models import JobDocument
+from backend.session import firestore_session
+
+logger = logging.getLogger(__name__)
+config = load_config()
+
+# Signature de la fonction de progression passée aux jobs: progress(step, pourcentage)
+ProgressCallback = Callable[[str, int], None]
+
+
+class JobQueueFullError(Exception):
+    """Levée lorsque le nombre maximal de jobs en attente est atteint"""
+
+
+class FirestoreJobStore:
+    """Stocke l'état des jobs dans la collection Firestore 'jobs'"""
+
+    def create(self, job: JobDocument) -> str:
+        return job.save()
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        fields["updated_at"] = datetime.now(UTC)
+        db = JobDocument.get_db()
+        db.collection(JobDocument.collection_name).document(job_id).update(fields)
+
+    def get(self, job_id: str) -> Optional[JobDocument]:
+        return JobDocument.from_firestore_id(job_id)
+
+
+class InMemoryJobStore:
+    """Stocke l'état des jobs en mémoire, pour les exécutions locales"""
+
+    def __init__(self):
+        self._jobs: Dict[str, JobDocument] = {}
+        self._lock = threading.Lock()
+
+    def create(self, job: JobDocument) -> str:
+        with self._lock:
+            job.id = job.id or uuid.uuid4().hex
+            self._jobs[job.id] = job.model_copy(deep=True)
+            return job.id
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        fields["updated_at"] = datetime.now(UTC)
+        with self._lock:
+            job = self._jobs[job_id]
+            self._jobs[job_id] = job.model_copy(update=copy.deepcopy(fields))
+
+    def get(self, job_id: str) -> Optional[JobDocument]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.model_copy(deep=True) if job else None
+
+
+class JobRunner:
+    """
+    Exécute les jobs sur un pool de threads borné.
+
+    Au-delà de `max_pending` jobs en attente ou en cours, les nouvelles
+    soumissions sont refusées avec JobQueueFullError.
+    """
+
+    def __init__(self, store, max_workers: int, max_pending: int):
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, user_id: str, job_type: str, params: Dict[str, Any],
+               fn: Callable[[ProgressCallback], Dict[str, Any]]) -> str:
+        """
+        Enregistre un job et planifie son exécution.
+
+        Args:
+            user_id (str): ID de l'utilisateur propriétaire du job
+            job_type (str): Type de job (ex: "generate_cv")
+            params (Dict[str, Any]): Paramètres du job, conservés pour le suivi
+            fn (Callable): Fonction à exécuter, recevant un callback de progression
+                et retournant le résultat du job
+
+        Returns:
+            str: ID du job créé
+        """
+        if not self._slots.acquire(blocking=False):
+            raise JobQueueFullError("Trop de générations en cours, veuillez réessayer plus tard")
+
+        try:
+            job_id = self.store.create(JobDocument(user_id=user_id, job_type=job_type, params=params))
+            self._executor.submit(self._run, job_id, fn)
+        except Exception:
+            self._slots.release()
+            raise
+
+        logger.info(f"Job {job_type} {job_id} mis en file pour l'utilisateur {user_id}")
+        return job_id
+
+    def _run(self, job_id: str, fn: Callable[[ProgressCallback], Dict[str, Any]]) -> None:
+        def progress(step: str, percent: int) -> None:
+            try:
+                self.store.update(job_id, step=step, progress=percent)
+            except Exception as e:
+                logger.warning(f"Impossible de mettre à jour la progression du job {job_id}: {str(e)}")
+
+        try:
+            self.store.update(job_id, status="running")
+            # Les documents sauvegardés par le job sont écrits en un seul lot à sa fin
+            with firestore_session():
+                result = fn(progress)
+            self.store.update(job_id, status="succeeded", progress=100, step="done", result=result)
+            logger.info(f"Job {job_id} terminé avec succès")
+        except Exception as e:
+            logger.error(f"Erreur lors de l'exécution du job {job_id}: {str(e)}", exc_info=True)
+            try:
+                self.store.update(job_id, status="failed", error=str(e))
+            except Exception as store_error:
+                logger.error(f"Impossible d'enregistrer l'échec du job {job_id}: {str(store_error)}")
+        finally:
+            self._slots.release()
+
+    def get(self, job_id: str) -> Optional[JobDocument]:
+        return self.store.get(job_id)
+
+
+_runner: Optional[JobRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    """Retourne le JobRunner du processus, créé au premier appel"""
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                store = InMemoryJobStore() if config.JOB_STORE == "memory" else FirestoreJobStore()
+                _runner = JobRunner(store, config.JOB_MAX_WORKERS, config.JOB_MAX_PENDING)
+    return _runner
@@ -0,0 +1,581 @@
+"""
+Substituts locaux de Firestore, pour les tests de charge et les benchmarks hors ligne.
+
+FIRESTORE_BACKEND choisit le stockage utilisé par FirestoreModel.get_db:
+- "firestore" (défaut): Firestore via firebase_admin;
+- "memory": documents en mémoire du processus;
+- "sqlite": documents dans un fichier SQLite (FIRESTORE_SQLITE_PATH), conservés entre les exécutions.
+
+Le client local reproduit le sous-ensemble de l'API google-cloud-firestore utilisé par le
+backend: get/set/update/delete/add des documents (avec DELETE_FIELD, Increment, ArrayUnion,
+ArrayRemove et SERVER_TIMESTAMP), get_all, requêtes where/select/order_by/limit/start_after,
+sous-collections, lots et transactions. FIRESTORE_LATENCY_MS ajoute une latence à chaque
+appel réseau simulé, pour reproduire les temps d'aller-retour de production.
+"""
+import copy
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, UTC
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from firebase_admin import firestore
+from google.api_core.exceptions import Aborted, NotFound
+
+from backend.config import load_config
+
+logger = logging.getLogger(__name__)
+config = load_config()
+
+_MISSING = object()
+
+_OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "in": lambda a, b: a in b,
+    "not-in": lambda a, b: a not in b,
+    "array_contains": lambda a, b: isinstance(a, list) and b in a,
+    "array-contains": lambda a, b: isinstance(a, list) and b in a,
+    "array-contains-any": lambda a, b: isinstance(a, list) and any(item in a for item in b),
+    "array_contains_any": lambda a, b: isinstance(a, list) and any(item in a for item in b),
+}
+
+
+# ====== Chemins de champs et transformations ======
+
+def split_field_path(path: str) -> List[str]:
+    """Découpe un chemin de champ ("a.b", "a.`ma clé`.c") en segments"""
+    parts, current, quoted, i = [], [], False, 0
+    while i < len(path):
+        char = path[i]
+        if char == "\\" and quoted and i + 1 < len(path):
+            current.append(path[i + 1])
+            i += 1
+        elif char == "`":
+            quoted = not quoted
+        elif char == "." and not quoted:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+        i += 1
+    parts.append("".join(current))
+    return parts
+
+
+def _get_field(data: Dict[str, Any], parts: Sequence[str]) -> Any:
+    value: Any = data
+    for part in parts:
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _resolve_value(value: Any, current: Any) -> Any:
+    """Applique une transformation Firestore à la valeur actuelle d'un champ"""
+    if value is firestore.SERVER_TIMESTAMP:
+        return datetime.now(UTC)
+    if isinstance(value, firestore.Increment):
+        base = current if isinstance(current, (int, float)) and not isinstance(current, bool) else 0
+        return base + value.value
+    if isinstance(value, firestore.ArrayUnion):
+        items = list(current) if isinstance(current, list) else []
+        return items + [item for item in value.values if item not in items]
+    if isinstance(value, firestore.ArrayRemove):
+        return [item for item in current if item not in value.values] if isinstance(current, list) else []
+    if isinstance(value, dict):
+        current = current if isinstance(current, dict) else {}
+        return {key: _resolve_value(item, current.get(key, _MISSING))
+                for key, item in value.items() if item is not firestore.DELETE_FIELD}
+    return copy.deepcopy(value)
+
+
+def _set_field(data: Dict[str, Any], parts: Sequence[str], value: Any) -> None:
+    target = data
+    for part in parts[:-1]:
+        if not isinstance(target.get(part), dict):
+            target[part] = {}
+        target = target[part]
+    if value is firestore.DELETE_FIELD:
+        target.pop(parts[-1], None)
+    else:
+        target[parts[-1]] = _resolve_value(value, target.get(parts[-1], _MISSING))
+
+
+def _merge(existing: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+    """Fusionne récursivement data dans existing (set avec merge=True)"""
+    for key, value in data.items():
+        if isinstance(value, dict) and isinstance(existing.get(key), dict):
+            _merge(existing[key], value)
+        else:
+            _set_field(existing, [key], value)
+    return existing
+
+
+def _sort_value(value: Any) -> Tuple[int, Any]:
+    """Clé de tri suivant l'ordre des types de Firestore (null < booléens < nombres < dates < chaînes)"""
+    if value is None or value is _MISSING:
+        return 0, 0
+    if isinstance(value, bool):
+        return 1, value
+    if isinstance(value, (int, float)):
+        return 2, value
+    if isinstance(value, datetime):
+        return 3, value.timestamp()
+    if isinstance(value, str):
+        return 4, value
+    return 5, json.dumps(value, sort_keys=True, default=str)
+
+
+# ====== Stockage ======
+
+class MemoryStore:
+    """Documents en mémoire, indexés par chemin ("collection/id/sous-collection/id")"""
+
+    def __init__(self):
+        self._documents: Dict[str, Dict[str, Any]] = {}
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        data = self._documents.get(path)
+        return copy.deepcopy(data) if data is not None else None
+
+    def put(self, path: str, data: Dict[str, Any]) -> None:
+        self._documents[path] = copy.deepcopy(data)
+
+    def delete(self, path: str) -> None:
+        self._documents.pop(path, None)
+
+    def write(self, changes: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        """Écrit (ou supprime, pour None) plusieurs documents"""
+        for path, data in changes.items():
+            if data is None:
+                self.delete(path)
+            else:
+                self.put(path, data)
+
+    def list_collection(self, collection_path: str) -> List[Tuple[str, Dict[str, Any]]]:
+        prefix = collection_path + "/"
+        return [
+            (path[len(prefix):], copy.deepcopy(data)) for path, data in self._documents.items()
+            if path.startswith(prefix) and "/" not in path[len(prefix):]
+        ]
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Type non sérialisable: {type(value).__name__}")
+
+
+def _json_object_hook(value: Dict[str, Any]) -> Any:
+    if len(value) == 1 and "__datetime__" in value:
+        return datetime.fromisoformat(value["__datetime__"])
+    return value
+
+
+class SqliteStore:
+    """Documents sérialisés en JSON dans une table SQLite"""
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "collection TEXT NOT NULL, id TEXT NOT NULL, data TEXT NOT NULL, PRIMARY KEY (collection, id))"
+        )
+
+    @staticmethod
+    def _split(path: str) -> Tuple[str, str]:
+        collection, _, doc_id = path.rpartition("/")
+        return collection, doc_id
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute("SELECT data FROM documents WHERE collection = ? AND id = ?", self._split(path)).fetchone()
+        return json.loads(row[0], object_hook=_json_object_hook) if row else None
+
+    def put(self, path: str, data: Dict[str, Any]) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO documents (collection, id, data) VALUES (?, ?, ?)",
+            (*self._split(path), json.dumps(data, default=_json_default, ensure_ascii=False)),
+        )
+
+    def delete(self, path: str) -> None:
+        self._conn.execute("DELETE FROM documents WHERE collection = ? AND id = ?", self._split(path))
+
+    def write(self, changes: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        """Écrit (ou supprime, pour None) plusieurs documents dans une transaction SQLite"""
+        self._conn.execute("BEGIN")
+        try:
+            for path, data in changes.items():
+                if data is None:
+                    self.delete(path)
+                else:
+                    self.put(path, data)
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def list_collection(self, collection_path: str) -> List[Tuple[str, Dict[str, Any]]]:
+        rows = self._conn.execute("SELECT id, data FROM documents WHERE collection = ?", (collection_path,))
+        return [(doc_id, json.loads(data, object_hook=_json_object_hook)) for doc_id, data in rows]
+
+
+# ====== Client ======
+
+class LocalDocumentSnapshot:
+    """Équivalent local de DocumentSnapshot"""
+
+    def __init__(self, reference: "LocalDocumentReference", data: Optional[Dict[str, Any]]):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field_path: str) -> Any:
+        value = _get_field(self._data or {}, split_field_path(field_path))
+        if value is _MISSING:
+            raise KeyError(field_path)
+        return copy.deepcopy(value)
+
+
+class LocalDocumentReference:
+    """Équivalent local de DocumentReference"""
+
+    def __init__(self, client: "LocalFirestoreClient", collection_path: str, doc_id: str):
+        self._client = client
+        self.id = doc_id
+        self.path = f"{collection_path}/{doc_id}"
+
+    def collection(self, name: str) -> "LocalCollectionReference":
+        return LocalCollectionReference(self._client, f"{self.path}/{name}")
+
+    def get(self, field_paths=None, transaction: Optional["LocalTransaction"] = None) -> LocalDocumentSnapshot:
+        self._client.rpc()
+        with self._client.lock:
+            snapshot = LocalDocumentSnapshot(self, self._client.store.get(self.path))
+        if transaction is not None:
+            transaction.record_read(snapshot)
+        return snapshot
+
+    def set(self, document_data: Dict[str, Any], merge: bool = False) -> None:
+        self._client.rpc()
+        self._client.apply([("set", self.path, document_data, merge)])
+
+    def update(self, field_updates: Dict[str, Any]) -> None:
+        self._client.rpc()
+        self._client.apply([("update", self.path, field_updates, False)])
+
+    def delete(self) -> None:
+        self._client.rpc()
+        self._client.apply([("delete", self.path, None, False)])
+
+
+class LocalQuery:
+    """Équivalent local de Query: filtres, projection, tri, limite et curseur"""
+
+    def __init__(self, client: "LocalFirestoreClient", collection_path: str):
+        self._client = client
+        self._collection_path = collection_path
+        self._filters: List[Tuple[List[str], str, Any]] = []
+        self._projection: Optional[List[str]] = None
+        self._orders: List[Tuple[List[str], str]] = []
+        self._limit: Optional[int] = None
+        self._start_after: Optional[LocalDocumentSnapshot] = None
+
+    def _copy(self, **changes: Any) -> "LocalQuery":
+        query = copy.copy(self)
+        query._filters = list(self._filters)
+        query._orders = list(self._orders)
+        for name, value in changes.items():
+            setattr(query, name, value)
+        return query
+
+    def where(self, field_path: Optional[str] = None, op_string: Optional[str] = None, value: Any = None,
+              *, filter=None) -> "LocalQuery":
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        if op_string not in _OPERATORS:
+            raise ValueError(f"Opérateur non supporté par le stockage local: {op_string}")
+        query = self._copy()
+        query._filters.append((split_field_path(field_path), op_string, value))
+        return query
+
+    def select(self, field_paths: Sequence[str]) -> "LocalQuery":
+        return self._copy(_projection=list(field_paths))
+
+    def order_by(self, field_path: str, direction: str = "ASCENDING") -> "LocalQuery":
+        query = self._copy()
+        query._orders.append((split_field_path(field_path), direction))
+        return query
+
+    def limit(self, count: int) -> "LocalQuery":
+        return self._copy(_limit=count)
+
+    def start_after(self, snapshot: LocalDocumentSnapshot) -> "LocalQuery":
+        return self._copy(_start_after=snapshot)
+
+    def _sort_key(self, doc_id: str, data: Dict[str, Any]) -> List[Tuple[int, Any]]:
+        return [_sort_value(_get_field(data, parts)) for parts, _ in self._orders] + [(4, doc_id)]
+
+    def _compare(self, left: List[Tuple[int, Any]], right: List[Tuple[int, Any]]) -> int:
+        directions = [direction for _, direction in self._orders] + ["ASCENDING"]
+        for a, b, direction in zip(left, right, directions):
+            if a != b:
+                result = -1 if a < b else 1
+                return -result if direction == "DESCENDING" else result
+        return 0
+
+    def _matches(self, data: Dict[str, Any]) -> bool:
+        for parts, op_string, value in self._filters:
+            field = _get_field(data, parts)
+            if field is _MISSING:
+                return False
+            try:
+                if not _OPERATORS[op_string](field, value):
+                    return False
+            except TypeError:
+                return False
+        # Comme Firestore, un document sans le champ de tri est exclu
+        return all(_get_field(data, parts) is not _MISSING for parts, _ in self._orders)
+
+    def stream(self, transaction: Optional["LocalTransaction"] = None) -> Iterator[LocalDocumentSnapshot]:
+        self._client.rpc()
+        with self._client.lock:
+            documents = [(doc_id, data) for doc_id, data in self._client.store.list_collection(self._collection_path)
+                         if self._matches(data)]
+
+        compare = functools.cmp_to_key(self._compare)
+        documents.sort(key=lambda item: compare(self._sort_key(*item)))
+        if self._start_after is not None:
+            cursor = self._sort_key(self._start_after.id, self._start_after.to_dict() or {})
+            documents = [item for item in documents if self._compare(self._sort_key(*item), cursor) > 0]
+        if self._limit is not None:
+            documents = documents[:self._limit]
+
+        for doc_id, data in documents:
+            if self._projection is not None:
+                projected: Dict[str, Any] = {}
+                for field_path in self._projection:
+                    parts = split_field_path(field_path)
+                    value = _get_field(data, parts)
+                    if value is not _MISSING:
+                        _set_field(projected, parts, value)
+                data = projected
+            reference = LocalDocumentReference(self._client, self._collection_path, doc_id)
+            snapshot = LocalDocumentSnapshot(reference, data)
+            if transaction is not None and self._projection is None:
+                transaction.record_read(snapshot)
+            yield snapshot
+
+    def get(self, transaction: Optional["LocalTransaction"] = None) -> List[LocalDocumentSnapshot]:
+        return list(self.stream(transaction))
+
+
+class LocalCollectionReference(LocalQuery):
+    """Équivalent local de CollectionReference"""
+
+    @property
+    def id(self) -> str:
+        return self._collection_path.rpartition("/")[2]
+
+    def document(self, document_id: Optional[str] = None) -> LocalDocumentReference:
+        # Même format que les IDs générés par Firestore
+        return LocalDocumentReference(self._client, self._collection_path, document_id or uuid.uuid4().hex[:20])
+
+    def add(self, document_data: Dict[str, Any], document_id: Optional[str] = None) -> Tuple[datetime, LocalDocumentReference]:
+        reference = self.document(document_id)
+        reference.set(document_data)
+        return datetime.now(UTC), reference
+
+
+class LocalWriteBatch:
+    """Équivalent local de WriteBatch: écritures appliquées ensemble au commit"""
+
+    def __init__(self, client: "LocalFirestoreClient"):
+        self._client = client
+        self._writes: List[Tuple[str, str, Any, bool]] = []
+
+    def set(self, reference: LocalDocumentReference, document_data: Dict[str, Any], merge: bool = False) -> None:
+        self._writes.append(("set", reference.path, copy.deepcopy(document_data), merge))
+
+    def update(self, reference: LocalDocumentReference, field_updates: Dict[str, Any]) -> None:
+        self._writes.append(("update", reference.path, copy.deepcopy(field_updates), False))
+
+    def delete(self, reference: LocalDocumentReference) -> None:
+        self._writes.append(("delete", reference.path, None, False))
+
+    def commit(self) -> List[Any]:
+        self._client.rpc()
+        writes, self._writes = self._writes, []
+        self._client.apply(writes)
+        return writes
+
+
+class LocalTransaction(LocalWriteBatch):
+    """
+    Équivalent local de Transaction, optimiste comme Firestore: la fonction transactionnelle
+    s'exécute sans verrou, ses écritures sont mises en attente, et le verrou du stockage
+    n'est pris qu'au commit, pour vérifier que les documents lus n'ont pas changé et
+    appliquer les écritures. En cas de conflit, la fonction est exécutée de nouveau.
+    """
+
+    def __init__(self, client: "LocalFirestoreClient", max_attempts: int = 5):
+        super().__init__(client)
+        self.max_attempts = max_attempts
+        self._reads: Dict[str, Optional[Dict[str, Any]]] = {}
+
+    def record_read(self, snapshot: LocalDocumentSnapshot) -> None:
+        """Enregistre l'état lu d'un document, vérifié au commit (la première lecture fait foi)"""
+        self._reads.setdefault(snapshot.reference.path, snapshot._data)
+
+    def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Exécute la fonction transactionnelle et valide ses écritures.
+
+        Raises:
+            Aborted: Si les documents lus ont changé à chacune des max_attempts tentatives
+        """
+        for attempt in range(self.max_attempts):
+            self._reads = {}
+            self._writes = []
+            try:
+                result = fn(self, *args, **kwargs)
+            except Exception:
+                self._writes = []
+                raise
+            self._client.rpc()
+            writes, self._writes = self._writes, []
+            with self._client.lock:
+                if all(self._client.store.get(path) == data for path, data in self._reads.items()):
+                    self._client.apply(writes)
+                    return result
+            logger.debug(f"Transaction locale en conflit, nouvelle tentative {attempt + 1}")
+        raise Aborted(f"Transaction locale abandonnée après {self.max_attempts} tentatives en conflit")
+
+
+class LocalFirestoreClient:
+    """Client Firestore local sur un stockage en mémoire ou SQLite"""
+
+    def __init__(self, store, latency_ms: float = 0.0):
+        self.store = store
+        self.latency = latency_ms / 1000
+        self.lock = threading.RLock()
+        self._rpc_lock = threading.Lock()
+        self.rpc_count = 0
+
+    def rpc(self) -> None:
+        """Compte un aller-retour simulé et applique la latence configurée"""
+        with self._rpc_lock:
+            self.rpc_count += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def collection(self, collection_path: str) -> LocalCollectionReference:
+        return LocalCollectionReference(self, collection_path)
+
+    def get_all(self, references: Sequence[LocalDocumentReference], field_paths=None,
+                transaction: Optional[LocalTransaction] = None) -> Iterator[LocalDocumentSnapshot]:
+        self.rpc()
+        with self.lock:
+            snapshots = [LocalDocumentSnapshot(reference, self.store.get(reference.path)) for reference in references]
+        if transaction is not None:
+            for snapshot in snapshots:
+                transaction.record_read(snapshot)
+        return iter(snapshots)
+
+    def batch(self) -> LocalWriteBatch:
+        return LocalWriteBatch(self)
+
+    def transaction(self, max_attempts: int = 5, **kwargs: Any) -> LocalTransaction:
+        return LocalTransaction(self, max_attempts)
+
+    def apply(self, writes: Sequence[Tuple[str, str, Any, bool]]) -> None:
+        """Applique des écritures de manière atomique (toutes ou aucune)"""
+        with self.lock:
+            pending: Dict[str, Optional[Dict[str, Any]]] = {}
+            for operation, path, data, merge in writes:
+                current = pending[path] if path in pending else self.store.get(path)
+                if operation == "delete":
+                    pending[path] = None
+                elif operation == "set":
+                    pending[path] = _merge(current or {}, data) if merge else _resolve_value(data, {})
+                else:
+                    if current is None:
+                        raise NotFound(f"Aucun document à mettre à jour: {path}")
+                    for field_path, value in data.items():
+                        _set_field(current, split_field_path(field_path), value)
+                    pending[path] = current
+            self.store.write(pending)
+
+    def load_documents(self, documents: Dict[str, Dict[str, Dict[str, Any]]]) -> int:
+        """
+        Charge des documents initiaux, ex: {"profiles": {"user_1": {...}}}.
+
+        Returns:
+            int: Nombre de documents chargés
+        """
+        writes = [("set", f"{collection}/{doc_id}", data, False)
+                  for collection, docs in documents.items() for doc_id, data in docs.items()]
+        self.apply(writes)
+        return len(writes)
+
+
+_client: Optional[LocalFirestoreClient] = None
+_client_lock = threading.Lock()
+
+
+def get_local_client() -> LocalFirestoreClient:
+    """
+    Retourne le client local du processus, créé une seule fois selon la configuration
+    (FIRESTORE_BACKEND, FIRESTORE_SQLITE_PATH, FIRESTORE_LATENCY_MS, FIRESTORE_SEED_FILE).
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if config.FIRESTORE_BACKEND == "sqlite":
+                    store = SqliteStore(config.FIRESTORE_SQLITE_PATH)
+                elif config.FIRESTORE_BACKEND == "memory":
+                    store = MemoryStore()
+                else:
+                    raise ValueError(f"Stockage Firestore inconnu: {config.FIRESTORE_BACKEND}")
+                client = LocalFirestoreClient(store, config.FIRESTORE_LATENCY_MS)
+                if config.FIRESTORE_SEED_FILE and os.path.exists(config.FIRESTORE_SEED_FILE):
+                    with open(config.FIRESTORE_SEED_FILE, "r", encoding="utf-8") as f:
+                        count = client.load_documents(json.load(f))
+                    logger.info(f"{count} document(s) chargé(s) depuis {config.FIRESTORE_SEED_FILE}")
+                logger.info(
+                    f"Stockage Firestore local '{config.FIRESTORE_BACKEND}' "
+                    f"(latence simulée: {config.FIRESTORE_LATENCY_MS:.0f} ms)"
+                )
+                _client = client
+    return _client
+
+
+def transactional(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Remplace firestore.transactional: exécute fn dans une transaction Firestore
+    ou dans une transaction du client local, selon la transaction reçue.
+    """
+    firestore_transactional = firestore.transactional(fn)
+
+    @functools.wraps(fn)
+    def wrapper(transaction, *args: Any, **kwargs: Any) -> Any:
+        if isinstance(transaction, LocalTransaction):
+            return transaction.run(fn, *args, **kwargs)
+        return firestore_transactional(transaction, *args, **kwargs)
+    return wrapper
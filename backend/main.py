@@ -1,11 +1,21 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import logging
+import time
 from backend.api2.gen_profile2 import generate_profile_endpoint as generate_profile_endpoint_v2
 from backend.api2.gen_cv2 import generate_cv_endpoint as generate_cv_endpoint_v2
-from backend.config import configure_logging, load_config
-from backend.auth import auth_required
+from backend.api2.gen_cv2 import generate_cv_async_endpoint as generate_cv_async_endpoint_v2
+from backend.api2.gen_cv2 import generate_cv_stream_endpoint as generate_cv_stream_endpoint_v2
+from backend.api2.gen_cvs_batch2 import generate_cvs_batch_endpoint as generate_cvs_batch_endpoint_v2
+from backend.api2.jobs2 import get_job_status_endpoint
+from backend.api2.metrics2 import get_metrics_endpoint
+from backend.config import configure_logging, load_config, log_startup_report, record_startup_timing
+from backend.auth import auth_required, admin_required
+from backend.auth_cache import start_signing_key_refresh
 from backend.decorators import check_rate_limit
+from backend.metrics import metrics
+from backend.session import unit_of_work
+from ai_module.graph_registry import graph_registry
 import firebase_admin
 
 # Configuration du logging
@@ -18,8 +28,13 @@ config = load_config()
 # Initialisation de Firebase Admin seulement si pas en local
 if config.ENV != "local":
     try:
+        firebase_start = time.perf_counter()
         firebase_admin.initialize_app()
+        record_startup_timing("firebase_admin", time.perf_counter() - firebase_start)
         logger.info("Firebase Admin initialisé avec les credentials par défaut")
+        if config.CHECK_AUTH:
+            # Clés publiques de vérification des jetons, hors du chemin des requêtes
+            start_signing_key_refresh()
     except Exception as e:
         logger.error(f"Erreur lors de l'initialisation de Firebase Admin: {str(e)}")
 else:
@@ -29,6 +44,12 @@ else:
 app = Flask(__name__)
 CORS(app)
 
+# Statistiques des composants exposées par /api/v2/metrics
+metrics.register_collector("graphs", graph_registry.get_stats)
+if not config.MOCK_OPENAI:
+    from ai_module.llm_config import get_llm_stats
+    metrics.register_collector("llm", get_llm_stats)
+
 @app.route('/health', methods=['GET'])
 @auth_required
 def health_check():
@@ -44,6 +65,7 @@ def health_check():
 @app.route('/api/v2/generate-profile', methods=['POST'])
 @auth_required
 @check_rate_limit
+@unit_of_work
 def generate_profile_v2():
     """Génère un profil pour l'utilisateur authentifié (version 2)"""
     user_id = request.user_id  # Injecté par le décorateur auth_required
@@ -52,11 +74,51 @@ def generate_profile_v2():
 @app.route('/api/v2/generate-cv', methods=['POST'])
 @auth_required
 @check_rate_limit
+@unit_of_work
 def generate_cv_v2():
     """Génère un CV pour l'utilisateur authentifié (version 2)"""
     user_id = request.user_id  # Injecté par le décorateur auth_required
     cv_id = request.json.get('cv_id')
+    # Mode asynchrone optionnel: réponse 202 immédiate, suivi via /api/v2/jobs/<job_id>
+    if request.json.get('async') or request.args.get('async') == '1':
+        return generate_cv_async_endpoint_v2(user_id, cv_id)
     return generate_cv_endpoint_v2(user_id, cv_id)
 
+@app.route('/api/v2/generate-cv/stream', methods=['POST'])
+@auth_required
+@check_rate_limit
+@unit_of_work
+def generate_cv_stream_v2():
+    """Génère un CV en diffusant la progression en server-sent events (version 2)"""
+    user_id = request.user_id  # Injecté par le décorateur auth_required
+    cv_id = request.json.get('cv_id')
+    return generate_cv_stream_endpoint_v2(user_id, cv_id)
+
+@app.route('/api/v2/generate-cvs', methods=['POST'])
+@auth_required
+@check_rate_limit
+@unit_of_work
+def generate_cvs_batch_v2():
+    """Génère plusieurs CV pour le même profil en mutualisant les résumés (version 2)"""
+    user_id = request.user_id  # Injecté par le décorateur auth_required
+    cv_ids = request.json.get('cv_ids')
+    return generate_cvs_batch_endpoint_v2(user_id, cv_ids)
+
+@app.route('/api/v2/jobs/<job_id>', methods=['GET'])
+@auth_required
+def get_job_status_v2(job_id):
+    """Retourne l'état d'un job de génération asynchrone"""
+    user_id = request.user_id  # Injecté par le décorateur auth_required
+    return get_job_status_endpoint(user_id, job_id)
+
+@app.route('/api/v2/metrics', methods=['GET'])
+@auth_required
+@admin_required
+def get_metrics_v2():
+    """Retourne les métriques du processus (regroupements, compilation des graphes, connexions LLM), réservé aux administrateurs"""
+    return get_metrics_endpoint()
+
 if __name__ == '__main__':
+    # Sous gunicorn, le rapport est affiché par post_worker_init, après la compilation des graphes
+    log_startup_report()
     app.run(debug=True, host='0.0.0.0', port=8080)
@@ -0,0 +1,77 @@
+"""
+Métriques du processus exposées par GET /api/v2/metrics.
+
+Les modules incrémentent des compteurs nommés (ex: "single_flight.coalesced") et
+peuvent enregistrer des collecteurs qui retournent leurs propres statistiques
+au moment de la lecture (ex: compilation des graphes, connexions HTTP du LLM).
+"""
+import logging
+import threading
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsRegistry:
+    """Compteurs et collecteurs de statistiques partagés par tout le processus"""
+
+    def __init__(self):
+        self._counters: Dict[str, int] = {}
+        self._collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: int = 1) -> None:
+        """
+        Incrémente un compteur, créé à zéro au premier appel.
+
+        Args:
+            name (str): Nom du compteur, préfixé par le composant (ex: "single_flight.leaders")
+            value (int): Valeur à ajouter
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def get(self, name: str) -> int:
+        """Retourne la valeur d'un compteur (0 s'il n'existe pas)"""
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def register_collector(self, name: str, collector: Callable[[], Dict[str, Any]]) -> None:
+        """
+        Enregistre une fonction appelée à chaque lecture des métriques.
+
+        Args:
+            name (str): Nom de la section dans le rapport
+            collector (Callable): Fonction sans argument retournant un dictionnaire de statistiques
+        """
+        with self._lock:
+            self._collectors[name] = collector
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Retourne l'état courant des compteurs et des collecteurs.
+
+        Returns:
+            Dict[str, Any]: {"counters": {...}, "<collecteur>": {...}, ...}
+        """
+        with self._lock:
+            report: Dict[str, Any] = {"counters": dict(sorted(self._counters.items()))}
+            collectors = list(self._collectors.items())
+
+        # Les collecteurs sont appelés hors du verrou: ils peuvent prendre leurs propres verrous
+        for name, collector in collectors:
+            try:
+                report[name] = collector()
+            except Exception as e:
+                logger.error(f"Erreur lors de la collecte des métriques '{name}': {str(e)}")
+                report[name] = {"error": str(e)}
+        return report
+
+    def reset(self) -> None:
+        """Remet les compteurs à zéro (les collecteurs restent enregistrés)"""
+        with self._lock:
+            self._counters.clear()
+
+
+# Registre unique du processus
+metrics = MetricsRegistry()
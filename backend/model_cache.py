@@ -0,0 +1,165 @@
+"""
+Cache de lecture des documents Firestore partagé entre les requêtes du processus.
+
+Les modèles activent le cache avec l'attribut de classe `cache_ttl` (en secondes).
+FirestoreModel.get_by_id et get_many consultent le cache avant Firestore, et
+save() invalide l'entrée du document écrit. Le cache conserve les données brutes
+des documents: chaque lecture construit une nouvelle instance, que l'appelant
+peut modifier sans affecter les autres requêtes.
+
+Une lecture commencée avant l'invalidation d'un document (écriture concurrente de ce
+processus) n'est pas mise en cache: put() reçoit le jeton pris par read_token() avant
+la lecture et compare la génération d'invalidation du document.
+
+Les écritures faites hors de ce processus (front, autre instance) ne sont visibles
+qu'à l'expiration de l'entrée: le TTL borne la durée pendant laquelle une donnée
+peut être périmée.
+"""
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from backend.config import load_config
+from backend.metrics import metrics
+
+config = load_config()
+
+CacheKey = Tuple[str, str]  # (collection, ID du document)
+
+# Invalidations récentes conservées pour écarter les lectures commencées avant elles
+MAX_TRACKED_INVALIDATIONS = 10000
+
+
+def _estimate_size(raw_data: Dict[str, Any]) -> int:
+    return len(json.dumps(raw_data, default=str, ensure_ascii=False).encode("utf-8"))
+
+
+class DocumentCache:
+    """
+    Cache LRU à durée de vie, borné en mémoire, thread-safe.
+
+    Au-delà de `max_bytes` (taille estimée des données sérialisées), les entrées
+    les moins récemment utilisées sont évincées.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[CacheKey, Tuple[Dict[str, Any], float, int]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        # Génération d'invalidation: compteur global, et valeur lors de la dernière invalidation de chaque document
+        self._generation = 0
+        self._invalidated: "OrderedDict[CacheKey, int]" = OrderedDict()
+        self._forgotten_before = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+
+    def read_token(self) -> int:
+        """Retourne le jeton à prendre avant une lecture dans Firestore, à passer à put()"""
+        with self._lock:
+            return self._generation
+
+    def get(self, key: CacheKey) -> Optional[Dict[str, Any]]:
+        """Retourne une copie des données du document, ou None si absent ou expiré"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            raw_data, expires_at, size = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(raw_data)
+
+    def put(self, key: CacheKey, raw_data: Dict[str, Any], ttl: float, read_token: Optional[int] = None) -> None:
+        """
+        Enregistre les données d'un document pour `ttl` secondes.
+
+        Args:
+            key (CacheKey): Collection et ID du document
+            raw_data (Dict[str, Any]): Données lues
+            ttl (float): Durée de vie de l'entrée, en secondes
+            read_token (Optional[int]): Jeton de read_token() pris avant la lecture; les données
+                ne sont pas enregistrées si le document a été invalidé depuis
+        """
+        size = _estimate_size(raw_data)
+        if size > self.max_bytes:
+            return
+        raw_data = copy.deepcopy(raw_data)
+        with self._lock:
+            if read_token is not None and (
+                read_token < self._forgotten_before or self._invalidated.get(key, -1) > read_token
+            ):
+                # Écriture concurrente pendant la lecture: les données lues sont peut-être périmées
+                self.stale_puts += 1
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (raw_data, time.monotonic() + ttl, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key: CacheKey) -> None:
+        """Supprime l'entrée d'un document (après une écriture de ce processus)"""
+        with self._lock:
+            self._generation += 1
+            self._invalidated[key] = self._generation
+            self._invalidated.move_to_end(key)
+            if len(self._invalidated) > MAX_TRACKED_INVALIDATIONS:
+                # Les lectures commencées avant l'invalidation oubliée ne sont plus vérifiables
+                _, self._forgotten_before = self._invalidated.popitem(last=False)
+            if key in self._entries:
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remove(self, key: CacheKey) -> None:
+        _, _, size = self._entries.pop(key)
+        self._size -= size
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retourne les compteurs du cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": config.MODEL_CACHE_ENABLED,
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "stale_puts": self.stale_puts,
+            }
+
+
+# Cache unique du processus
+document_cache = DocumentCache(config.MODEL_CACHE_MAX_BYTES)
+metrics.register_collector("model_cache", document_cache.get_stats)
+
+
+def cache_enabled_for(model_cls) -> bool:
+    """Indique si les lectures du modèle passent par le cache"""
+    return config.MODEL_CACHE_ENABLED and model_cls.cache_ttl > 0
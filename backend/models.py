@@ -4,12 +4,14 @@ from firebase_admin import firestore
 from firebase_admin import storage
 import json
 import os
+import random
 import tempfile
 from datetime import datetime, UTC
 from google.cloud.firestore_v1._helpers import DatetimeWithNanoseconds
-from typing import Dict, List, Any, Optional, ClassVar, Type, TypeVar, Union
+from typing import Dict, List, Any, Optional, ClassVar, Sequence, Tuple, Type, TypeVar, Union
 from pydantic import BaseModel, Field
-from .base_firestore import FirestoreModel
+from .base_firestore import REJECTED_ERRORS, FirestoreModel, _commit_in_batches
+from .call_log import log_call
 from ai_module.lg_models import ProfileState
 from pathlib import Path
 from reportlab.platypus import SimpleDocTemplate
@@ -266,6 +268,7 @@ class CallDocument(FirestoreModel):
     def create_call(cls, user_id: str, endpoint: str) -> "CallDocument":
         """
         Crée un nouveau document d'appel dans Firestore.
+        Avec CALL_LOG_BUFFERED, le document est écrit en arrière-plan, par lots (backend.call_log).
         
         Args:
             user_id (str): ID de l'utilisateur
@@ -278,12 +281,21 @@ class CallDocument(FirestoreModel):
             user_id=user_id,
             endpoint=endpoint
         )
-        call.save()
+        log_call(call)
         return call
     
 class UsageDocument(FirestoreModel):
-    """Modèle pour la collection 'usage'"""
+    """
+    Modèle pour la collection 'usage'.
+    
+    L'usage est incrémenté côté serveur (Increment, SERVER_TIMESTAMP), sans lecture préalable.
+    Avec counter_shards > 0, les incréments sont répartis entre les documents de la
+    sous-collection 'usage/{user_id}/shards', pour que le document d'un gros utilisateur
+    ne limite pas le débit d'écriture; read_counters additionne alors les shards.
+    """
     collection_name = "usage"
+    shards_collection: ClassVar[str] = "shards"
+    counter_shards: ClassVar[int] = int(os.getenv("USAGE_COUNTER_SHARDS", "0"))  # 0: compteur unique
     
     user_id: str
     last_request_time: datetime = Field(default_factory=datetime.now)
@@ -301,16 +313,10 @@ class UsageDocument(FirestoreModel):
         Returns:
             UsageDocument: Le document d'utilisation
         """
-        db = cls.get_db()
-        doc_ref = db.collection(cls.collection_name).document(user_id)
-        doc = doc_ref.get()
-        
-        if doc.exists:
-            # Si le document existe, on récupère directement les données
-            data = doc.to_dict()
-            data['user_id'] = user_id  # S'assurer que l'ID est présent
-            instance = cls(**data)
-            instance.id = user_id  # Définir l'ID du document
+        instance = cls.get_by_id(user_id)
+        
+        if instance:
+            # Si le document existe, from_raw_data a déjà renseigné user_id et l'ID
             return instance
         else:
             # Si le document n'existe pas, on le crée avec les valeurs par défaut
@@ -323,20 +329,174 @@ class UsageDocument(FirestoreModel):
             usage.save()
             return usage
     
+    @classmethod
+    def from_raw_data(cls, raw_data: Dict[str, Any], doc_id: str) -> Optional["UsageDocument"]:
+        """Construit le document d'utilisation; l'ID du document est l'ID de l'utilisateur"""
+        return super().from_raw_data({**raw_data, "user_id": doc_id}, doc_id)
+
+    @classmethod
+    def add_usage(cls, user_id: str, increment: int = 50000, batch=None) -> None:
+        """
+        Incrémente atomiquement l'usage et met à jour la date de dernière requête, sans lecture.
+        Le document est créé s'il n'existe pas. L'écriture est immédiate, même dans une session.
+        
+        Args:
+            user_id (str): ID de l'utilisateur
+            increment (int): Nombre de tokens à ajouter
+            batch: Lot Firestore dans lequel ajouter l'écriture (sinon écriture immédiate)
+        """
+        ref = cls.get_db().collection(cls.collection_name).document(user_id)
+        data = {
+            "total_usage": firestore.Increment(increment),
+            "last_request_time": firestore.SERVER_TIMESTAMP,
+        }
+        if cls.counter_shards > 0:
+            ref = ref.collection(cls.shards_collection).document(str(random.randrange(cls.counter_shards)))
+        else:
+            data["user_id"] = user_id
+        if batch is not None:
+            batch.set(ref, data, merge=True)
+        else:
+            ref.set(data, merge=True)
+
+    @classmethod
+    def add_usage_many(cls, increments: Sequence[Tuple[str, int]]) -> Dict[str, Any]:
+        """
+        Applique les incréments de plusieurs utilisateurs par lots de 500 écritures, sans lecture.
+        Les incréments ne sont pas idempotents: un lot n'est renvoyé que s'il a été refusé sans
+        être appliqué (Aborted, ResourceExhausted), jamais après une erreur au résultat ambigu
+        (délai dépassé, service indisponible).
+        
+        Args:
+            increments (Sequence[Tuple[str, int]]): Couples (ID de l'utilisateur, incrément)
+            
+        Returns:
+            Dict[str, Any]: Rapport d'écriture (voir bulk_write)
+            
+        Raises:
+            BatchCommitError: Si un lot échoue, avec les incréments appliqués, non appliqués
+                et ceux dont le résultat est inconnu
+        """
+        def add_writes(batch, chunk):
+            for user_id, increment in chunk:
+                cls.add_usage(user_id, increment, batch=batch)
+            return chunk
+        
+        return _commit_in_batches(
+            cls.get_db(), list(increments), add_writes, "incréments d'usage", retry_on=REJECTED_ERRORS
+        )
+
+    @classmethod
+    def read_counters(cls, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Lit l'usage total et la date de dernière requête de l'utilisateur.
+        Avec counter_shards > 0, les shards sont additionnés au document principal.
+        
+        Args:
+            user_id (str): ID de l'utilisateur
+            
+        Returns:
+            Optional[Dict[str, Any]]: {"total_usage", "last_request_time"} tels qu'enregistrés
+                (last_request_time peut être absent), ou None si aucun usage n'est enregistré
+        """
+        ref = cls.get_db().collection(cls.collection_name).document(user_id)
+        snapshots = [ref.get()]
+        if cls.counter_shards > 0:
+            snapshots.extend(ref.collection(cls.shards_collection).stream())
+        
+        counters: Optional[Dict[str, Any]] = None
+        for snapshot in snapshots:
+            if not snapshot.exists:
+                continue
+            data = snapshot.to_dict()
+            counters = counters or {"total_usage": 0}
+            counters["total_usage"] += data.get("total_usage", 0)
+            last_request = data.get("last_request_time")
+            if last_request is not None and (
+                counters.get("last_request_time") is None or last_request > counters["last_request_time"]
+            ):
+                counters["last_request_time"] = last_request
+        return counters
+
     def increment_usage(self, increment: int = 50000) -> None:
         """
         Incrémente le compteur d'utilisation et met à jour la date de dernière requête.
+        L'incrément est appliqué côté serveur (add_usage): les appels concurrents ne se perdent pas.
         
         Args:
             increment (int): Le nombre d'incréments à ajouter au compteur d'utilisation.
         """
+        self.add_usage(self.id or self.user_id, increment)
         self.total_usage += increment
         self.last_request_time = datetime.now(UTC)
-        self.save()
+        # Valeurs déjà écrites: pas de nouvelle écriture pour ces champs à la fin de la session
+        self.mark_persisted()
+
+class JobDocument(FirestoreModel):
+    """Modèle pour la collection 'jobs' (générations exécutées en arrière-plan)"""
+    collection_name = "jobs"
+    deferred_writes = False  # Lu par le thread du job dès sa création
+
+    user_id: str
+    job_type: str
+    status: str = "queued"  # queued, running, succeeded, failed
+    progress: int = 0  # Pourcentage d'avancement
+    step: Optional[str] = None
+    params: Dict[str, Any] = Field(default_factory=dict)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+
+    @classmethod
+    def from_firestore_id(cls, job_id: str) -> Optional["JobDocument"]:
+        """
+        Construit un objet JobDocument directement à partir d'un ID Firestore.
+        
+        Args:
+            job_id (str): L'identifiant du document dans Firestore
+            
+        Returns:
+            Optional[JobDocument]: L'objet JobDocument construit ou None si le document n'existe pas
+        """
+        db = cls.get_db()
+        doc = db.collection(cls.collection_name).document(job_id).get()
+        
+        if not doc.exists or not (raw_data := doc.to_dict()):
+            return None
+        return cls.from_dict(raw_data, job_id)
+
+    def to_status(self) -> Dict[str, Any]:
+        """Retourne la représentation publique du job pour l'endpoint de suivi"""
+        return {
+            "job_id": self.id,
+            "job_type": self.job_type,
+            "status": self.status,
+            "progress": self.progress,
+            "step": self.step,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat()
+        }
+
+class LeaseDocument(FirestoreModel):
+    """Modèle pour la collection 'leases' (bail d'une génération en cours, partagé entre instances)"""
+    collection_name = "leases"
+    deferred_writes = False  # Lu par les autres instances pendant la génération
+
+    owner: str  # Instance détentrice du bail
+    status: str = "running"  # running, succeeded, failed
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    expires_at: datetime
 
 class ProfileDocument(FirestoreModel):
     """Modèle pour la collection 'profiles' dans Firestore"""
     collection_name = "profiles"
+    cache_ttl = int(os.getenv("CACHE_TTL_PROFILES", "300"))  # Lu à chaque génération de CV, rarement modifié
     id: str = Field(default="", description="ID du profil")
     educations: List[EducationProfileNew] = Field(default_factory=list)
     head: HeadProfileNew = Field(default_factory=HeadProfileNew)
@@ -356,20 +516,8 @@ class ProfileDocument(FirestoreModel):
         Returns:
             Optional[ProfileDocument]: L'objet ProfileDocument construit ou None si le document n'existe pas
         """
-        db = cls.get_db()
-        doc_ref = db.collection(cls.collection_name).document(profile_id)
-        doc = doc_ref.get()
-        
-        if not doc.exists or not (raw_data := doc.to_dict()):
-            return None
-            
-        try:
-            instance = cls(**raw_data)
-            instance.id = profile_id
-            return instance
-        except Exception as e:
-            print(f"Erreur lors de la construction de l'objet ProfileDocument: {e}")
-            return None
+        # Servi depuis la session de la requête si le document a déjà été lu
+        return cls.get_by_id(profile_id)
 
     def update_from_profile_state(self, profile_state: "ProfileState") -> "ProfileDocument":
         """
@@ -438,6 +586,7 @@ class ProfileDocument(FirestoreModel):
 class CVDocument(FirestoreModel):
     """Modèle pour la collection 'cvs' dans Firestore"""
     collection_name = "cvs"
+    # Pas de cache entre requêtes: le front modifie job_raw et cv_data entre deux générations
     id: str = Field(default="", description="ID du CV")
     user_id: str
     cv_url: Optional[str] = None
@@ -457,20 +606,8 @@ class CVDocument(FirestoreModel):
         Returns:
             Optional[CVDocument]: L'objet CVDocument construit ou None si le document n'existe pas
         """
-        db = cls.get_db()
-        doc_ref = db.collection(cls.collection_name).document(cv_id)
-        doc = doc_ref.get()
-        
-        if not doc.exists or not (raw_data := doc.to_dict()):
-            return None
-            
-        try:
-            instance = cls(**raw_data)
-            instance.id = cv_id
-            return instance
-        except Exception as e:
-            print(f"Erreur lors de la construction de l'objet CVDocument: {e}")
-            return None
+        # Servi depuis la session de la requête si le document a déjà été lu
+        return cls.get_by_id(cv_id)
 
     def update_from_cv_state(self, cv_state: "CVGenState", save_to_firestore: bool = True) -> Optional[Dict[str, Any]]:
         """
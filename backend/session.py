@@ -0,0 +1,183 @@
+"""
+Session Firestore limitée à une requête: carte d'identité et unité de travail.
+
+Dans une session, les documents lus par FirestoreModel.get_by_id / get_many sont servis
+depuis la mémoire aux lectures suivantes, et FirestoreModel.save() ne fait que marquer
+le document comme modifié. Les documents modifiés sont écrits une seule fois, dans un
+lot (batch) Firestore, à la sortie normale de la session (ou plus tôt avec
+flush_current_session), avec leurs seuls champs modifiés. Si le bloc lève une exception, les écritures en attente sont abandonnées.
+"""
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+from flask import jsonify
+
+from backend.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_current_session: ContextVar[Optional["FirestoreSession"]] = ContextVar("firestore_session", default=None)
+
+DocumentKey = Tuple[str, str]  # (collection, ID du document)
+
+
+class FirestoreSession:
+    """Carte d'identité et documents à écrire pour une requête"""
+
+    def __init__(self):
+        self._identity_map: Dict[DocumentKey, Any] = {}
+        self._dirty: Dict[DocumentKey, Any] = {}
+        self._full_writes: Set[DocumentKey] = set()
+        self.reads_avoided = 0
+        self.saves = 0
+        self.flush_error: Optional[Exception] = None
+
+    @staticmethod
+    def _key(model_cls, doc_id: str) -> DocumentKey:
+        return model_cls.collection_name, doc_id
+
+    def contains(self, model_cls, doc_id: str) -> bool:
+        """Indique si le document (existant ou non) a déjà été lu dans la session"""
+        return self._key(model_cls, doc_id) in self._identity_map
+
+    def get(self, model_cls, doc_id: str) -> Optional[Any]:
+        """Retourne l'instance déjà lue, ou None si le document n'existe pas"""
+        self.reads_avoided += 1
+        return self._identity_map[self._key(model_cls, doc_id)]
+
+    def register(self, model_cls, doc_id: str, instance: Optional[Any]) -> None:
+        """Enregistre le résultat d'une lecture (None pour un document inexistant)"""
+        self._identity_map[self._key(model_cls, doc_id)] = instance
+
+    def add(self, instance, full: bool = False) -> None:
+        """Marque une instance comme à écrire à la fin de la session (set complet si full)"""
+        key = self._key(type(instance), instance.id)
+        self._identity_map[key] = instance
+        self._dirty[key] = instance
+        if full:
+            self._full_writes.add(key)
+        self.saves += 1
+
+    def flush(self) -> int:
+        """
+        Écrit les documents modifiés en un seul lot (par tranches de 500 opérations).
+        Les documents lus dans Firestore ne reçoivent que leurs champs modifiés.
+
+        Returns:
+            int: Nombre de documents écrits
+        """
+        # Import différé: base_firestore importe ce module
+        from backend.base_firestore import bulk_write
+
+        dirty = list(self._dirty.items())
+        full_writes = self._full_writes
+        saves = self.saves
+        self._dirty = {}
+        self._full_writes = set()
+        self.saves = 0
+        if not dirty:
+            return 0
+
+        report = bulk_write([(instance, key in full_writes) for key, instance in dirty])
+        written = report["documents"]
+
+        metrics.increment("firestore.session.documents_written", written)
+        metrics.increment("firestore.session.writes_avoided", saves - written)
+        logger.info(
+            f"Session Firestore: {written} document(s) écrit(s) en {report['batches']} lot(s) "
+            f"en {report['elapsed_ms']:.2f} ms pour {saves} sauvegarde(s)"
+        )
+        return written
+
+    def discard(self) -> int:
+        """
+        Abandonne les écritures en attente (documents modifiés par un traitement interrompu).
+
+        Returns:
+            int: Nombre de documents non écrits
+        """
+        discarded = len(self._dirty)
+        self._dirty = {}
+        self._full_writes = set()
+        self.saves = 0
+        if discarded:
+            metrics.increment("firestore.session.writes_discarded", discarded)
+            logger.warning(f"Session Firestore interrompue: {discarded} document(s) modifié(s) non écrit(s)")
+        return discarded
+
+
+def get_current_session() -> Optional[FirestoreSession]:
+    """Retourne la session active dans le contexte courant, ou None"""
+    return _current_session.get()
+
+
+def flush_current_session() -> int:
+    """
+    Écrit sans attendre la sortie de la session les documents modifiés de la session active.
+    Une erreur d'écriture est levée, pour ne pas annoncer comme écrit un document perdu.
+
+    Returns:
+        int: Nombre de documents écrits (0 hors session)
+    """
+    session = _current_session.get()
+    if session is None:
+        return 0
+    return session.flush()
+
+
+@contextmanager
+def firestore_session(raise_flush_errors: bool = True) -> Iterator[FirestoreSession]:
+    """
+    Ouvre une session Firestore pour la durée du bloc et écrit les documents modifiés à sa sortie.
+    Si le bloc lève une exception, les écritures en attente sont abandonnées: un traitement
+    interrompu n'écrit pas de documents à moitié modifiés. Une session déjà active est réutilisée.
+
+    Args:
+        raise_flush_errors (bool): Si False, une erreur d'écriture à la sortie est journalisée
+            et conservée dans session.flush_error au lieu d'être levée
+    """
+    current = _current_session.get()
+    if current is not None:
+        yield current
+        return
+
+    session = FirestoreSession()
+    token = _current_session.set(session)
+    completed = False
+    try:
+        yield session
+        completed = True
+    finally:
+        _current_session.reset(token)
+        if session.reads_avoided:
+            metrics.increment("firestore.session.reads_avoided", session.reads_avoided)
+        if not completed:
+            session.discard()
+
+    try:
+        session.flush()
+    except Exception as e:
+        if raise_flush_errors:
+            raise
+        session.flush_error = e
+        metrics.increment("firestore.session.flush_errors")
+        logger.error(f"Erreur lors de l'écriture des documents de la session Firestore: {str(e)}", exc_info=True)
+
+
+def unit_of_work(f):
+    """
+    Décorateur exécutant un endpoint dans une session Firestore.
+    Une erreur d'écriture à la sortie de la session remplace la réponse par une erreur 500:
+    le client n'est pas informé du succès d'une écriture perdue.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        with firestore_session(raise_flush_errors=False) as session:
+            response = f(*args, **kwargs)
+        if session.flush_error is not None:
+            return jsonify({"error": "Erreur lors de l'enregistrement des données"}), 500
+        return response
+    return decorated_function
@@ -0,0 +1,270 @@
+"""
+Regroupement des générations identiques en cours (single-flight).
+
+Quand plusieurs requêtes identiques arrivent en même temps (double clic, nouvel
+essai du front), seule la première exécute la génération: les suivantes attendent
+son résultat au lieu de relancer le graphe et d'écraser le même CVDocument.
+
+- Dans le processus: SingleFlight, clé = (user_id, cv_id, empreinte des entrées).
+- Entre instances Cloud Run (optionnel, SINGLE_FLIGHT_LEASE=1): un bail dans la
+  collection Firestore 'leases' désigne l'instance qui exécute la génération;
+  les autres instances attendent que le bail porte le résultat.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, UTC
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from backend.config import load_config
+from backend.local_firestore import transactional
+from backend.metrics import metrics
+from backend.models import LeaseDocument
+
+logger = logging.getLogger(__name__)
+config = load_config()
+
+# Identifiant de l'instance, pour savoir qui détient un bail
+INSTANCE_ID = uuid.uuid4().hex[:12]
+
+
+class SingleFlightTimeoutError(Exception):
+    """Levée lorsqu'une requête a attendu trop longtemps le résultat d'une génération identique"""
+
+
+class LeaseFailedError(Exception):
+    """Levée lorsque la génération exécutée par une autre instance a échoué"""
+
+
+def make_flight_key(user_id: str, cv_id: str, inputs: Any) -> str:
+    """
+    Construit la clé de regroupement d'une génération.
+
+    Args:
+        user_id (str): ID de l'utilisateur
+        cv_id (str): ID du document CV
+        inputs (Any): Entrées de la génération, sérialisables en JSON
+
+    Returns:
+        str: Empreinte SHA-256 hexadécimale, utilisable comme ID de document Firestore
+    """
+    payload = json.dumps([user_id, cv_id, inputs], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    """Génération en cours, partagée entre le meneur et les suiveurs"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Exécute au plus une fois à la fois chaque clé dans le processus.
+
+    Le premier appelant (meneur) exécute la fonction; les appelants suivants avec
+    la même clé attendent et reçoivent le même résultat ou la même exception.
+    """
+
+    def __init__(self, name: str, timeout: float):
+        self.name = name
+        self.timeout = timeout
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Exécute fn ou attend le résultat de l'exécution en cours pour la même clé.
+
+        Args:
+            key (str): Clé de regroupement
+            fn (Callable): Fonction à exécuter si aucune exécution n'est en cours
+
+        Returns:
+            Tuple[Any, bool]: Le résultat et True s'il provient de l'exécution d'un autre appelant
+
+        Raises:
+            SingleFlightTimeoutError: Si le meneur n'a pas terminé dans le délai
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.followers += 1
+
+        if not leader:
+            metrics.increment(f"{self.name}.coalesced")
+            logger.info(f"{self.name}: requête identique en cours, attente du résultat ({key[:12]})")
+            if not flight.done.wait(self.timeout):
+                metrics.increment(f"{self.name}.timeouts")
+                raise SingleFlightTimeoutError("La génération identique en cours n'a pas terminé à temps")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        metrics.increment(f"{self.name}.leaders")
+        try:
+            flight.result = fn()
+            return flight.result, False
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            if flight.followers:
+                logger.info(f"{self.name}: résultat partagé avec {flight.followers} requête(s) identique(s)")
+            flight.done.set()
+
+    def in_flight(self) -> int:
+        """Retourne le nombre de clés en cours d'exécution"""
+        with self._lock:
+            return len(self._flights)
+
+
+class FirestoreLeaseManager:
+    """
+    Bail distribué dans la collection 'leases': une seule instance exécute une clé donnée.
+
+    Le bail expire après `ttl` secondes, ce qui permet à une autre instance de reprendre
+    la génération si l'instance détentrice a été arrêtée en cours d'exécution.
+    """
+
+    def __init__(self, ttl: float, poll_interval: float, wait_timeout: float):
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.wait_timeout = wait_timeout
+
+    def _ref(self, key: str):
+        return LeaseDocument.get_db().collection(LeaseDocument.collection_name).document(key)
+
+    def _try_acquire(self, key: str, owner: str) -> Tuple[bool, Optional[LeaseDocument]]:
+        """Prend le bail s'il est libre, terminé ou expiré; sinon retourne le bail en cours"""
+        db = LeaseDocument.get_db()
+        ref = self._ref(key)
+
+        @transactional
+        def acquire(transaction):
+            snapshot = ref.get(transaction=transaction)
+            now = datetime.now(UTC)
+            if snapshot.exists:
+                current = LeaseDocument.from_doc_snapshot(snapshot)
+                if current.status == "running" and current.expires_at > now:
+                    return False, current
+            lease = LeaseDocument(owner=owner, status="running", created_at=now,
+                                  expires_at=now + timedelta(seconds=self.ttl))
+            transaction.set(ref, lease.to_dict())
+            lease.id = key
+            return True, lease
+
+        return acquire(db.transaction())
+
+    def _release(self, key: str, owner: str, **fields: Any) -> None:
+        """Enregistre l'issue de la génération si le bail est toujours détenu par `owner`"""
+        db = LeaseDocument.get_db()
+        ref = self._ref(key)
+
+        @transactional
+        def release(transaction):
+            snapshot = ref.get(transaction=transaction)
+            if not snapshot.exists or snapshot.to_dict().get("owner") != owner:
+                logger.warning(f"Bail {key[:12]} repris par une autre instance, résultat non publié")
+                return
+            fields["updated_at"] = datetime.now(UTC)
+            transaction.update(ref, fields)
+
+        try:
+            release(db.transaction())
+        except Exception as e:
+            logger.error(f"Impossible de libérer le bail {key[:12]}: {str(e)}")
+
+    def run(self, key: str, fn: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Exécute fn sous bail, ou attend le résultat de l'instance qui détient le bail.
+
+        Args:
+            key (str): Clé de regroupement (ID du document de bail)
+            fn (Callable): Génération à exécuter, retournant un résultat sérialisable
+
+        Returns:
+            Dict[str, Any]: Résultat de la génération
+
+        Raises:
+            LeaseFailedError: Si la génération de l'autre instance a échoué
+            SingleFlightTimeoutError: Si l'attente dépasse `wait_timeout`
+        """
+        owner = f"{INSTANCE_ID}:{uuid.uuid4().hex[:8]}"
+        deadline = time.monotonic() + self.wait_timeout
+
+        while True:
+            acquired, lease = self._try_acquire(key, owner)
+            if acquired:
+                metrics.increment("single_flight.lease.acquired")
+                try:
+                    result = fn()
+                except Exception as e:
+                    self._release(key, owner, status="failed", error=str(e))
+                    raise
+                self._release(key, owner, status="succeeded", result=result)
+                return result
+
+            # Une autre instance exécute la même génération: attendre son issue
+            metrics.increment("single_flight.lease.waits")
+            logger.info(f"Bail {key[:12]} détenu par {lease.owner}, attente du résultat")
+            holder = lease.owner
+            while True:
+                if time.monotonic() > deadline:
+                    metrics.increment("single_flight.timeouts")
+                    raise SingleFlightTimeoutError("La génération identique en cours n'a pas terminé à temps")
+                time.sleep(self.poll_interval)
+
+                snapshot = self._ref(key).get()
+                lease = LeaseDocument.from_doc_snapshot(snapshot) if snapshot.exists else None
+                if lease is None or lease.owner != holder:
+                    break  # Bail supprimé ou repris: nouvelle tentative d'acquisition
+                if lease.status == "succeeded":
+                    metrics.increment("single_flight.lease.coalesced")
+                    return lease.result
+                if lease.status == "failed":
+                    raise LeaseFailedError(lease.error or "La génération a échoué sur une autre instance")
+                if lease.expires_at <= datetime.now(UTC):
+                    metrics.increment("single_flight.lease.takeovers")
+                    logger.warning(f"Bail {key[:12]} expiré, reprise de la génération")
+                    break
+
+
+_generation_flight = SingleFlight("single_flight", config.SINGLE_FLIGHT_TIMEOUT)
+_lease_manager: Optional[FirestoreLeaseManager] = None
+if config.SINGLE_FLIGHT_LEASE:
+    _lease_manager = FirestoreLeaseManager(config.LEASE_TTL, config.LEASE_POLL_INTERVAL, config.SINGLE_FLIGHT_TIMEOUT)
+
+metrics.register_collector("single_flight", lambda: {
+    "in_flight": _generation_flight.in_flight(),
+    "lease_enabled": _lease_manager is not None,
+})
+
+
+def coalesce_generation(key: str, fn: Callable[[], Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+    """
+    Exécute une génération en la regroupant avec les générations identiques en cours,
+    dans le processus puis, si activé, entre instances via un bail Firestore.
+
+    Args:
+        key (str): Clé construite par make_flight_key
+        fn (Callable): Génération à exécuter
+
+    Returns:
+        Tuple[Dict[str, Any], bool]: Le résultat et True s'il a été partagé par une autre requête
+    """
+    if _lease_manager is None:
+        return _generation_flight.do(key, fn)
+    return _generation_flight.do(key, lambda: _lease_manager.run(key, fn))
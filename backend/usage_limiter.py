@@ -0,0 +1,281 @@
+"""
+Contrôle d'admission local des requêtes facturées (limite de tokens et délai entre requêtes).
+
+Le limiteur conserve en mémoire, pour chaque utilisateur, l'usage total et la date de
+la dernière requête, chargés depuis le document 'usage/{uid}' et ses shards. La limite de tokens et
+le délai de 20 secondes sont vérifiés sans appel réseau; les incréments d'usage sont
+écrits dans Firestore en arrière-plan (write-behind), par lots d'incréments atomiques.
+
+Avec plusieurs instances, les requêtes d'un même utilisateur peuvent arriver sur des
+instances différentes: l'état d'un utilisateur est relu dans Firestore lorsqu'il a plus
+de USAGE_STALENESS secondes (0: relu à chaque requête, comme sans limiteur).
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.base_firestore import BatchCommitError
+from backend.config import load_config
+from backend.metrics import metrics
+from backend.models import UsageDocument
+
+logger = logging.getLogger(__name__)
+config = load_config()
+
+TOKEN_LIMIT = 1_000_000
+REQUEST_COOLDOWN = 20  # En secondes
+DEFAULT_USAGE_INCREMENT = 50000
+
+
+def to_utc_timestamp(value: Any) -> Optional[float]:
+    """Convertit la date de dernière requête lue dans Firestore en timestamp UTC"""
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class UserUsage:
+    """État d'un utilisateur: usage connu, dernière requête et incréments pas encore écrits"""
+    __slots__ = ("total_usage", "last_request", "pending", "pending_last_request", "loaded_at")
+
+    def __init__(self):
+        self.total_usage = 0
+        self.last_request: Optional[float] = None  # Timestamp UTC
+        self.pending = 0
+        self.pending_last_request: Optional[float] = None
+        self.loaded_at: Optional[float] = None  # time.monotonic() du dernier chargement
+
+    @property
+    def dirty(self) -> bool:
+        return self.pending_last_request is not None
+
+
+class UsageLimiter:
+    """Limiteur en mémoire avec écriture différée des usages, thread-safe"""
+
+    def __init__(self, staleness: float, flush_interval: float, max_users: int):
+        self.staleness = staleness
+        self.flush_interval = flush_interval
+        self.max_users = max_users
+        self._states: "OrderedDict[str, UserUsage]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.admitted = 0
+        self.rejected_limit = 0
+        self.rejected_cooldown = 0
+        self.loads = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        self.unknown_outcomes = 0
+        self.documents_written = 0
+
+    def admit(self, user_id: str) -> bool:
+        """
+        Vérifie la limite de tokens et le délai entre requêtes, et réserve la requête.
+
+        Args:
+            user_id (str): ID de l'utilisateur
+
+        Returns:
+            bool: True si la requête est admise
+        """
+        loaded = self._ensure_fresh(user_id)
+        now = time.time()
+        with self._lock:
+            state = self._states.get(user_id)
+            if state is None:
+                # Retiré par _evict entre le chargement et la vérification: l'état chargé est réinséré
+                state = self._states[user_id] = loaded
+                self._evict()
+            if state.total_usage >= TOKEN_LIMIT:
+                self.rejected_limit += 1
+                logger.warning(f"L'utilisateur {user_id} a dépassé 1 million de tokens.")
+                return False
+            if state.last_request is not None and now - state.last_request < REQUEST_COOLDOWN:
+                self.rejected_cooldown += 1
+                logger.warning(
+                    f"L'utilisateur {user_id} a fait une requête récemment "
+                    f"(il y a {now - state.last_request:.2f} secondes)."
+                )
+                return False
+            # Réservation locale: les requêtes concurrentes du même utilisateur sont refusées
+            state.last_request = now
+            self.admitted += 1
+            return True
+
+    def record(self, user_id: str, increment: int = DEFAULT_USAGE_INCREMENT) -> None:
+        """
+        Ajoute un usage à l'utilisateur; l'écriture dans Firestore est faite en arrière-plan.
+
+        Args:
+            user_id (str): ID de l'utilisateur
+            increment (int): Nombre de tokens à ajouter
+        """
+        now = time.time()
+        with self._lock:
+            state = self._states.get(user_id)
+            if state is None:
+                # Chargé depuis Firestore à la prochaine admission, incréments en attente compris
+                state = self._states[user_id] = UserUsage()
+            state.total_usage += increment
+            state.last_request = max(state.last_request or now, now)
+            state.pending += increment
+            state.pending_last_request = now
+            self._states.move_to_end(user_id)
+            self._evict()
+        self._start()
+
+    def _ensure_fresh(self, user_id: str) -> UserUsage:
+        """Retourne l'état de l'utilisateur, relu dans Firestore s'il est absent ou périmé"""
+        with self._lock:
+            state = self._states.get(user_id)
+            if state is not None:
+                self._states.move_to_end(user_id)
+                if state.loaded_at is not None and time.monotonic() - state.loaded_at < self.staleness:
+                    return state
+        return self._load(user_id, UsageDocument.read_counters(user_id))
+
+    def _load(self, user_id: str, counters: Optional[Dict[str, Any]]) -> UserUsage:
+        """Remplace l'état connu par l'usage lu, en conservant les incréments en attente"""
+        with self._lock:
+            state = self._states.get(user_id)
+            if state is None:
+                state = self._states[user_id] = UserUsage()
+                self._evict()
+            counters = counters or {}
+            stored_last_request = to_utc_timestamp(counters.get("last_request_time"))
+            state.total_usage = counters.get("total_usage", 0) + state.pending
+            if stored_last_request is not None:
+                state.last_request = max(state.last_request or stored_last_request, stored_last_request)
+            state.loaded_at = time.monotonic()
+            self.loads += 1
+            return state
+
+    def _evict(self) -> None:
+        # Appelé avec le verrou: les états sans incrément en attente les plus anciens sont retirés
+        if len(self._states) <= self.max_users:
+            return
+        for user_id in [user_id for user_id, state in self._states.items() if not state.dirty]:
+            del self._states[user_id]
+            if len(self._states) <= self.max_users:
+                return
+
+    def _take_pending(self) -> List[Tuple[str, int, float]]:
+        with self._lock:
+            pending = []
+            for user_id, state in self._states.items():
+                if state.dirty:
+                    pending.append((user_id, state.pending, state.pending_last_request))
+                    state.pending = 0
+                    state.pending_last_request = None
+            return pending
+
+    def _restore_pending(self, pending: List[Tuple[str, int, float]]) -> None:
+        with self._lock:
+            for user_id, increment, last_request in pending:
+                state = self._states.setdefault(user_id, UserUsage())
+                state.pending += increment
+                state.pending_last_request = max(state.pending_last_request or last_request, last_request)
+
+    def flush(self) -> int:
+        """
+        Écrit les incréments en attente par lots, avec des incréments atomiques sans lecture.
+        Si un lot échoue, seuls les incréments non appliqués sont remis en attente: ceux d'un
+        lot au résultat inconnu ne sont pas renvoyés, pour ne pas être comptés deux fois.
+        
+        Returns:
+            int: Nombre de documents écrits
+        """
+        pending = self._take_pending()
+        if not pending:
+            return 0
+        try:
+            report = UsageDocument.add_usage_many([(user_id, increment) for user_id, increment, _ in pending])
+        except BatchCommitError as e:
+            uncommitted = {user_id for user_id, _ in e.uncommitted}
+            self._restore_pending([item for item in pending if item[0] in uncommitted])
+            with self._lock:
+                self.flush_errors += 1
+                self.documents_written += len(e.committed)
+                self.unknown_outcomes += len(e.unknown)
+            metrics.increment("usage_limiter.documents_written", len(e.committed))
+            logger.error(
+                f"Erreur lors de l'écriture différée de l'usage: {len(e.committed)} utilisateur(s) écrit(s), "
+                f"{len(uncommitted)} remis en attente, {len(e.unknown)} au résultat inconnu non renvoyé(s): {str(e)}"
+            )
+            return len(e.committed)
+        except Exception as e:
+            self._restore_pending(pending)
+            with self._lock:
+                self.flush_errors += 1
+            logger.error(f"Erreur lors de l'écriture différée de l'usage ({len(pending)} utilisateur(s)): {str(e)}")
+            return 0
+
+        with self._lock:
+            self.flushes += 1
+            self.documents_written += report["documents"]
+        metrics.increment("usage_limiter.documents_written", report["documents"])
+        logger.info(f"Usage de {report['documents']} utilisateur(s) écrit en {report['elapsed_ms']:.2f} ms")
+        return report["documents"]
+
+    def _start(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="usage-write-behind", daemon=True)
+            self._thread.start()
+        # Écriture des incréments restants à l'arrêt du processus
+        atexit.register(self.flush)
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retourne les compteurs du limiteur"""
+        with self._lock:
+            return {
+                "enabled": config.USAGE_LIMITER_ENABLED,
+                "users": len(self._states),
+                "pending_users": sum(1 for state in self._states.values() if state.dirty),
+                "staleness": self.staleness,
+                "admitted": self.admitted,
+                "rejected_limit": self.rejected_limit,
+                "rejected_cooldown": self.rejected_cooldown,
+                "loads": self.loads,
+                "flushes": self.flushes,
+                "flush_errors": self.flush_errors,
+                "unknown_outcomes": self.unknown_outcomes,
+                "documents_written": self.documents_written,
+            }
+
+
+# Limiteur unique du processus
+usage_limiter = UsageLimiter(config.USAGE_STALENESS, config.USAGE_FLUSH_INTERVAL, config.USAGE_LIMITER_MAX_USERS)
+metrics.register_collector("usage_limiter", usage_limiter.get_stats)
+
+
+def record_usage(user_id: str, increment: int = DEFAULT_USAGE_INCREMENT) -> None:
+    """
+    Incrémente l'usage de l'utilisateur et met à jour la date de sa dernière requête,
+    sans lecture préalable. Avec USAGE_LIMITER, l'écriture est différée.
+
+    Args:
+        user_id (str): ID de l'utilisateur
+        increment (int): Nombre de tokens à ajouter
+    """
+    if config.USAGE_LIMITER_ENABLED:
+        usage_limiter.record(user_id, increment)
+    else:
+        UsageDocument.add_usage(user_id, increment)
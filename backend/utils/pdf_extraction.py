@@ -0,0 +1,152 @@
+"""
+Extraction du texte des PDF sources hors du processus du serveur.
+
+pdfminer est du Python pur: dans un worker gunicorn à threads, une extraction garde
+le GIL et ralentit les autres requêtes de l'instance. Avec PDF_PROCESS_POOL,
+les extractions sont faites par un pool de processus (contexte "spawn"), avec un
+délai maximal par fichier. Un processus qui dépasse le délai est arrêté et le pool
+est recréé.
+
+Dans tous les modes, les PDF de plus de PDF_MAX_BYTES octets sont ignorés et seules
+les PDF_MAX_PAGES premières pages sont analysées. Un fichier trop volumineux ou dont
+l'extraction échoue est ignoré: les autres sources sont conservées.
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional, Tuple
+
+from backend.config import load_config
+from backend.metrics import metrics
+from backend.utils.pdf_worker import extract_pdf
+
+logger = logging.getLogger(__name__)
+config = load_config()
+
+
+class PdfExtractionTimeout(Exception):
+    """Levée lorsqu'une extraction dépasse PDF_TIMEOUT secondes"""
+
+
+class PdfExtractionPool:
+    """Pool de processus d'extraction, recréé après un dépassement de délai ou la perte d'un processus"""
+
+    def __init__(self, max_workers: int, timeout: float, max_tasks_per_child: int):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_tasks_per_child = max_tasks_per_child
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # Une extraction soumise démarre aussitôt: le délai ne compte pas l'attente dans la file
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self.restarts = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        max_tasks_per_child=self.max_tasks_per_child or None,
+                    )
+        return self._pool
+
+    def _reset(self, pool: ProcessPoolExecutor) -> None:
+        """Arrête les processus du pool et le remplace au prochain appel"""
+        with self._lock:
+            if self._pool is not pool:
+                return  # Déjà recréé par un autre thread
+            self._pool = None
+            self.restarts += 1
+        # Les processus bloqués ne s'arrêtent pas d'eux-mêmes: arrêt forcé
+        for process in list((pool._processes or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def extract(self, content: bytes, max_pages: Optional[int]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Extrait le texte d'un PDF dans un processus du pool.
+
+        Raises:
+            PdfExtractionTimeout: Si l'extraction dépasse le délai
+        """
+        with self._slots:
+            for attempt in range(2):
+                pool = self._get_pool()
+                try:
+                    future = pool.submit(extract_pdf, content, max_pages)
+                    return future.result(timeout=self.timeout)
+                except FuturesTimeoutError:
+                    self._reset(pool)
+                    raise PdfExtractionTimeout(f"extraction interrompue après {self.timeout:g} s")
+                except BrokenProcessPool:
+                    # Pool arrêté pour une autre extraction, ou processus tué (ex: mémoire): un nouvel essai
+                    self._reset(pool)
+                    if attempt:
+                        raise
+
+
+class PdfExtractionStats:
+    """Compteurs des extractions de PDF du processus"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {"extracted": 0, "too_large": 0, "timeouts": 0, "failures": 0}
+
+    def increment(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+        metrics.increment(f"pdf_extraction.{name}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "process_pool": config.PDF_PROCESS_POOL,
+                **self.counters,
+                "pool_restarts": pdf_pool.restarts,
+            }
+
+
+# Pool et compteurs uniques du processus; les processus sont démarrés à la première extraction
+pdf_pool = PdfExtractionPool(config.PDF_WORKERS, config.PDF_TIMEOUT, config.PDF_WORKER_MAX_TASKS)
+pdf_stats = PdfExtractionStats()
+metrics.register_collector("pdf_extraction", pdf_stats.get_stats)
+
+
+def extract_pdf_text(content: bytes, name: str) -> Tuple[Optional[str], Dict[str, Any]]:
+    """
+    Extrait le texte d'un PDF, dans le pool de processus si PDF_PROCESS_POOL est activé.
+
+    Args:
+        content (bytes): Contenu du PDF
+        name (str): Nom du fichier, pour les logs
+
+    Returns:
+        Tuple[Optional[str], Dict[str, Any]]: Texte extrait (None si le fichier est ignoré ou
+            si l'extraction a échoué) et mesures de l'extraction
+    """
+    if len(content) > config.PDF_MAX_BYTES:
+        pdf_stats.increment("too_large")
+        logger.warning(f"PDF {name} ignoré: {len(content)} octets (maximum {config.PDF_MAX_BYTES})")
+        return None, {"error": "too_large"}
+
+    max_pages = config.PDF_MAX_PAGES or None
+    try:
+        if config.PDF_PROCESS_POOL:
+            text, stats = pdf_pool.extract(content, max_pages)
+        else:
+            text, stats = extract_pdf(content, max_pages)
+    except PdfExtractionTimeout as e:
+        pdf_stats.increment("timeouts")
+        logger.warning(f"PDF {name} ignoré: {str(e)}")
+        return None, {"error": "timeout"}
+    except Exception as e:
+        pdf_stats.increment("failures")
+        logger.warning(f"PDF {name} ignoré: échec de l'extraction ({type(e).__name__}: {str(e)})")
+        return None, {"error": "failure"}
+
+    pdf_stats.increment("extracted")
+    return text, stats
@@ -0,0 +1,34 @@
+"""
+Extraction du texte d'un PDF, exécutée dans un processus du pool de backend.utils.pdf_extraction.
+
+Ce module est importé par les processus du pool (contexte "spawn"): il n'importe
+que pdfminer, pas la configuration ni les modules de l'application.
+"""
+import io
+import resource
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from pdfminer.high_level import extract_text
+
+
+def extract_pdf(content: bytes, max_pages: Optional[int] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    Extrait le texte d'un PDF.
+
+    Args:
+        content (bytes): Contenu du PDF
+        max_pages (Optional[int]): Nombre maximal de pages analysées (None: toutes)
+
+    Returns:
+        Tuple[str, Dict[str, Any]]: Texte extrait et mesures du processus: durée, temps CPU
+            et pic de mémoire résidente (ru_maxrss, en Ko sous Linux)
+    """
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    text = extract_text(io.BytesIO(content), maxpages=max_pages or 0)
+    return text, {
+        "extract_ms": round((time.perf_counter() - start) * 1000, 1),
+        "cpu_ms": round((time.process_time() - cpu_start) * 1000, 1),
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
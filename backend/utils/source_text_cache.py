@@ -0,0 +1,173 @@
+"""
+Cache du texte extrait des fichiers sources PDF.
+
+Le texte extrait d'un PDF est conservé dans un objet compressé placé à côté de la
+source (`{source}.txt.gz`), dont les métadonnées portent la génération et le md5 de
+la source, et dans un répertoire local (SOURCE_TEXT_CACHE_DIR) consulté en premier.
+Une source inchangée n'est ni téléchargée ni réanalysée.
+
+Une source réécrite change de génération: l'entrée locale et l'objet compressé de
+l'ancienne génération ne correspondent plus et sont remplacés. Les objets compressés
+dont la source a été supprimée sont supprimés au listing suivant.
+"""
+import gzip
+import hashlib
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from backend.config import load_config
+from backend.metrics import metrics
+
+logger = logging.getLogger(__name__)
+config = load_config()
+
+SIDECAR_SUFFIX = ".txt.gz"
+
+
+def sidecar_name(source_name: str) -> str:
+    """Nom de l'objet compressé associé à un fichier source"""
+    return f"{source_name}{SIDECAR_SUFFIX}"
+
+
+def is_sidecar(name: str) -> bool:
+    return name.endswith(SIDECAR_SUFFIX)
+
+
+class SourceTextCache:
+    """Cache à deux niveaux (disque local, objet compressé du bucket) du texte extrait des sources"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self.disk_hits = 0
+        self.sidecar_hits = 0
+        self.misses = 0
+
+    def _disk_path(self, blob) -> Path:
+        # Clé: chemin de la source et génération; une source réécrite a une nouvelle clé
+        name_hash = hashlib.sha256(blob.name.encode("utf-8")).hexdigest()
+        return self.directory / f"{name_hash}.{blob.generation}{SIDECAR_SUFFIX}"
+
+    def _record(self, tier: str) -> None:
+        with self._lock:
+            if tier == "disk":
+                self.disk_hits += 1
+            elif tier == "sidecar":
+                self.sidecar_hits += 1
+            else:
+                self.misses += 1
+        metrics.increment(f"source_text_cache.{tier}")
+
+    @staticmethod
+    def _sidecar_matches(blob, sidecar) -> bool:
+        metadata = (sidecar.metadata or {}) if sidecar is not None else {}
+        return metadata.get("source_generation") == str(blob.generation)
+
+    def get(self, blob, sidecar) -> Tuple[Optional[str], str]:
+        """
+        Retourne le texte extrait de la source s'il est en cache pour sa génération courante.
+
+        Args:
+            blob: Fichier source issu du listing du bucket
+            sidecar: Objet compressé associé issu du même listing, ou None
+
+        Returns:
+            Tuple[Optional[str], str]: Texte (None si absent) et niveau: "disk", "sidecar" ou "miss"
+        """
+        path = self._disk_path(blob)
+        try:
+            text = gzip.decompress(path.read_bytes()).decode("utf-8")
+            self._record("disk")
+            return text, "disk"
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Entrée locale illisible pour {blob.name}: {str(e)}")
+
+        if self._sidecar_matches(blob, sidecar):
+            try:
+                compressed = sidecar.download_as_bytes()
+                text = gzip.decompress(compressed).decode("utf-8")
+                self._write_disk(blob, compressed)
+                self._record("sidecar")
+                return text, "sidecar"
+            except Exception as e:
+                logger.warning(f"Texte en cache illisible pour {blob.name}: {str(e)}")
+
+        self._record("miss")
+        return None, "miss"
+
+    def put(self, blob, text: str) -> None:
+        """
+        Enregistre le texte extrait d'une source, sur disque et dans l'objet compressé associé.
+        Les erreurs sont journalisées sans interrompre la lecture des sources.
+
+        Args:
+            blob: Fichier source issu du listing du bucket
+            text (str): Texte extrait
+        """
+        compressed = gzip.compress(text.encode("utf-8"))
+        self._write_disk(blob, compressed)
+        try:
+            sidecar = blob.bucket.blob(sidecar_name(blob.name))
+            sidecar.metadata = {"source_generation": str(blob.generation), "source_md5": blob.md5_hash or ""}
+            sidecar.upload_from_string(compressed, content_type="application/gzip")
+        except Exception as e:
+            logger.warning(f"Échec de l'enregistrement du texte extrait de {blob.name}: {str(e)}")
+
+    def _write_disk(self, blob, compressed: bytes) -> None:
+        path = self._disk_path(blob)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(compressed)
+            os.replace(tmp_path, path)
+            # Entrées des générations précédentes de la même source, après le remplacement;
+            # le motif exclut les fichiers temporaires des écritures en cours (*.tmp)
+            for stale in self.directory.glob(f"{path.name.split('.')[0]}.*{SIDECAR_SUFFIX}"):
+                if stale != path:
+                    stale.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Échec de l'écriture locale du texte extrait de {blob.name}: {str(e)}")
+
+    def remove_orphans(self, sidecars: Dict[str, Any], source_names: Iterable[str]) -> int:
+        """
+        Supprime les objets compressés dont la source n'existe plus.
+
+        Args:
+            sidecars (Dict[str, Any]): Objets compressés du listing, par nom
+            source_names (Iterable[str]): Noms des fichiers sources du listing
+
+        Returns:
+            int: Nombre d'objets supprimés
+        """
+        expected = {sidecar_name(name) for name in source_names}
+        removed = 0
+        for name, sidecar in sidecars.items():
+            if name not in expected:
+                try:
+                    sidecar.delete()
+                    removed += 1
+                except Exception as e:
+                    logger.warning(f"Échec de la suppression de {name}: {str(e)}")
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retourne les compteurs du cache"""
+        with self._lock:
+            lookups = self.disk_hits + self.sidecar_hits + self.misses
+            return {
+                "enabled": config.SOURCE_TEXT_CACHE_ENABLED,
+                "disk_hits": self.disk_hits,
+                "sidecar_hits": self.sidecar_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.disk_hits + self.sidecar_hits) / lookups, 3) if lookups else 0.0,
+            }
+
+
+# Cache unique du processus
+source_text_cache = SourceTextCache(Path(config.SOURCE_TEXT_CACHE_DIR))
+metrics.register_collector("source_text_cache", source_text_cache.get_stats)
@@ -1,8 +1,11 @@
 from google.cloud import storage
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
 from backend.config import load_config
-import io
-from pdfminer.high_level import extract_text
+from backend.utils.pdf_extraction import extract_pdf_text
+from backend.utils.source_text_cache import is_sidecar, sidecar_name, source_text_cache
 import requests
 
 config = load_config()
@@ -26,10 +29,62 @@ def get_linkedin_profile_content(linkedin_url: str) -> str:
     # TODO: Implémenter la récupération du contenu LinkedIn
     return ""
 
+def _load_source_blob(blob, sidecar=None) -> Tuple[Optional[str], Dict[str, Any]]:
+    """
+    Télécharge un fichier source et en extrait le texte.
+    Avec SOURCE_TEXT_CACHE, le texte d'un PDF inchangé est lu depuis le cache.
+    
+    Args:
+        blob: Fichier du bucket (.txt ou .pdf)
+        sidecar: Objet compressé du texte extrait du même listing, ou None
+        
+    Returns:
+        Tuple[Optional[str], Dict[str, Any]]: Texte du fichier (None pour un autre format)
+            et durées du téléchargement et de l'extraction
+    """
+    if not blob.name.endswith((".txt", ".pdf")):
+        return None, {"name": blob.name, "skipped": True}
+    
+    start = time.perf_counter()
+    cache_enabled = config.SOURCE_TEXT_CACHE_ENABLED and blob.name.endswith(".pdf")
+    if cache_enabled:
+        text, tier = source_text_cache.get(blob, sidecar)
+        if text is not None:
+            return text, {
+                "name": blob.name,
+                "size": blob.size or 0,
+                "cache": tier,
+                "download_ms": round((time.perf_counter() - start) * 1000, 1),
+                "extract_ms": 0.0,
+            }
+    
+    content = blob.download_as_bytes()
+    downloaded = time.perf_counter()
+    extract_stats: Dict[str, Any] = {}
+    if blob.name.endswith(".txt"):
+        text = content.decode("utf-8")
+    else:
+        # Pool de processus, délai et limites de taille (None: fichier ignoré)
+        text, extract_stats = extract_pdf_text(content, blob.name)
+    extracted = time.perf_counter()
+    if cache_enabled and text is not None:
+        source_text_cache.put(blob, text)
+    
+    return text, {
+        "name": blob.name,
+        "size": len(content),
+        "cache": "miss" if cache_enabled else None,
+        "download_ms": round((downloaded - start) * 1000, 1),
+        "extract_ms": round((extracted - downloaded) * 1000, 1),
+        "worker": extract_stats,
+    }
+
 def get_concatenated_text_files(user_id: str, linkedin_url: str = None) -> str:
     """
     Récupère et concatène tous les fichiers texte et PDF présents dans le bucket pour un utilisateur donné,
     ainsi que le contenu LinkedIn si disponible.
+    Les fichiers sont téléchargés et leur texte extrait en parallèle (SOURCE_DOWNLOAD_WORKERS threads);
+    les textes sont concaténés dans l'ordre du listing du bucket.
     
     Args:
         user_id (str): ID de l'utilisateur
@@ -39,19 +94,55 @@ def get_concatenated_text_files(user_id: str, linkedin_url: str = None) -> str:
         str: Contenu concaténé de tous les fichiers texte, PDF et LinkedIn
     """
     try:
+        start = time.perf_counter()
         # Récupérer les fichiers depuis le bucket
         bucket = storage.Client().bucket(config.BUCKET_NAME)
+        listed = list(bucket.list_blobs(prefix=f"{user_id}/sources/"))
+        # Textes extraits en cache (objets compressés à côté des sources)
+        sidecars = {blob.name: blob for blob in listed if is_sidecar(blob.name)}
+        blobs = [blob for blob in listed if not is_sidecar(blob.name)]
+        if config.SOURCE_TEXT_CACHE_ENABLED:
+            source_text_cache.remove_orphans(sidecars, (blob.name for blob in blobs))
         text_files = []
         
-        # Récupérer les fichiers du bucket
-        for blob in bucket.list_blobs(prefix=f"{user_id}/sources/"):
-            if blob.name.endswith(".txt"):
-                content = blob.download_as_bytes().decode("utf-8")
-                text_files.append(content)
-            elif blob.name.endswith(".pdf"):
-                pdf_content = blob.download_as_bytes()
-                text = extract_text(io.BytesIO(pdf_content))
-                text_files.append(text)
+        # Télécharger les fichiers en parallèle, résultats dans l'ordre du listing
+        if blobs:
+            max_workers = min(config.SOURCE_DOWNLOAD_WORKERS, len(blobs))
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gcs-sources") as executor:
+                results = list(executor.map(
+                    lambda blob: _load_source_blob(blob, sidecars.get(sidecar_name(blob.name))), blobs
+                ))
+            
+            loaded = [stats for _, stats in results if not stats.get("skipped")]
+            for stats in loaded:
+                cache = f", cache {stats['cache']}" if stats["cache"] else ""
+                worker = stats.get("worker") or {}
+                if "max_rss_kb" in worker:
+                    worker_details = (
+                        f", CPU {worker['cpu_ms']} ms, mémoire max du processus {worker['max_rss_kb'] / 1024:.1f} Mo"
+                    )
+                elif "error" in worker:
+                    worker_details = f", ignoré ({worker['error']})"
+                else:
+                    worker_details = ""
+                logger.info(
+                    f"Source {stats['name']}: {stats['size']} octets, téléchargement {stats['download_ms']} ms, "
+                    f"extraction {stats['extract_ms']} ms{worker_details}{cache}"
+                )
+            sequential_ms = sum(stats["download_ms"] + stats["extract_ms"] for stats in loaded)
+            logger.info(
+                f"{len(loaded)} source(s) pour l'utilisateur {user_id}: "
+                f"{sum(stats['size'] for stats in loaded)} octets en {(time.perf_counter() - start) * 1000:.1f} ms "
+                f"({sequential_ms:.1f} ms cumulés, {max_workers} thread(s))"
+            )
+            cached = [stats for stats in loaded if stats["cache"]]
+            if cached:
+                hits = sum(1 for stats in cached if stats["cache"] != "miss")
+                logger.info(
+                    f"Cache du texte extrait: {hits}/{len(cached)} PDF servis depuis le cache "
+                    f"(taux de succès du processus: {source_text_cache.get_stats()['hit_rate']:.0%})"
+                )
+            text_files.extend(text for text, _ in results if text is not None)
         
         # Récupérer le contenu LinkedIn si l'URL est disponible
         if linkedin_url:
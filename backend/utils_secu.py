@@ -1,6 +1,8 @@
 import logging
-from firebase_admin import auth, firestore
+from firebase_admin import auth
+from backend.models import UsageDocument
 from backend.config import load_config
+from backend.usage_limiter import REQUEST_COOLDOWN, TOKEN_LIMIT, usage_limiter
 from datetime import datetime, timezone, UTC
 
 logger = logging.getLogger(__name__)
@@ -19,20 +21,22 @@ def check_token_usage(user_id: str) -> bool:
         bool: True si l'utilisateur peut continuer à utiliser le service, sinon False.
     """
     try:
-        db = firestore.Client()
-        stats_ref = db.collection('usage').document(user_id)
-        stats = stats_ref.get()
+        if config.USAGE_LIMITER_ENABLED:
+            # Vérification en mémoire, état relu dans Firestore au-delà de USAGE_STALENESS
+            return usage_limiter.admit(user_id)
+
+        # Document d'usage et, si le compteur est réparti, ses shards
+        stats_dict = UsageDocument.read_counters(user_id)
 
         # Si pas de stats, c'est la première requête, donc on autorise
-        if not stats.exists:
+        if stats_dict is None:
             logger.info(f"Première requête pour l'utilisateur {user_id}")
             return True
 
-        stats_dict = stats.to_dict()
         total_tokens = stats_dict.get('total_usage', 0)
         last_request = stats_dict.get('last_request_time')
 
-        if total_tokens >= 1_000_000:
+        if total_tokens >= TOKEN_LIMIT:
             logger.warning(f"L'utilisateur {user_id} a dépassé 1 million de tokens.")
             return False
 
@@ -50,7 +54,7 @@ def check_token_usage(user_id: str) -> bool:
             current_time = datetime.now(UTC)
             time_since_last_request = (current_time - last_request).total_seconds()
             
-            if time_since_last_request < 20:
+            if time_since_last_request < REQUEST_COOLDOWN:
                 logger.warning(f"L'utilisateur {user_id} a fait une requête récemment (il y a {time_since_last_request:.2f} secondes).")
                 return False
 
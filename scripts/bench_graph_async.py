@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Benchmark des chemins synchrone et asyncio du graphe de génération de CV.
+
+Le LLM est remplacé par un bouchon qui simule la latence réseau d'un appel OpenAI,
+sans aucun appel réel. Le script lance N générations concurrentes avec chaque chemin
+et compare le débit et le nombre maximal de threads actifs.
+
+Usage: PYTHONPATH=. python scripts/bench_graph_async.py [nb_generations] [latence_ms]
+"""
+import asyncio
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple, get_args, get_origin
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+
+import langdetect
+from langchain_core.messages import AIMessage
+from pydantic import BaseModel
+
+from ai_module.chains_gen_cv import gen_cv_chain
+from ai_module.chains_gen_cv.gen_cv_chain import create_cv_chain
+from ai_module.lg_models import CVGenState, CVHead, CVExperience, CVEducation
+
+
+def valeur_factice(annotation, prompt: str):
+    """Construit une valeur plausible pour un champ de sortie structurée"""
+    origin = get_origin(annotation)
+    if origin is list:
+        (item,) = get_args(annotation)
+        if isinstance(item, type) and issubclass(item, BaseModel):
+            # Une entrée par identifiant présent dans le prompt (EXP_xxx / EDU_xxx)
+            prefix = "EXP" if "exp_id" in item.model_fields else "EDU"
+            ids = re.findall(rf"\[ID: ({prefix}_\w+)\]", prompt) or [f"{prefix}_000000"]
+            return [objet_factice(item, prompt, ident) for ident in ids]
+        return ["item"]
+    if origin is not None and type(None) in get_args(annotation):
+        return 1
+    if annotation is int:
+        return 2
+    return "texte"
+
+
+def objet_factice(schema, prompt: str, ident: Optional[str] = None):
+    valeurs = {}
+    for nom, champ in schema.model_fields.items():
+        if nom in ("exp_id", "edu_id") and ident:
+            valeurs[nom] = ident
+        else:
+            valeurs[nom] = valeur_factice(champ.annotation, prompt)
+    return schema(**valeurs)
+
+
+class LLMFactice:
+    """Bouchon de ChatOpenAI: attend `latence` secondes puis répond"""
+
+    def __init__(self, latence: float, schema=None):
+        self.latence = latence
+        self.schema = schema
+
+    def _reponse(self, prompt):
+        if self.schema is not None:
+            return objet_factice(self.schema, str(prompt))
+        return AIMessage(content="Réponse factice du modèle.")
+
+    def invoke(self, prompt):
+        time.sleep(self.latence)
+        return self._reponse(prompt)
+
+    async def ainvoke(self, prompt):
+        await asyncio.sleep(self.latence)
+        return self._reponse(prompt)
+
+
+def etat_initial() -> CVGenState:
+    head = CVHead(name="Jean Dupont", title_raw="Développeur", title_generated="", title_refined="",
+                  mail="jean@example.com", tel_raw="0612345678", tel_refined="")
+    experiences = [
+        CVExperience(title_raw=f"Poste {i}", company_raw="Entreprise", location_raw="Paris",
+                     dates_raw="2020 - 2023", description_raw="Développement backend Python.")
+        for i in range(5)
+    ]
+    education = [
+        CVEducation(degree_raw=f"Diplôme {i}", institution_raw="Université", location_raw="Lyon",
+                    dates_raw="2015 - 2017", description_raw="Informatique.")
+        for i in range(3)
+    ]
+    return CVGenState(head=head, experiences=experiences, education=education,
+                      skills_raw="Python, SQL", langues_raw="Anglais courant", hobbies_raw="Échecs",
+                      job_raw="We are looking for a senior Python backend engineer to build APIs.")
+
+
+class MoniteurThreads:
+    """Échantillonne le nombre de threads actifs pendant le benchmark"""
+
+    def __init__(self):
+        self.maximum = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(0.005):
+            self.maximum = max(self.maximum, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def bench_sync(n: int) -> Tuple[float, int]:
+    graph = create_cv_chain().compile()
+    with MoniteurThreads() as moniteur:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=n) as pool:
+            list(pool.map(lambda _: graph.invoke(etat_initial()), range(n)))
+        duree = time.perf_counter() - start
+    return duree, moniteur.maximum
+
+
+def bench_async(n: int) -> Tuple[float, int]:
+    graph = create_cv_chain(use_async=True).compile()
+
+    async def run_all():
+        await asyncio.gather(*(graph.ainvoke(etat_initial()) for _ in range(n)))
+
+    with MoniteurThreads() as moniteur:
+        start = time.perf_counter()
+        asyncio.run(run_all())
+        duree = time.perf_counter() - start
+    return duree, moniteur.maximum
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    latence = (int(sys.argv[2]) if len(sys.argv) > 2 else 200) / 1000
+
+    # Remplacer le LLM des nœuds par le bouchon
+    gen_cv_chain.get_llm = lambda model="gpt-4o-mini", temperature=0.2, schema=None: LLMFactice(latence, schema)
+    # langdetect charge ses profils de langues au premier appel, sans verrou: chargement
+    # avant les générations concurrentes ("Need to load profiles" sinon)
+    langdetect.detect(etat_initial().job_raw)
+
+    print(f"{n} générations concurrentes, latence LLM simulée {latence * 1000:.0f} ms")
+    print(f"{'Chemin':<10}{'durée (s)':>12}{'CV/s':>10}{'threads max':>14}")
+    for nom, bench in (("sync", bench_sync), ("asyncio", bench_async)):
+        duree, threads = bench(n)
+        print(f"{nom:<10}{duree:>12.2f}{n / duree:>10.2f}{threads:>14}")
+
+
+if __name__ == "__main__":
+    main()
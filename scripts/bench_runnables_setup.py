@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark du coût de préparation des chaînes LLM par appel de nœud.
+
+Compare la construction à chaque appel (ancien comportement) avec les runnables
+mis en cache au niveau du processus. Aucun appel réseau n'est effectué.
+
+Usage: PYTHONPATH=. python scripts/bench_runnables_setup.py [nb_iterations]
+"""
+import os
+import sys
+import time
+
+# Une clé factice suffit: ChatOpenAI ne contacte pas l'API à la construction
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+
+from ai_module.llm_config import get_llm
+from ai_module.chains_gen_profile.generate_profile_chain import (
+    build_head_chain, build_exp_chain, build_edu_chain,
+    get_head_chain, get_exp_chain, get_edu_chain,
+)
+from ai_module.chains_gen_cv.gen_cv_chain import OutputBullets, OutputExpTranslation, SkillsOutput
+
+
+def mesurer(fonction, iterations: int) -> float:
+    """Retourne la durée moyenne d'un appel en microsecondes"""
+    fonction()  # Échauffement
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fonction()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    cas = [
+        ("profil / en-tête", build_head_chain, get_head_chain),
+        ("profil / expériences", build_exp_chain, get_exp_chain),
+        ("profil / formations", build_edu_chain, get_edu_chain),
+        ("cv / give_nb_bullets",
+         lambda: get_llm().with_structured_output(OutputBullets),
+         lambda: get_llm(schema=OutputBullets)),
+        ("cv / translate_and_harmonize_exp",
+         lambda: get_llm(temperature=0.5).with_structured_output(OutputExpTranslation),
+         lambda: get_llm(temperature=0.5, schema=OutputExpTranslation)),
+        ("cv / generate_skills_text",
+         lambda: get_llm(temperature=0.8).with_structured_output(SkillsOutput),
+         lambda: get_llm(temperature=0.8, schema=SkillsOutput)),
+    ]
+
+    print(f"{'Chaîne':<36}{'construite (µs)':>18}{'en cache (µs)':>16}{'gain':>10}")
+    for nom, construite, en_cache in cas:
+        avant = mesurer(construite, iterations)
+        apres = mesurer(en_cache, iterations)
+        print(f"{nom:<36}{avant:>18.1f}{apres:>16.2f}{avant / max(apres, 1e-9):>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Configuration commune des tests unitaires du backend.
+
+Les tests s'exécutent sur le substitut en mémoire de Firestore (backend.local_firestore):
+aucun accès réseau, un stockage vide pour chaque test.
+
+Usage: python -m pytest tests
+"""
+import os
+import sys
+
+# Configuration lue à l'import de backend.config: à définir avant tout import du backend
+os.environ.setdefault("ENV", "local")
+os.environ["FIRESTORE_BACKEND"] = "memory"
+os.environ["FIRESTORE_LATENCY_MS"] = "0"
+os.environ["FIRESTORE_SEED_FILE"] = ""
+os.environ["MODEL_CACHE"] = "0"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import backend.base_firestore as base_firestore
+from backend import local_firestore
+from backend.metrics import metrics
+
+
+@pytest.fixture(autouse=True)
+def local_db(monkeypatch):
+    """Client Firestore local neuf pour chaque test"""
+    monkeypatch.setattr(local_firestore, "_client", None)
+    metrics.reset()
+    return local_firestore.get_local_client()
+
+
+@pytest.fixture
+def fast_retries(monkeypatch):
+    """Nouvelles tentatives des lots sans attente, lots de 2 écritures"""
+    monkeypatch.setattr(base_firestore, "MAX_BATCH_WRITES", 2)
+    monkeypatch.setattr(base_firestore, "BULK_BACKOFF_BASE", 0)
+    monkeypatch.setattr(base_firestore, "BULK_MAX_RETRIES", 2)
+
+
+@pytest.fixture
+def failing_commits(monkeypatch):
+    """
+    Fait échouer les commits de lots choisis.
+
+    Retourne une fonction prenant une fonction (numéro d'appel de commit, à partir de 1)
+    -> erreur à lever ou None, et retournant la liste des numéros d'appel, complétée à chaque commit.
+    """
+    def install(fail):
+        calls = []
+        original = local_firestore.LocalWriteBatch.commit
+
+        def commit(batch):
+            calls.append(len(calls) + 1)
+            error = fail(calls[-1])
+            if error is not None:
+                raise error
+            return original(batch)
+
+        monkeypatch.setattr(local_firestore.LocalWriteBatch, "commit", commit)
+        return calls
+    return install
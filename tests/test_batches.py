@@ -0,0 +1,113 @@
+"""Tests des écritures par lots: nouvelles tentatives et rapport des éléments validés, non validés ou inconnus"""
+import pytest
+from google.api_core.exceptions import Aborted, DeadlineExceeded, PermissionDenied
+
+from backend.base_firestore import BatchCommitError, bulk_write
+from backend.models import CallDocument, UsageDocument
+
+
+def make_calls(count):
+    return [CallDocument(id=f"c{i}", user_id="u1") for i in range(count)]
+
+
+def stored_ids(local_db):
+    return sorted(doc_id for doc_id, _ in local_db.store.list_collection("calls"))
+
+
+def test_writes_are_split_in_batches(local_db, fast_retries):
+    report = bulk_write([(call, False) for call in make_calls(5)])
+
+    assert report["documents"] == 5
+    assert report["batches"] == 3
+    assert report["retries"] == 0
+    assert stored_ids(local_db) == ["c0", "c1", "c2", "c3", "c4"]
+
+
+def test_transient_error_is_retried(local_db, fast_retries, failing_commits):
+    calls = failing_commits(lambda call: Aborted("conflit") if call == 2 else None)
+
+    report = bulk_write([(call, False) for call in make_calls(4)])
+
+    assert report["documents"] == 4
+    assert report["retries"] == 1
+    assert len(calls) == 3
+    assert stored_ids(local_db) == ["c0", "c1", "c2", "c3"]
+
+
+def test_rejected_batch_reports_committed_and_uncommitted(local_db, fast_retries, failing_commits):
+    # Le deuxième lot est refusé à chaque tentative: il n'a pas été appliqué
+    failing_commits(lambda call: Aborted("conflit") if call >= 2 else None)
+    calls = make_calls(5)
+
+    with pytest.raises(BatchCommitError) as error:
+        bulk_write([(call, False) for call in calls])
+
+    committed = [instance for instance, _ in error.value.committed]
+    uncommitted = [instance for instance, _ in error.value.uncommitted]
+    assert committed == calls[:2]
+    assert uncommitted == calls[2:]
+    assert error.value.unknown == []
+    assert isinstance(error.value.cause, Aborted)
+    assert stored_ids(local_db) == ["c0", "c1"]
+    # Seuls les documents des lots validés sont marqués comme enregistrés
+    assert all(call._persisted is not None for call in calls[:2])
+    assert all(call._persisted is None for call in calls[2:])
+
+
+def test_ambiguous_error_reports_the_batch_as_unknown(local_db, fast_retries, failing_commits):
+    failing_commits(lambda call: DeadlineExceeded("délai dépassé") if call >= 2 else None)
+    calls = make_calls(5)
+
+    with pytest.raises(BatchCommitError) as error:
+        bulk_write([(call, False) for call in calls])
+
+    assert [instance for instance, _ in error.value.committed] == calls[:2]
+    assert [instance for instance, _ in error.value.unknown] == calls[2:4]
+    assert [instance for instance, _ in error.value.uncommitted] == calls[4:]
+
+
+def test_non_transient_error_is_not_retried(local_db, fast_retries, failing_commits):
+    commits = failing_commits(lambda call: PermissionDenied("refusé"))
+
+    with pytest.raises(BatchCommitError) as error:
+        bulk_write([(call, False) for call in make_calls(3)])
+
+    assert len(commits) == 1
+    assert error.value.committed == []
+    assert len(error.value.uncommitted) == 3
+
+
+def test_update_of_a_deleted_document_rewrites_it(local_db):
+    CallDocument(id="c1", user_id="u1", endpoint="generate_cv_v2").save()
+    call = CallDocument.get_by_id("c1")
+    local_db.store.delete("calls/c1")
+    call.usage_count = 3
+
+    report = bulk_write([(call, False)])
+
+    assert report["documents"] == 1
+    assert local_db.store.get("calls/c1")["endpoint"] == "generate_cv_v2"
+    assert local_db.store.get("calls/c1")["usage_count"] == 3
+
+
+def test_usage_increments_are_not_resent_after_an_ambiguous_error(local_db, fast_retries, failing_commits):
+    commits = failing_commits(lambda call: DeadlineExceeded("délai dépassé") if call == 1 else None)
+
+    with pytest.raises(BatchCommitError) as error:
+        UsageDocument.add_usage_many([("u1", 10), ("u2", 10), ("u3", 10)])
+
+    # Incréments non idempotents: pas de nouvelle tentative après une erreur ambiguë
+    assert len(commits) == 1
+    assert error.value.unknown == [("u1", 10), ("u2", 10)]
+    assert error.value.uncommitted == [("u3", 10)]
+
+
+def test_usage_increments_are_resent_after_a_rejection(local_db, fast_retries, failing_commits):
+    commits = failing_commits(lambda call: Aborted("conflit") if call == 1 else None)
+
+    report = UsageDocument.add_usage_many([("u1", 10), ("u2", 20)])
+
+    assert len(commits) == 2
+    assert report["documents"] == 2
+    assert local_db.store.get("usage/u1")["total_usage"] == 10
+    assert local_db.store.get("usage/u2")["total_usage"] == 20
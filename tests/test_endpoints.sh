@@ -11,48 +11,147 @@ START_DIR=$(pwd)
 # Se déplacer dans le répertoire parent pour lancer le serveur
 cd "$(dirname "$0")/.." || exit
 
-echo -e "${GREEN}Démarrage du serveur...${NC}"
-python backend/main.py &
-SERVER_PID=$!
-
-# Attendre que le serveur démarre
-echo "Attente du démarrage du serveur..."
-sleep 5
-
-# Vérifier si le serveur est en cours d'exécution
-if ! kill -0 $SERVER_PID 2>/dev/null; then
-    echo -e "${RED}Erreur: Le serveur n'a pas démarré correctement${NC}"
-    cd "$START_DIR" || exit
-    exit 1
-fi
+FAILURES=0
 
-# Test de l'endpoint health
-echo -e "\n${GREEN}Test de l'endpoint /health${NC}"
-curl -X GET http://localhost:8080/health \
-  -H "Authorization: Bearer test_token" \
-  -H "Content-Type: application/json"
-
-# Test de l'endpoint generate-profile
-echo -e "\n\n${GREEN}Test de l'endpoint /api/v2/generate-profile${NC}"
-curl -X POST http://localhost:8080/api/v2/generate-profile \
-  -H "Authorization: Bearer test_token" \
-  -H "Content-Type: application/json"
-
-# Test de l'endpoint generate-cv
-echo -e "\n\n${GREEN}Test de l'endpoint /api/v2/generate-cv${NC}"
-curl -X POST http://localhost:8080/api/v2/generate-cv \
-  -H "Authorization: Bearer test_token" \
-  -H "Content-Type: application/json" \
-  -d '{"cv_id": "test_cv"}'
-
-# Arrêt du serveur
-echo -e "\n\n${GREEN}Arrêt du serveur...${NC}"
-if kill -0 $SERVER_PID 2>/dev/null; then
-    kill $SERVER_PID
-    wait $SERVER_PID 2>/dev/null
-fi
+# Démarre le serveur, avec les variables d'environnement éventuellement passées en arguments
+start_server() {
+    echo -e "${GREEN}Démarrage du serveur... $*${NC}"
+    env "$@" python backend/main.py &
+    SERVER_PID=$!
+
+    # Attendre que le serveur démarre
+    echo "Attente du démarrage du serveur..."
+    sleep 5
+
+    # Vérifier si le serveur est en cours d'exécution
+    if ! kill -0 $SERVER_PID 2>/dev/null; then
+        echo -e "${RED}Erreur: Le serveur n'a pas démarré correctement${NC}"
+        cd "$START_DIR" || exit
+        exit 1
+    fi
+}
+
+stop_server() {
+    echo -e "\n\n${GREEN}Arrêt du serveur...${NC}"
+    if kill -0 $SERVER_PID 2>/dev/null; then
+        kill $SERVER_PID
+        wait $SERVER_PID 2>/dev/null
+    fi
+}
+
+# Affiche le résultat d'une vérification et compte les échecs
+check() {
+    local description=$1
+    shift
+    if "$@"; then
+        echo -e "${GREEN}OK${NC} $description"
+    else
+        echo -e "${RED}ÉCHEC${NC} $description"
+        FAILURES=$((FAILURES + 1))
+    fi
+}
+
+run_endpoint_tests() {
+    # Test de l'endpoint health
+    echo -e "\n${GREEN}Test de l'endpoint /health${NC}"
+    curl -X GET http://localhost:8080/health \
+      -H "Authorization: Bearer test_token" \
+      -H "Content-Type: application/json"
+
+    # Test de l'endpoint generate-profile
+    echo -e "\n\n${GREEN}Test de l'endpoint /api/v2/generate-profile${NC}"
+    curl -X POST http://localhost:8080/api/v2/generate-profile \
+      -H "Authorization: Bearer test_token" \
+      -H "Content-Type: application/json"
+
+    # Test de l'endpoint generate-cv
+    echo -e "\n\n${GREEN}Test de l'endpoint /api/v2/generate-cv${NC}"
+    curl -X POST http://localhost:8080/api/v2/generate-cv \
+      -H "Authorization: Bearer test_token" \
+      -H "Content-Type: application/json" \
+      -d '{"cv_id": "test_cv"}'
+
+    # Test du mode asynchrone de generate-cv puis du suivi du job
+    echo -e "\n\n${GREEN}Test de l'endpoint /api/v2/generate-cv (mode asynchrone)${NC}"
+    JOB_RESPONSE=$(curl -s -X POST http://localhost:8080/api/v2/generate-cv \
+      -H "Authorization: Bearer test_token" \
+      -H "Content-Type: application/json" \
+      -d '{"cv_id": "test_cv", "async": true}')
+    echo "$JOB_RESPONSE"
+    JOB_ID=$(echo "$JOB_RESPONSE" | python -c "import sys, json; print(json.load(sys.stdin).get('job_id', ''))")
+
+    echo -e "\n\n${GREEN}Test de l'endpoint /api/v2/jobs/<job_id>${NC}"
+    curl -X GET "http://localhost:8080/api/v2/jobs/$JOB_ID" \
+      -H "Authorization: Bearer test_token" \
+      -H "Content-Type: application/json"
+
+    # Test du flux de progression (server-sent events) de generate-cv
+    echo -e "\n\n${GREEN}Test de l'endpoint /api/v2/generate-cv/stream${NC}"
+    curl -N -X POST http://localhost:8080/api/v2/generate-cv/stream \
+      -H "Authorization: Bearer test_token" \
+      -H "Content-Type: application/json" \
+      -d '{"cv_id": "test_cv"}'
+
+    # Test de la génération par lot
+    echo -e "\n\n${GREEN}Test de l'endpoint /api/v2/generate-cvs${NC}"
+    curl -X POST http://localhost:8080/api/v2/generate-cvs \
+      -H "Authorization: Bearer test_token" \
+      -H "Content-Type: application/json" \
+      -d '{"cv_ids": ["test_cv", "test_cv_2"]}'
+
+    # Test de l'endpoint des métriques (réservé aux administrateurs hors environnement local)
+    echo -e "\n\n${GREEN}Test de l'endpoint /api/v2/metrics${NC}"
+    curl -X GET http://localhost:8080/api/v2/metrics \
+      -H "Authorization: Bearer test_token" \
+      -H "Content-Type: application/json"
+}
+
+# Limiteur d'usage local et journal des appels différé, sur le substitut Firestore en mémoire
+run_limiter_tests() {
+    echo -e "\n${GREEN}Test du limiteur d'usage (délai de 20 secondes entre deux requêtes)${NC}"
+    # Première requête admise (404: le stockage en mémoire est vide), seconde refusée par le délai
+    FIRST=$(curl -s -o /dev/null -w "%{http_code}" -X POST http://localhost:8080/api/v2/generate-cv \
+      -H "Authorization: Bearer test_token" \
+      -H "Content-Type: application/json" \
+      -d '{"cv_id": "test_cv"}')
+    SECOND=$(curl -s -o /dev/null -w "%{http_code}" -X POST http://localhost:8080/api/v2/generate-cv \
+      -H "Authorization: Bearer test_token" \
+      -H "Content-Type: application/json" \
+      -d '{"cv_id": "test_cv"}')
+    check "première requête admise (statut $FIRST)" [ "$FIRST" != "429" ]
+    check "seconde requête refusée (statut $SECOND)" [ "$SECOND" = "429" ]
+
+    echo -e "\n${GREEN}Test des métriques du limiteur et du journal des appels${NC}"
+    sleep 1
+    METRICS=$(curl -s -X GET http://localhost:8080/api/v2/metrics \
+      -H "Authorization: Bearer test_token" \
+      -H "Content-Type: application/json")
+    check "limiteur actif: 1 requête admise, 1 refusée" python -c '
+import json, sys
+stats = json.loads(sys.argv[1])["usage_limiter"]
+sys.exit(not (stats["enabled"] and stats["admitted"] == 1 and stats["rejected_cooldown"] == 1))
+' "$METRICS"
+    check "journal des appels différé: appel mis en file, aucun abandon" python -c '
+import json, sys
+stats = json.loads(sys.argv[1])["call_log"]
+sys.exit(not (stats["enabled"] and stats["queued"] >= 1 and stats["dropped"] == 0 and stats["failed"] == 0))
+' "$METRICS"
+}
+
+start_server
+run_endpoint_tests
+stop_server
+
+echo -e "\n\n${GREEN}Substitut Firestore en mémoire, limiteur d'usage et journal des appels différé${NC}"
+start_server FIRESTORE_BACKEND=memory USAGE_LIMITER=1 CALL_LOG_BUFFERED=1 CHECK_RATE_LIMIT=1
+run_limiter_tests
+stop_server
 
 # Retour au répertoire de départ
 cd "$START_DIR" || exit
 
+if [ "$FAILURES" -ne 0 ]; then
+    echo -e "\n${RED}$FAILURES vérification(s) en échec${NC}"
+    exit 1
+fi
 echo -e "\n${GREEN}Tests terminés${NC}" 
\ No newline at end of file
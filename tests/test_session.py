@@ -0,0 +1,150 @@
+"""Tests de la session Firestore: écriture unique à la sortie, abandon sur erreur"""
+import pytest
+from flask import Flask
+from google.api_core.exceptions import PermissionDenied
+
+from backend.base_firestore import BatchCommitError
+from backend.models import CallDocument
+from backend.session import firestore_session, flush_current_session, get_current_session, unit_of_work
+
+
+def stored(local_db, path):
+    return local_db.store.get(path)
+
+
+def test_saves_are_written_once_at_session_exit(local_db):
+    with firestore_session() as session:
+        call = CallDocument(id="c1", user_id="u1", endpoint="generate_cv_v2")
+        call.save()
+        call.usage_count = 2
+        call.save()
+        call.save()
+        assert stored(local_db, "calls/c1") is None
+        assert session.saves == 3
+        rpc_before_exit = local_db.rpc_count
+
+    assert local_db.rpc_count == rpc_before_exit + 1
+    assert stored(local_db, "calls/c1")["usage_count"] == 2
+
+
+def test_reads_in_session_hit_firestore_once(local_db):
+    CallDocument(id="c1", user_id="u1").save()
+    rpc_before = local_db.rpc_count
+
+    with firestore_session() as session:
+        first = CallDocument.get_by_id("c1")
+        second = CallDocument.get_by_id("c1")
+        missing = CallDocument.get_by_id("absent")
+        missing_again = CallDocument.get_by_id("absent")
+
+    assert first is second
+    assert missing is None and missing_again is None
+    assert local_db.rpc_count == rpc_before + 2
+    assert session.reads_avoided == 2
+
+
+def test_only_changed_fields_are_sent_for_documents_read(local_db, monkeypatch):
+    CallDocument(id="c1", user_id="u1", endpoint="generate_cv_v2").save()
+    updates = []
+    original_update = type(local_db.batch()).update
+
+    def update(batch, reference, field_updates):
+        updates.append(dict(field_updates))
+        return original_update(batch, reference, field_updates)
+
+    monkeypatch.setattr(type(local_db.batch()), "update", update)
+    with firestore_session():
+        call = CallDocument.get_by_id("c1")
+        call.usage_count = 5
+        call.save()
+
+    assert updates == [{"usage_count": 5}]
+    assert stored(local_db, "calls/c1")["endpoint"] == "generate_cv_v2"
+
+
+def test_pending_writes_are_discarded_when_the_block_fails(local_db):
+    with pytest.raises(RuntimeError):
+        with firestore_session() as session:
+            CallDocument(id="c1", user_id="u1").save()
+            raise RuntimeError("génération interrompue")
+
+    assert stored(local_db, "calls/c1") is None
+    assert session.saves == 0
+    assert get_current_session() is None
+
+
+def test_nested_session_reuses_the_outer_one(local_db):
+    with firestore_session() as outer:
+        with firestore_session() as inner:
+            CallDocument(id="c1", user_id="u1").save()
+        assert inner is outer
+        assert stored(local_db, "calls/c1") is None
+    assert stored(local_db, "calls/c1") is not None
+
+
+def test_flush_error_is_raised_by_default(local_db, failing_commits):
+    failing_commits(lambda call: PermissionDenied("refusé"))
+
+    with pytest.raises(BatchCommitError) as error:
+        with firestore_session():
+            CallDocument(id="c1", user_id="u1").save()
+
+    assert isinstance(error.value.cause, PermissionDenied)
+    assert stored(local_db, "calls/c1") is None
+
+
+def test_flush_error_can_be_kept_on_the_session(local_db, failing_commits):
+    failing_commits(lambda call: PermissionDenied("refusé"))
+
+    with firestore_session(raise_flush_errors=False) as session:
+        CallDocument(id="c1", user_id="u1").save()
+
+    assert isinstance(session.flush_error, BatchCommitError)
+
+
+def test_flush_current_session_writes_before_exit(local_db, failing_commits):
+    calls = failing_commits(lambda call: None)
+
+    with firestore_session():
+        CallDocument(id="c1", user_id="u1").save()
+        assert flush_current_session() == 1
+        assert stored(local_db, "calls/c1") is not None
+        # Plus rien à écrire à la sortie de la session
+        assert flush_current_session() == 0
+
+    assert len(calls) == 1
+    assert flush_current_session() == 0
+
+
+def test_flush_current_session_raises_write_errors(local_db, failing_commits):
+    failing_commits(lambda call: PermissionDenied("refusé"))
+
+    with firestore_session():
+        CallDocument(id="c1", user_id="u1").save()
+        with pytest.raises(BatchCommitError):
+            flush_current_session()
+
+
+def test_unit_of_work_turns_a_flush_error_into_a_500(local_db, failing_commits):
+    failing_commits(lambda call: PermissionDenied("refusé"))
+
+    @unit_of_work
+    def endpoint():
+        CallDocument(id="c1", user_id="u1").save()
+        return "ok", 200
+
+    with Flask(__name__).app_context():
+        response, status = endpoint()
+
+    assert status == 500
+    assert "error" in response.get_json()
+
+
+def test_unit_of_work_keeps_the_response_when_writes_succeed(local_db):
+    @unit_of_work
+    def endpoint():
+        CallDocument(id="c1", user_id="u1").save()
+        return "ok", 200
+
+    assert endpoint() == ("ok", 200)
+    assert stored(local_db, "calls/c1") is not None
@@ -0,0 +1,253 @@
+"""Tests du regroupement des générations identiques: meneur, suiveurs et bail entre instances"""
+import threading
+import time
+from datetime import datetime, timedelta, UTC
+
+import pytest
+
+from backend.models import CallDocument, LeaseDocument
+from backend.session import firestore_session, flush_current_session
+from backend.single_flight import (
+    FirestoreLeaseManager, LeaseFailedError, SingleFlight, SingleFlightTimeoutError, make_flight_key,
+)
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Condition non remplie dans le délai")
+        time.sleep(0.005)
+
+
+def start_followers(flight, key, count, fn):
+    results, errors = [], []
+
+    def follow():
+        try:
+            results.append(flight.do(key, fn))
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=follow) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def followers_of(flight, key):
+    with flight._lock:
+        current = flight._flights.get(key)
+        return current.followers if current is not None else 0
+
+
+def test_flight_key_ignores_dict_order():
+    assert make_flight_key("u1", "cv1", {"a": 1, "b": 2}) == make_flight_key("u1", "cv1", {"b": 2, "a": 1})
+    assert make_flight_key("u1", "cv1", {"a": 1}) != make_flight_key("u1", "cv2", {"a": 1})
+
+
+def test_followers_share_the_leader_result():
+    flight = SingleFlight("test_flight", timeout=5)
+    release = threading.Event()
+    executions = []
+
+    def generate():
+        executions.append(1)
+        release.wait(5)
+        return {"cv_url": "https://example.test/cv.pdf"}
+
+    leader_result = []
+    leader = threading.Thread(target=lambda: leader_result.append(flight.do("k", generate)))
+    leader.start()
+    wait_until(lambda: flight.in_flight() == 1)
+
+    threads, results, errors = start_followers(flight, "k", 3, generate)
+    wait_until(lambda: followers_of(flight, "k") == 3)
+    release.set()
+    for thread in threads + [leader]:
+        thread.join(5)
+
+    assert executions == [1]
+    assert leader_result == [({"cv_url": "https://example.test/cv.pdf"}, False)]
+    assert results == [({"cv_url": "https://example.test/cv.pdf"}, True)] * 3
+    assert errors == []
+    assert flight.in_flight() == 0
+
+
+def test_followers_receive_the_leader_error():
+    flight = SingleFlight("test_flight", timeout=5)
+    release = threading.Event()
+
+    def generate():
+        release.wait(5)
+        raise ValueError("écriture du CV perdue")
+
+    leader_errors = []
+
+    def lead():
+        try:
+            flight.do("k", generate)
+        except ValueError as e:
+            leader_errors.append(e)
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    wait_until(lambda: flight.in_flight() == 1)
+    threads, results, errors = start_followers(flight, "k", 2, generate)
+    wait_until(lambda: followers_of(flight, "k") == 2)
+    release.set()
+    for thread in threads + [leader]:
+        thread.join(5)
+
+    assert results == []
+    assert len(errors) == 2 and all(error is leader_errors[0] for error in errors)
+
+
+def test_follower_times_out_without_cancelling_the_leader():
+    flight = SingleFlight("test_flight", timeout=0.05)
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: flight.do("k", lambda: release.wait(5)))
+    leader.start()
+    wait_until(lambda: flight.in_flight() == 1)
+
+    with pytest.raises(SingleFlightTimeoutError):
+        flight.do("k", lambda: None)
+
+    release.set()
+    leader.join(5)
+    assert flight.in_flight() == 0
+
+
+def test_result_is_shared_once_the_leader_write_has_committed(local_db):
+    flight = SingleFlight("test_flight", timeout=5)
+    release = threading.Event()
+    leave_session = threading.Event()
+
+    def generate():
+        release.wait(5)
+        CallDocument(id="c1", user_id="u1").save()
+        flush_current_session()
+        return {"cv_id": "c1"}
+
+    def lead():
+        with firestore_session():
+            flight.do("k", generate)
+            # La session du meneur reste ouverte: seul flush_current_session a pu écrire
+            leave_session.wait(5)
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    wait_until(lambda: flight.in_flight() == 1)
+    threads, results, errors = start_followers(flight, "k", 1, generate)
+    wait_until(lambda: followers_of(flight, "k") == 1)
+    release.set()
+    threads[0].join(5)
+    stored_when_shared = local_db.store.get("calls/c1")
+    leave_session.set()
+    leader.join(5)
+
+    assert results == [({"cv_id": "c1"}, True)]
+    assert stored_when_shared is not None
+
+
+def test_next_call_after_completion_runs_again():
+    flight = SingleFlight("test_flight", timeout=5)
+    assert flight.do("k", lambda: 1) == (1, False)
+    assert flight.do("k", lambda: 2) == (2, False)
+
+
+def lease_manager(**overrides):
+    settings = {"ttl": 60, "poll_interval": 0.01, "wait_timeout": 5}
+    settings.update(overrides)
+    return FirestoreLeaseManager(**settings)
+
+
+def write_lease(local_db, key, **fields):
+    now = datetime.now(UTC)
+    lease = LeaseDocument(owner="other-instance", created_at=now, expires_at=now + timedelta(seconds=60))
+    data = lease.model_copy(update=fields).to_dict()
+    local_db.collection(LeaseDocument.collection_name).document(key).set(data)
+
+
+def read_lease(local_db, key):
+    return local_db.store.get(f"{LeaseDocument.collection_name}/{key}")
+
+
+def test_lease_holder_publishes_its_result(local_db):
+    result = lease_manager().run("k", lambda: {"cv_url": "https://example.test/cv.pdf"})
+
+    assert result == {"cv_url": "https://example.test/cv.pdf"}
+    lease = read_lease(local_db, "k")
+    assert lease["status"] == "succeeded"
+    assert lease["result"] == result
+
+
+def test_lease_holder_publishes_its_failure(local_db):
+    def generate():
+        raise RuntimeError("écriture du CV perdue")
+
+    with pytest.raises(RuntimeError):
+        lease_manager().run("k", generate)
+
+    lease = read_lease(local_db, "k")
+    assert lease["status"] == "failed"
+    assert "écriture du CV perdue" in lease["error"]
+
+
+def test_lease_waiter_returns_the_holder_result(local_db):
+    write_lease(local_db, "k")
+    executions = []
+
+    def finish_on_other_instance():
+        time.sleep(0.05)
+        local_db.collection(LeaseDocument.collection_name).document("k").update(
+            {"status": "succeeded", "result": {"cv_url": "https://example.test/cv.pdf"}}
+        )
+
+    other = threading.Thread(target=finish_on_other_instance)
+    other.start()
+    result = lease_manager().run("k", lambda: executions.append(1))
+    other.join(5)
+
+    assert result == {"cv_url": "https://example.test/cv.pdf"}
+    assert executions == []
+
+
+def test_lease_waiter_raises_the_holder_failure(local_db):
+    write_lease(local_db, "k")
+
+    def fail_on_other_instance():
+        time.sleep(0.05)
+        local_db.collection(LeaseDocument.collection_name).document("k").update(
+            {"status": "failed", "error": "génération échouée"}
+        )
+
+    other = threading.Thread(target=fail_on_other_instance)
+    other.start()
+    with pytest.raises(LeaseFailedError):
+        lease_manager().run("k", lambda: {"ok": True})
+    other.join(5)
+
+
+def test_failed_lease_is_acquired_again(local_db):
+    write_lease(local_db, "k", status="failed", error="génération échouée")
+
+    assert lease_manager().run("k", lambda: {"ok": True}) == {"ok": True}
+    assert read_lease(local_db, "k")["status"] == "succeeded"
+
+
+def test_expired_lease_is_taken_over(local_db):
+    write_lease(local_db, "k", expires_at=datetime.now(UTC) - timedelta(seconds=1))
+
+    result = lease_manager().run("k", lambda: {"ok": True})
+
+    assert result == {"ok": True}
+    assert read_lease(local_db, "k")["status"] == "succeeded"
+    assert read_lease(local_db, "k")["owner"] != "other-instance"
+
+
+def test_lease_waiter_times_out(local_db):
+    write_lease(local_db, "k")
+
+    with pytest.raises(SingleFlightTimeoutError):
+        lease_manager(wait_timeout=0.05).run("k", lambda: {"ok": True})
@@ -0,0 +1,137 @@
+"""Tests du limiteur d'usage en mémoire: admission, enregistrement, éviction et écriture différée"""
+import time
+from datetime import datetime, timedelta, UTC
+
+import pytest
+from google.api_core.exceptions import Aborted, DeadlineExceeded
+
+from backend.usage_limiter import DEFAULT_USAGE_INCREMENT, REQUEST_COOLDOWN, TOKEN_LIMIT, UsageLimiter
+
+
+@pytest.fixture
+def limiter(fast_retries):
+    # Écriture différée déclenchée par les tests uniquement
+    return UsageLimiter(staleness=30, flush_interval=3600, max_users=100)
+
+
+def seed_usage(local_db, user_id, total_usage, last_request_time=None):
+    data = {"user_id": user_id, "total_usage": total_usage}
+    if last_request_time is not None:
+        data["last_request_time"] = last_request_time
+    local_db.collection("usage").document(user_id).set(data)
+
+
+def test_first_request_is_admitted_and_reserves_the_cooldown(local_db, limiter):
+    assert limiter.admit("u1") is True
+    assert limiter.admit("u1") is False
+
+    stats = limiter.get_stats()
+    assert stats["admitted"] == 1
+    assert stats["rejected_cooldown"] == 1
+    assert stats["loads"] == 1
+
+
+def test_token_limit_is_read_from_firestore(local_db, limiter):
+    seed_usage(local_db, "u1", TOKEN_LIMIT)
+
+    assert limiter.admit("u1") is False
+    assert limiter.get_stats()["rejected_limit"] == 1
+
+
+def test_recent_request_stored_in_firestore_is_rejected(local_db, limiter):
+    seed_usage(local_db, "u1", 0, datetime.now(UTC) - timedelta(seconds=1))
+    seed_usage(local_db, "u2", 0, datetime.now(UTC) - timedelta(seconds=REQUEST_COOLDOWN + 1))
+
+    assert limiter.admit("u1") is False
+    assert limiter.admit("u2") is True
+
+
+def test_state_is_reloaded_once_stale(local_db, limiter):
+    limiter.staleness = 0
+    limiter.admit("u1")
+    limiter.admit("u1")
+
+    assert limiter.get_stats()["loads"] == 2
+
+
+def test_recorded_usage_is_written_behind(local_db, limiter):
+    limiter.record("u1")
+    limiter.record("u1", 10)
+    assert local_db.store.get("usage/u1") is None
+    assert limiter.get_stats()["pending_users"] == 1
+
+    assert limiter.flush() == 1
+    assert local_db.store.get("usage/u1")["total_usage"] == DEFAULT_USAGE_INCREMENT + 10
+    assert limiter.get_stats()["pending_users"] == 0
+    assert limiter.flush() == 0
+
+
+def test_reload_keeps_pending_increments(local_db, limiter):
+    seed_usage(local_db, "u1", 100)
+    limiter.record("u1", 10)
+    limiter.staleness = 0
+    limiter.admit("u1")
+
+    assert limiter._states["u1"].total_usage == 110
+
+
+def test_recorded_usage_counts_toward_the_limit(local_db, limiter):
+    limiter.admit("u1")
+    limiter.record("u1", TOKEN_LIMIT)
+    limiter._states["u1"].last_request = time.time() - REQUEST_COOLDOWN - 1
+
+    assert limiter.admit("u1") is False
+    assert limiter.get_stats()["rejected_limit"] == 1
+
+
+def test_rejected_flush_keeps_increments_pending(local_db, limiter, failing_commits):
+    failing_commits(lambda call: Aborted("conflit"))
+    limiter.record("u1", 10)
+
+    assert limiter.flush() == 0
+    assert limiter._states["u1"].pending == 10
+    assert limiter.get_stats()["flush_errors"] == 1
+
+
+def test_ambiguous_flush_does_not_resend_increments(local_db, limiter, failing_commits):
+    commits = failing_commits(lambda call: DeadlineExceeded("délai dépassé"))
+    limiter.record("u1", 10)
+
+    assert limiter.flush() == 0
+    assert limiter._states["u1"].pending == 0
+    assert limiter.get_stats()["unknown_outcomes"] == 1
+    assert len(commits) == 1
+
+
+def test_oldest_clean_states_are_evicted(local_db, limiter):
+    limiter.max_users = 2
+    for user_id in ("u1", "u2", "u3"):
+        limiter.admit(user_id)
+
+    assert list(limiter._states) == ["u2", "u3"]
+
+
+def test_states_with_pending_increments_are_not_evicted(local_db, limiter):
+    limiter.max_users = 2
+    limiter.record("u1", 10)
+    for user_id in ("u2", "u3", "u4"):
+        limiter.admit(user_id)
+
+    assert "u1" in limiter._states
+    assert len(limiter._states) == 2
+
+
+def test_admit_survives_an_eviction_after_loading(local_db, limiter, monkeypatch):
+    original_load = limiter._load
+
+    def load_then_evict(user_id, counters):
+        state = original_load(user_id, counters)
+        # Éviction par une autre requête entre le chargement et la vérification
+        with limiter._lock:
+            del limiter._states[user_id]
+        return state
+
+    monkeypatch.setattr(limiter, "_load", load_then_evict)
+
+    assert limiter.admit("u1") is True
+    assert "u1" in limiter._states